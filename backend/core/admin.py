@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CompanySettings
+from .models import CompanySettings, OutboxEvent
 
 @admin.register(CompanySettings)
 class CompanySettingsAdmin(admin.ModelAdmin):
@@ -13,4 +13,11 @@ class CompanySettingsAdmin(admin.ModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         # Don't allow deletion of company settings
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'order_id', 'attempts', 'dispatched_at', 'created_at')
+    list_filter = ('kind',)
+    readonly_fields = ('created_at',)
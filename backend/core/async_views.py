@@ -0,0 +1,140 @@
+"""
+Async variants of the read-heavy endpoints, for the ASGI application.
+
+They return the same payloads as their DRF counterparts but read through
+Django's async ORM, so while a query or a slow client is pending the
+worker's event loop keeps serving other requests. Authentication uses the
+class configured in REST_FRAMEWORK, so the token is checked against the
+user row or, with JWT_STATELESS_AUTH, against the revocation blacklist
+(core.authentication); that lookup runs in a thread, off the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.exceptions import InvalidToken
+from inventory.views import ProductViewSet, StockViewSet
+from .cache import dashboard_cache
+from .dashboard_views import dashboard_metrics_data
+from .db_router import replica_reads
+from .fast_serializers import FastSerializer
+from .middleware import reuse_compressed
+from .renderers import FastJSONRenderer
+
+
+def raw_token(request):
+    """
+    Return the access token from the Authorization header or, for browser
+    EventSource clients that cannot set headers, the ``token`` parameter.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.GET.get('token', '')
+
+
+async def token_error(request):
+    """Return a 401 response unless the request carries a valid access token."""
+    token = raw_token(request)
+    if not token:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+    # The same JWT authentication as the DRF views
+    authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+    try:
+        validated_token = authenticator.get_validated_token(token)
+        await sync_to_async(authenticator.get_user)(validated_token)
+    except InvalidToken:
+        return JsonResponse({'error': 'Given token not valid for any token type'}, status=401)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=401)
+    return None
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+@reuse_compressed
+@replica_reads
+@require_GET
+async def dashboard_metrics(request):
+    """Async variant of ``/api/dashboard/metrics/``."""
+    error = await token_error(request)
+    if error is not None:
+        return error
+
+    try:
+        # Shares the cached value of the sync view; only a cache miss (one
+        # request per expiry) runs the queries, in a thread
+        response_data = await sync_to_async(dashboard_cache.get_or_compute)(('metrics',), dashboard_metrics_data)
+        return json_response(response_data)
+
+    except Exception as e:
+        return json_response({'error': f'Failed to fetch dashboard metrics: {str(e)}'}, status=500)
+
+
+def async_list_view(viewset_class):
+    """
+    Build an async list view from a viewset: same filters, search, ordering
+    and page format, with the rows read by ``FastSerializer`` via the async
+    ORM.
+    """
+    pagination = viewset_class.pagination_class
+
+    @replica_reads
+    @require_GET
+    async def list_view(request):
+        error = await token_error(request)
+        if error is not None:
+            return error
+
+        viewset = viewset_class(request=Request(request), format_kwarg=None, action='list')
+        fast = FastSerializer.for_class(viewset_class.serializer_class)
+        queryset = fast.values(viewset.get_queryset())
+
+        try:
+            page_number = int(request.GET.get('page', 1))
+        except ValueError:
+            return json_response({'detail': 'Invalid page.'}, status=404)
+        # Like PageNumberPagination: invalid sizes fall back to the default
+        try:
+            page_size = int(request.GET.get(pagination.page_size_query_param, pagination.page_size))
+        except ValueError:
+            page_size = pagination.page_size
+        if page_size < 1:
+            page_size = pagination.page_size
+        page_size = min(page_size, pagination.max_page_size)
+
+        count = await queryset.acount()
+        page_count = max((count + page_size - 1) // page_size, 1)
+        if not 1 <= page_number <= page_count:
+            return json_response({'detail': 'Invalid page.'}, status=404)
+
+        offset = (page_number - 1) * page_size
+        rows = [row async for row in queryset[offset:offset + page_size]]
+
+        url = request.build_absolute_uri()
+        next_url = replace_query_param(url, 'page', page_number + 1) if page_number < page_count else None
+        if page_number == 1:
+            previous_url = None
+        elif page_number == 2:
+            previous_url = remove_query_param(url, 'page')
+        else:
+            previous_url = replace_query_param(url, 'page', page_number - 1)
+
+        return json_response({
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': await fast.aserialize_rows(rows),
+        })
+
+    list_view.__name__ = f'{viewset_class.__name__}_async_list'
+    return list_view
+
+
+product_list = async_list_view(ProductViewSet)
+stock_list = async_list_view(StockViewSet)
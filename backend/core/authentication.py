@@ -0,0 +1,151 @@
+"""
+Stateless JWT authentication.
+
+``JWTAuthentication`` loads the user row on every request. With
+``JWT_STATELESS_AUTH`` enabled, ``StatelessJWTAuthentication`` trusts the
+signed claims of the access token instead (``user_id``, ``username``,
+``is_staff`` and ``is_superuser``, see ``MyTokenObtainPairSerializer``), so
+authenticating costs one cache read and no query:
+
+- revoked tokens are rejected through a blacklist kept in the cache, either
+  one token (``revoke_token``, done by the logout endpoint) or every token
+  a user holds (``revoke_user_tokens``, done automatically when a user is
+  deactivated or deleted)
+- permission checks on ``request.user`` read the user's flags and
+  permission names, cached for ``JWT_USER_CACHE_TIMEOUT`` seconds; the user
+  row itself, password hash included, is never cached
+
+Run with a shared cache (``CACHE_REDIS_URL``) so revocations reach every
+worker.
+"""
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+def cache():
+    return caches[settings.CACHE_ALIAS]
+
+
+def user_cache_key(user_id):
+    return f'jwt:user:{user_id}'
+
+
+def revoked_token_key(jti):
+    return f'jwt:revoked:{jti}'
+
+
+def revoked_user_key(user_id):
+    return f'jwt:revoked-user:{user_id}'
+
+
+def revoke_token(token):
+    """Reject ``token`` from now until it expires."""
+    remaining = max(int(token['exp'] - time.time()), 1)
+    cache().set(revoked_token_key(token[api_settings.JTI_CLAIM]), True, remaining)
+
+
+def revoke_user_tokens(user_id):
+    """Reject every access token issued to the user so far."""
+    lifetime = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache().set(revoked_user_key(user_id), time.time(), lifetime)
+
+
+def is_revoked(token):
+    jti_key = revoked_token_key(token.get(api_settings.JTI_CLAIM))
+    user_key = revoked_user_key(token.get(api_settings.USER_ID_CLAIM))
+    revoked = cache().get_many([jti_key, user_key])
+    if jti_key in revoked:
+        return True
+    revoked_at = revoked.get(user_key)
+    return revoked_at is not None and token.get('iat', 0) < revoked_at
+
+
+def cached_user_access(user_id):
+    """
+    Return the flags and permission names of the user, read from the
+    database at most every ``JWT_USER_CACHE_TIMEOUT`` seconds.
+    """
+    access = cache().get(user_cache_key(user_id))
+    if access is None:
+        User = get_user_model()
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        access = {
+            'id': user.pk,
+            'is_active': user.is_active,
+            'is_staff': user.is_staff,
+            'is_superuser': user.is_superuser,
+            'permissions': frozenset(user.get_all_permissions()),
+            'group_permissions': frozenset(user.get_group_permissions()),
+        }
+        cache().set(user_cache_key(user_id), access, settings.JWT_USER_CACHE_TIMEOUT)
+    return access
+
+
+class CachedTokenUser(TokenUser):
+    """
+    User built from the token claims. Permission checks, which the claims
+    cannot answer, read the cached permission names of the user.
+    Object permissions are not supported, as by Django's ModelBackend.
+    """
+
+    @cached_property
+    def access(self):
+        return cached_user_access(self.id)
+
+    def get_group_permissions(self, obj=None):
+        if obj is not None or not self.access['is_active']:
+            return set()
+        return set(self.access['group_permissions'])
+
+    def get_all_permissions(self, obj=None):
+        if obj is not None or not self.access['is_active']:
+            return set()
+        return set(self.access['permissions'])
+
+    def has_perm(self, perm, obj=None):
+        if self.access['is_active'] and self.access['is_superuser']:
+            return True
+        return perm in self.get_all_permissions(obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, module):
+        if self.access['is_active'] and self.access['is_superuser']:
+            return True
+        return any(perm.startswith(f'{module}.') for perm in self.get_all_permissions())
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Authenticate from the token claims, honouring the cached blacklist."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_token_user(sender, instance, **kwargs):
+    cache().delete(user_cache_key(instance.pk))
+    if not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_token_user(sender, instance, **kwargs):
+    cache().delete(user_cache_key(instance.pk))
+    revoke_user_tokens(instance.pk)
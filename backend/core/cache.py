@@ -0,0 +1,108 @@
+"""
+Namespaced, versioned cache entries with single-flight recomputation.
+
+Keys of one kind of data live in a ``CacheNamespace`` and embed the
+namespace's current version, so ``invalidate()`` drops all of them at once
+by bumping the version instead of deleting keys one by one.
+
+``get_or_compute()`` keeps each value for ``timeout`` seconds and then for
+another ``CACHE_STALE_TIMEOUT`` seconds as stale. When a value goes stale,
+the first worker to take the key's lock recomputes it while the others keep
+serving the stale value. When there is no value at all, the others wait up
+to ``CACHE_WAIT_TIMEOUT`` seconds for the lock holder's result rather than
+all querying the database at once.
+"""
+import time
+from hashlib import blake2b
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class CacheNamespace:
+
+    def __init__(self, name, timeout_setting):
+        self.name = name
+        self.timeout_setting = timeout_setting
+
+    @property
+    def cache(self):
+        return caches[settings.CACHE_ALIAS]
+
+    @property
+    def timeout(self):
+        return getattr(settings, self.timeout_setting)
+
+    def version_key(self):
+        return f'{self.name}:version'
+
+    def version(self):
+        version = self.cache.get(self.version_key())
+        if version is None:
+            # Start from the clock so an evicted version never comes back
+            # to a number whose keys may still be cached
+            self.cache.add(self.version_key(), time.time_ns(), None)
+            version = self.cache.get(self.version_key())
+        return version
+
+    def key(self, *parts):
+        digest = blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+        return f'{self.name}:{self.version()}:{digest}'
+
+    def invalidate(self):
+        try:
+            self.cache.incr(self.version_key())
+        except ValueError:
+            self.version()
+
+    def invalidate_on_commit(self):
+        """
+        Invalidate now, so this transaction's own reads miss the cache, and
+        again after commit, so a value computed from pre-commit data by a
+        concurrent request is dropped as well.
+        """
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+    def get_or_compute(self, parts, compute):
+        """Return the cached value for ``parts``, calling ``compute()`` at most once per expiry."""
+        if not self.timeout:
+            return compute()
+
+        key = self.key(*parts)
+        entry = self.cache.get(key)
+        if entry is not None:
+            fresh_until, value = entry
+            if time.time() < fresh_until or not self.lock(key):
+                return value
+            return self.recompute(key, compute)
+
+        if self.lock(key):
+            return self.recompute(key, compute)
+
+        deadline = time.time() + settings.CACHE_WAIT_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry[1]
+        # The lock holder is too slow or died; do not wait any longer
+        return compute()
+
+    def lock(self, key):
+        return self.cache.add(f'{key}:lock', 1, settings.CACHE_LOCK_TIMEOUT)
+
+    def recompute(self, key, compute):
+        try:
+            value = compute()
+            timeout = self.timeout
+            self.cache.set(key, (time.time() + timeout, value), timeout + settings.CACHE_STALE_TIMEOUT)
+            return value
+        finally:
+            self.cache.delete(f'{key}:lock')
+
+
+# Dashboard counts may lag behind by up to DASHBOARD_CACHE_TIMEOUT seconds
+dashboard_cache = CacheNamespace('dashboard', 'DASHBOARD_CACHE_TIMEOUT')
+# Invalidated whenever the rollups change, see the Daily*Rollup models
+report_cache = CacheNamespace('reports', 'REPORT_CACHE_TIMEOUT')
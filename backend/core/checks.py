@@ -0,0 +1,45 @@
+from django.core.checks import Tags, Warning, register
+from django.urls import URLPattern, URLResolver, get_resolver
+from .ordering import ordering_has_index
+
+
+def _iter_viewsets(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_viewsets(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            viewset = getattr(pattern.callback, 'cls', None)
+            if viewset is not None and hasattr(viewset, 'valid_orderings'):
+                yield viewset
+
+
+@register(Tags.models, Tags.urls)
+def check_ordering_indexes(app_configs, **kwargs):
+    """
+    Flag whitelisted orderings that no index supports.
+
+    Viewsets list orderings that are deliberately left without an index
+    (small reference tables, rarely used sorts, sorts across a relation) in
+    ``unindexed_orderings``.
+    """
+    errors = []
+    seen = set()
+    for viewset in _iter_viewsets(get_resolver().url_patterns):
+        if viewset in seen:
+            continue
+        seen.add(viewset)
+        model = viewset.queryset.model
+        accepted = set(getattr(viewset, 'unindexed_orderings', ()))
+        for ordering in dict.fromkeys(o.lstrip('-') for o in viewset.valid_orderings):
+            if ordering in accepted or ordering_has_index(model, ordering):
+                continue
+            errors.append(Warning(
+                f"Ordering '{ordering}' of {viewset.__name__} is not supported by an index.",
+                hint=(
+                    f"Add an index on {model.__name__} for it, or list it in "
+                    f"{viewset.__name__}.unindexed_orderings if a sort without index is acceptable."
+                ),
+                obj=viewset,
+                id='core.W001',
+            ))
+    return errors
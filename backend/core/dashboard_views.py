@@ -5,11 +5,62 @@ from rest_framework import status
 from django.db.models import Count, Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from inventory.models import Company, Product, Stock
+from inventory.models import Company, Product, ProductForecast, Stock
 from purchase.models import Supplier
 from sale.models import Customer
 from inventory.serializers import StockSerializer
+from .cache import dashboard_cache
+from .db_router import replica_reads
+from .middleware import reuse_compressed
 
+def empty_stock_items():
+    """Batches with nothing left, as listed on the dashboard."""
+    return Stock.objects.filter(
+        quantity=0
+    ).select_related(
+        'product', 
+        'product__company'
+    ).order_by('product__name', 'batch_number')
+
+def empty_stock_row(stock):
+    return {
+        'id': stock.id,
+        'product_name': stock.product.name,
+        'company_name': stock.product.company.name if stock.product.company else 'Unknown',
+        'batch_number': stock.batch_number,
+        'expiry_date': stock.expiry_date,
+        'purchase_price': float(stock.purchase_price),
+        'sale_price': float(stock.sale_price),
+        'mrp': float(stock.mrp),
+        'tax': float(stock.tax),
+        'hsn_code': stock.hsn_code,
+    }
+
+def dashboard_metrics_data():
+    # Get counts for all entities
+    manufacturers_count = Company.objects.count()
+    products_count = Product.objects.count()
+    suppliers_count = Supplier.objects.count()
+    customers_count = Customer.objects.count()
+    stock_items_count = Stock.objects.filter(quantity__gt=0).count()
+    
+    # Get empty stock items (quantity = 0)
+    empty_stock_data = [empty_stock_row(stock) for stock in empty_stock_items()]
+    
+    return {
+        'metrics': {
+            'manufacturers_count': manufacturers_count,
+            'products_count': products_count,
+            'suppliers_count': suppliers_count,
+            'customers_count': customers_count,
+            'stock_items_count': stock_items_count,
+        },
+        'empty_stock_items': empty_stock_data,
+        'empty_stock_count': len(empty_stock_data)
+    }
+
+@reuse_compressed
+@replica_reads
 @swagger_auto_schema(
     method='get',
     operation_description="Get comprehensive dashboard metrics including entity counts and empty stock items",
@@ -56,49 +107,7 @@ def dashboard_metrics(request):
     Get dashboard metrics including counts and empty stock items
     """
     try:
-        # Get counts for all entities
-        manufacturers_count = Company.objects.count()
-        products_count = Product.objects.count()
-        suppliers_count = Supplier.objects.count()
-        customers_count = Customer.objects.count()
-        stock_items_count = Stock.objects.filter(quantity__gt=0).count()
-        
-        # Get empty stock items (quantity = 0)
-        empty_stock_items = Stock.objects.filter(
-            quantity=0
-        ).select_related(
-            'product', 
-            'product__company'
-        ).order_by('product__name', 'batch_number')
-        
-        # Serialize empty stock items
-        empty_stock_data = []
-        for stock in empty_stock_items:
-            empty_stock_data.append({
-                'id': stock.id,
-                'product_name': stock.product.name,
-                'company_name': stock.product.company.name if stock.product.company else 'Unknown',
-                'batch_number': stock.batch_number,
-                'expiry_date': stock.expiry_date,
-                'purchase_price': float(stock.purchase_price),
-                'sale_price': float(stock.sale_price),
-                'mrp': float(stock.mrp),
-                'tax': float(stock.tax),
-                'hsn_code': stock.hsn_code,
-            })
-        
-        response_data = {
-            'metrics': {
-                'manufacturers_count': manufacturers_count,
-                'products_count': products_count,
-                'suppliers_count': suppliers_count,
-                'customers_count': customers_count,
-                'stock_items_count': stock_items_count,
-            },
-            'empty_stock_items': empty_stock_data,
-            'empty_stock_count': len(empty_stock_data)
-        }
-        
+        response_data = dashboard_cache.get_or_compute(('metrics',), dashboard_metrics_data)
         return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -107,6 +116,7 @@ def dashboard_metrics(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@replica_reads
 @swagger_auto_schema(
     method='get',
     operation_description="Get items with low stock based on configurable threshold",
@@ -204,4 +214,72 @@ def low_stock_items(request):
         return Response(
             {'error': f'Failed to fetch low stock items: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@replica_reads
+@swagger_auto_schema(
+    method='get',
+    operation_description="Get products whose stock on hand is below their forecast reorder point. "
+                          "Reorder points are recomputed nightly from each product's sales velocity.",
+    operation_summary="Items Below Reorder Point",
+    tags=['Dashboard'],
+    responses={
+        200: openapi.Response(
+            description="Items below reorder point retrieved successfully",
+            examples={
+                "application/json": {
+                    "reorder_items": [
+                        {
+                            "product_id": 1,
+                            "product_name": "Paracetamol 500mg",
+                            "company_name": "PharmaCorp",
+                            "on_hand": 12,
+                            "reorder_point": 48,
+                            "safety_stock": 13,
+                            "daily_demand": "5.000",
+                            "shortfall": 36
+                        }
+                    ],
+                    "reorder_count": 1
+                }
+            }
+        ),
+        401: openapi.Response(description="Authentication required"),
+        500: openapi.Response(description="Internal server error")
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reorder_items(request):
+    """
+    Get products below their individual reorder point, largest shortfall first
+    """
+    try:
+        products = ProductForecast.products_below_reorder_point().values(
+            'id', 'name', 'company__name', 'on_hand', 'shortfall',
+            'forecast__reorder_point', 'forecast__safety_stock', 'forecast__daily_demand',
+        )
+
+        reorder_data = []
+        for product in products:
+            reorder_data.append({
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'company_name': product['company__name'] or 'Unknown',
+                'on_hand': product['on_hand'],
+                'reorder_point': product['forecast__reorder_point'],
+                'safety_stock': product['forecast__safety_stock'],
+                'daily_demand': product['forecast__daily_demand'],
+                'shortfall': product['shortfall'],
+            })
+
+        return Response({
+            'reorder_items': reorder_data,
+            'reorder_count': len(reorder_data)
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to fetch reorder items: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,101 @@
+"""
+Read replica routing.
+
+Replicas are copies of the default database configured with ``SQL_REPLICAS``
+(see settings) and listed in ``DATABASE_REPLICAS``. Reads go to a random
+replica only where stale data is acceptable:
+
+- views decorated with ``replica_reads`` (dashboard, reports, exports),
+  including the body of streaming responses
+- the ``replica_actions`` of viewsets using ``ReplicaReadMixin``, by
+  default ``list``
+- ``with read_from_replica():`` blocks
+
+and only for GET and HEAD requests. Everything else reads from the primary,
+and so do these once the same request has written anything or while a
+transaction is open, so a request never misses its own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = ContextVar('replica_state', default=None)
+
+
+class ReplicaState:
+    """Routing state of one request or ``read_from_replica`` block."""
+
+    __slots__ = ('written',)
+
+    def __init__(self):
+        self.written = False
+
+
+@contextmanager
+def read_from_replica():
+    # A nested block shares the outer state, so an earlier write still counts
+    token = _state.set(_state.get() or ReplicaState())
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def iterate_from_replica(iterator):
+    with read_from_replica():
+        yield from iterator
+
+
+def replica_reads(view):
+    """Serve the safe requests of a function view from a read replica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view(request, *args, **kwargs)
+            with read_from_replica():
+                return await view(request, *args, **kwargs)
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with read_from_replica():
+            response = view(request, *args, **kwargs)
+        # Streamed exports run their queries while the body is sent
+        if response.streaming and not response.is_async:
+            response.streaming_content = iterate_from_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route reads inside ``read_from_replica`` to ``DATABASE_REPLICAS``."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.written or not settings.DATABASE_REPLICAS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return self.choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.written = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def choose_replica(self):
+        return random.choice(settings.DATABASE_REPLICAS)
@@ -0,0 +1,50 @@
+import asyncio
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from inventory.events import broker
+from .async_views import token_error
+
+
+async def stock_event_stream():
+    queue = broker.subscribe()
+    try:
+        # Reconnect after 3 seconds if the stream drops
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=settings.STOCK_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if data is None:
+                # Fell too far behind; the client reconnects and reloads
+                break
+            yield f'event: stock\ndata: {data}\n\n'
+    finally:
+        broker.unsubscribe(queue)
+
+
+@require_GET
+async def stock_events(request):
+    """
+    Server-Sent Events stream of stock changes, one ``stock`` event per
+    changed batch (see inventory.events). Needs the ASGI application, see
+    core/asgi.py.
+
+    Authenticate with ``Authorization: Bearer <token>`` or ``?token=<token>``.
+    The token is checked as by the DRF views (see core.async_views).
+    """
+    error = await token_error(request)
+    if error is not None:
+        return error
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Stock events are only served by the ASGI application'}, status=400)
+
+    response = StreamingHttpResponse(stock_event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
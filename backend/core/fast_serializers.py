@@ -0,0 +1,374 @@
+"""
+High-throughput read path for list endpoints.
+
+``FastSerializer`` compiles a DRF ``ModelSerializer`` into a flat list of
+``QuerySet.values()`` lookups with one converter per field, so list
+responses are built from plain dicts instead of model instances and
+per-row serializer machinery. The output is identical to the regular
+serializer; anything the compiler cannot reproduce exactly raises
+``ImproperlyConfigured`` and the viewset falls back to the DRF path.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import relations, serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+ISO_8601 = 'iso-8601'
+
+# Sentinel returned by a column when DRF would have skipped the field
+_SKIP = object()
+
+
+def _identity(value):
+    return value
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+
+    exponent = -field.decimal_places
+    slow = field.to_representation
+
+    def convert(value):
+        # Values read back from a DecimalField column already carry the
+        # column scale, so quantizing them again is a no-op.
+        if value.as_tuple().exponent == exponent:
+            return f'{value:f}'
+        return slow(value)
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    slow = field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return slow(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value.isoformat()
+
+
+def _make_converter(field):
+    """
+    Return a callable mapping a raw ``values()`` value to the field's
+    representation. Called once per response so timezone-aware fields
+    pick up the currently active timezone.
+    """
+    field_type = type(field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        return _date_converter(field)
+    if field_type.to_representation is serializers.CharField.to_representation:
+        return str
+    if field_type.to_representation is serializers.IntegerField.to_representation:
+        return int
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        # ``values()`` already yields the raw foreign key id
+        if field.pk_field is None:
+            return _identity
+        return field.pk_field.to_representation
+    return field.to_representation
+
+
+class _Column:
+    """A single scalar field read from one ``values()`` key."""
+
+    def __init__(self, field, key, guards):
+        self.field = field
+        self.name = field.field_name
+        self.key = key
+        self.guards = guards
+
+    def missing(self):
+        # Mirrors ``Field.get_attribute`` when an intermediate relation is None
+        field = self.field
+        if field.default is not empty:
+            return field.get_default()
+        if field.allow_null:
+            return None
+        if not field.required:
+            return _SKIP
+        raise ImproperlyConfigured(
+            f'Field `{self.name}` cannot be resolved through a null relation.'
+        )
+
+
+class _Nested:
+    """A nested single-object serializer reached through a forward relation."""
+
+    def __init__(self, field, key, guards, plan):
+        self.field = field
+        self.name = field.field_name
+        self.key = key
+        self.guards = guards
+        self.plan = plan
+
+
+class _Many:
+    """A nested ``many=True`` serializer reached through a reverse relation."""
+
+    def __init__(self, field, fk_name, child):
+        self.field = field
+        self.name = field.field_name
+        self.fk_name = fk_name
+        self.child = child
+
+
+class FastSerializer:
+    """
+    Compiled, read-only equivalent of a ``ModelSerializer`` instance.
+    """
+    _cache = {}
+
+    def __init__(self, serializer):
+        meta = getattr(serializer, 'Meta', None)
+        if meta is None or not hasattr(meta, 'model'):
+            raise ImproperlyConfigured(f'{type(serializer).__name__} is not a ModelSerializer.')
+        self.model = meta.model
+        self.lookups = {'pk': None}
+        self.plan = self._compile(serializer, self.model, '')
+
+    @classmethod
+    def for_class(cls, serializer_class):
+        """
+        Return the compiled serializer for ``serializer_class``, or ``None``
+        if it cannot be served from ``values()``.
+        """
+        if serializer_class not in cls._cache:
+            try:
+                cls._cache[serializer_class] = cls(serializer_class())
+            except ImproperlyConfigured:
+                cls._cache[serializer_class] = None
+        return cls._cache[serializer_class]
+
+    def _resolve(self, model, prefix, source_attrs):
+        """
+        Walk ``source_attrs`` through forward relations and reverse
+        one-to-one relations and return the ``values()`` lookup, the final
+        model field and the lookups of any nullable relations crossed on
+        the way.
+        """
+        guards = []
+        path = prefix
+        for index, attr in enumerate(source_attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f'`{attr}` is not a field of {model.__name__}.')
+            path = f'{path}{attr}'
+            last = index == len(source_attrs) - 1
+            if not model_field.concrete:
+                # A missing reverse one-to-one row makes DRF return None for
+                # the field, which is what the LEFT JOIN in values() yields.
+                if last or not model_field.one_to_one:
+                    raise ImproperlyConfigured(f'`{attr}` on {model.__name__} is not a concrete field.')
+                model = model_field.related_model
+                path = f'{path}__'
+                continue
+            if last:
+                return path, model_field, guards
+            if not (model_field.many_to_one or model_field.one_to_one):
+                raise ImproperlyConfigured(f'`{attr}` on {model.__name__} is not a forward relation.')
+            if model_field.null:
+                guards.append(path)
+            model = model_field.related_model
+            path = f'{path}__'
+        raise ImproperlyConfigured('Empty field source.')
+
+    def _compile(self, serializer, model, prefix):
+        plan = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or isinstance(field, (
+                serializers.SerializerMethodField,
+                serializers.HiddenField,
+                relations.HyperlinkedRelatedField,
+                relations.ManyRelatedField,
+            )):
+                raise ImproperlyConfigured(f'Field `{field.field_name}` cannot be compiled.')
+
+            if isinstance(field, serializers.ListSerializer):
+                if prefix or len(field.source_attrs) != 1:
+                    raise ImproperlyConfigured(f'Field `{field.field_name}` cannot be compiled.')
+                try:
+                    relation = model._meta.get_field(field.source)
+                except FieldDoesNotExist:
+                    raise ImproperlyConfigured(f'`{field.source}` is not a relation of {model.__name__}.')
+                if not relation.one_to_many:
+                    raise ImproperlyConfigured(f'`{field.source}` is not a reverse foreign key.')
+                child = FastSerializer(field.child)
+                plan.append(_Many(field, relation.field.name, child))
+                continue
+
+            key, model_field, guards = self._resolve(model, prefix, field.source_attrs)
+            self.lookups[key] = None
+            for guard in guards:
+                self.lookups[guard] = None
+
+            if isinstance(field, serializers.BaseSerializer):
+                if not (model_field.many_to_one or model_field.one_to_one):
+                    raise ImproperlyConfigured(f'`{field.source}` is not a forward relation.')
+                nested_plan = self._compile(field, model_field.related_model, f'{key}__')
+                plan.append(_Nested(field, key, guards, nested_plan))
+            else:
+                plan.append(_Column(field, key, guards))
+        return plan
+
+    def values(self, queryset):
+        """Restrict ``queryset`` to the lookups this serializer reads."""
+        return queryset.values(*self.lookups)
+
+    def _bind(self, plan):
+        bound = []
+        for entry in plan:
+            if isinstance(entry, _Column):
+                bound.append((entry, _make_converter(entry.field)))
+            elif isinstance(entry, _Nested):
+                bound.append((entry, self._bind(entry.plan)))
+            else:
+                bound.append((entry, None))
+        return bound
+
+    def _convert(self, row, bound, children):
+        ret = {}
+        for entry, converter in bound:
+            name = entry.name
+            if isinstance(entry, _Many):
+                ret[name] = children[name].get(row['pk'], [])
+                continue
+            if entry.guards and any(row[guard] is None for guard in entry.guards):
+                value = entry.missing() if isinstance(entry, _Column) else None
+                if value is not _SKIP:
+                    ret[name] = value
+                continue
+            value = row[entry.key]
+            if value is None:
+                ret[name] = None
+            elif isinstance(entry, _Nested):
+                ret[name] = self._convert(row, converter, children)
+            else:
+                ret[name] = converter(value)
+        return ret
+
+    def _fetch_children(self, plan, rows):
+        children = {}
+        many = [entry for entry in plan if isinstance(entry, _Many)]
+        if not many or not rows:
+            return children
+        parent_ids = [row['pk'] for row in rows]
+        for entry in many:
+            child = entry.child
+            ordering = child.model._meta.ordering or ['pk']
+            queryset = child.model._default_manager.filter(
+                **{f'{entry.fk_name}__in': parent_ids}
+            ).order_by(*ordering).values(entry.fk_name, *child.lookups)
+            child_rows = list(queryset)
+            grouped = {}
+            for child_row, data in zip(child_rows, child.serialize_rows(child_rows)):
+                grouped.setdefault(child_row[entry.fk_name], []).append(data)
+            children[entry.name] = grouped
+        return children
+
+    def serialize_rows(self, rows):
+        """Convert rows produced by ``values()`` into representation dicts."""
+        bound = self._bind(self.plan)
+        children = self._fetch_children(self.plan, rows)
+        return [self._convert(row, bound, children) for row in rows]
+
+    async def _afetch_children(self, plan, rows):
+        children = {}
+        many = [entry for entry in plan if isinstance(entry, _Many)]
+        if not many or not rows:
+            return children
+        parent_ids = [row['pk'] for row in rows]
+        for entry in many:
+            child = entry.child
+            ordering = child.model._meta.ordering or ['pk']
+            queryset = child.model._default_manager.filter(
+                **{f'{entry.fk_name}__in': parent_ids}
+            ).order_by(*ordering).values(entry.fk_name, *child.lookups)
+            child_rows = [child_row async for child_row in queryset]
+            grouped = {}
+            for child_row, data in zip(child_rows, await child.aserialize_rows(child_rows)):
+                grouped.setdefault(child_row[entry.fk_name], []).append(data)
+            children[entry.name] = grouped
+        return children
+
+    async def aserialize_rows(self, rows):
+        """``serialize_rows`` for async views: nested lists are read with the async ORM."""
+        bound = self._bind(self.plan)
+        children = await self._afetch_children(self.plan, rows)
+        return [self._convert(row, bound, children) for row in rows]
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving ``list`` through ``FastSerializer``.
+
+    Set ``FAST_LIST_SERIALIZATION = False`` in settings to fall back to the
+    regular serializer everywhere.
+    """
+
+    def get_fast_serializer(self):
+        return FastSerializer.for_class(self.get_serializer_class())
+
+    def serialize_queryset(self, queryset):
+        """
+        Serialize a whole queryset, through ``FastSerializer`` when possible.
+        """
+        fast = self.get_fast_serializer() if settings.FAST_LIST_SERIALIZATION else None
+        if fast is None:
+            return self.get_serializer(queryset, many=True).data
+        return fast.serialize_rows(list(fast.values(queryset)))
+
+    def serialize_queryset_by_pk(self, queryset):
+        """
+        Serialize a whole queryset like ``serialize_queryset``, keyed by
+        primary key, whether or not the serializer outputs it.
+        """
+        fast = self.get_fast_serializer() if settings.FAST_LIST_SERIALIZATION else None
+        if fast is None:
+            instances = list(queryset)
+            return dict(zip(
+                [instance.pk for instance in instances],
+                self.get_serializer(instances, many=True).data,
+            ))
+        rows = list(fast.values(queryset))
+        return dict(zip([row['pk'] for row in rows], fast.serialize_rows(rows)))
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer() if settings.FAST_LIST_SERIALIZATION else None
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize_rows(page))
+
+        return Response(fast.serialize_rows(list(queryset)))
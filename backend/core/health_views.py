@@ -0,0 +1,57 @@
+import time
+import redis
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+
+def check_database():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_broker():
+    client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=1, socket_timeout=1)
+    try:
+        client.ping()
+    finally:
+        client.close()
+
+
+@never_cache
+@require_GET
+def liveness(request):
+    """The process is up and serving requests; no dependency is touched."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def readiness(request):
+    """
+    Whether this instance can take traffic: the database answers and, if
+    HEALTH_CHECK_BROKER is set, the Celery broker does too. Answers 503
+    with the failing checks otherwise.
+    """
+    checks = {'database': check_database}
+    if settings.HEALTH_CHECK_BROKER:
+        checks['broker'] = check_broker
+
+    results = {}
+    healthy = True
+    for name, check in checks.items():
+        start = time.perf_counter()
+        try:
+            check()
+        except Exception as e:
+            healthy = False
+            results[name] = {'status': 'error', 'error': str(e)}
+        else:
+            results[name] = {'status': 'ok', 'ms': round((time.perf_counter() - start) * 1000, 1)}
+
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'checks': results},
+        status=200 if healthy else 503,
+    )
@@ -0,0 +1,35 @@
+"""
+Selection of the JSON library used by the API renderer and parser.
+
+``JSON_BACKEND`` in settings picks the implementation:
+
+- ``auto``: use orjson when it is installed, otherwise the stdlib ``json``
+- ``orjson``: require orjson
+- ``json``: always use the stdlib ``json`` module
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKENDS = ('auto', 'orjson', 'json')
+
+
+def get_orjson():
+    """
+    Return the orjson module if it should be used, or ``None`` to fall
+    back to the stdlib implementation.
+    """
+    backend = getattr(settings, 'JSON_BACKEND', 'auto')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"JSON_BACKEND must be one of {', '.join(BACKENDS)}, got '{backend}'."
+        )
+    if backend == 'json':
+        return None
+    if backend == 'orjson' and orjson is None:
+        raise ImproperlyConfigured("JSON_BACKEND is 'orjson' but orjson is not installed.")
+    return orjson
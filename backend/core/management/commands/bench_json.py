@@ -0,0 +1,163 @@
+import io
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from core.json_backend import orjson
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON encode/decode throughput of the available backends on stock and order payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Number of rows per payload (default: 1000, the max page size)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of timed iterations per payload (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        iterations = options['iterations']
+        random.seed(42)
+
+        payloads = {
+            'stock page': self.stock_page(rows),
+            'sale order page': self.sale_order_page(max(rows // 10, 1)),
+            'dashboard low stock': self.low_stock(rows),
+        }
+        backends = ['json'] + (['orjson'] if orjson is not None else [])
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; only the stdlib backend is measured.'))
+
+        renderer = FastJSONRenderer()
+        parser = FastJSONParser()
+
+        for name, payload in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({rows} rows)'))
+            results = {}
+            for backend in backends:
+                with override_settings(JSON_BACKEND=backend):
+                    body = renderer.render(payload)
+                    encode = self.timed(lambda: renderer.render(payload), iterations)
+                    decode = self.timed(lambda: parser.parse(io.BytesIO(body)), iterations)
+                results[backend] = (encode, decode)
+                size_mb = len(body) / (1024 * 1024)
+                self.stdout.write(
+                    f'  {backend:<7} encode {encode * 1000:8.2f} ms ({size_mb / encode:7.1f} MB/s)   '
+                    f'decode {decode * 1000:8.2f} ms ({size_mb / decode:7.1f} MB/s)   {len(body)} bytes'
+                )
+            if 'orjson' in results:
+                baseline, fast = results['json'], results['orjson']
+                self.stdout.write(self.style.SUCCESS(
+                    f'  speedup encode x{baseline[0] / fast[0]:.1f}, decode x{baseline[1] / fast[1]:.1f}'
+                ))
+
+    def timed(self, func, iterations):
+        func()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
+
+    def money(self, low, high):
+        return f'{Decimal(random.uniform(low, high)).quantize(Decimal("0.01")):f}'
+
+    def timestamp(self):
+        moment = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=random.randint(0, 3 * 10 ** 7))
+        return moment.isoformat().replace('+00:00', 'Z')
+
+    def stock_row(self, index):
+        """A row shaped like StockSerializer output."""
+        return {
+            'id': index,
+            'product_name': f'Product {index % 400} {random.choice(["Tablet", "Syrup", "Capsule"])}',
+            'company_name': f'Company {index % 25}',
+            'batch_number': f'BATCH{index:06d}',
+            'expiry_date': (date(2026, 1, 1) + timedelta(days=index % 900)).isoformat(),
+            'quantity': random.randint(0, 500),
+            'purchase_price': self.money(1, 500),
+            'sale_price': self.money(1, 600),
+            'mrp': self.money(1, 700),
+            'tax': random.choice(['0.00', '5.00', '12.00']),
+            'hsn_code': '30049099',
+            'created_at': self.timestamp(),
+            'updated_at': self.timestamp(),
+            'total_price': self.money(10, 50000),
+            'product': index % 400,
+        }
+
+    def stock_page(self, rows):
+        return {
+            'count': rows * 10,
+            'next': 'http://localhost:8000/api/inventory/stock/?page=2',
+            'previous': None,
+            'results': [self.stock_row(index) for index in range(1, rows + 1)],
+        }
+
+    def sale_order_page(self, orders):
+        """Sale orders shaped like SaleOrderSerializer output, ten lines each."""
+        results = []
+        for order_id in range(1, orders + 1):
+            items = []
+            for line in range(10):
+                stock = self.stock_row(order_id * 10 + line)
+                items.append({
+                    'id': order_id * 10 + line,
+                    'stock': stock['id'],
+                    'stock_details': stock,
+                    'product': stock['product_name'],
+                    'product_id': stock['product'],
+                    'batch_number': stock['batch_number'],
+                    'expiry_date': stock['expiry_date'],
+                    'quantity': random.randint(1, 20),
+                    'purchase_price': stock['purchase_price'],
+                    'sale_price': stock['sale_price'],
+                    'mrp': stock['mrp'],
+                    'tax': stock['tax'],
+                    'hsn_code': stock['hsn_code'],
+                    'total_price': self.money(10, 5000),
+                })
+            results.append({
+                'id': order_id,
+                'customer': order_id % 50,
+                'customer_name': f'Customer {order_id % 50}',
+                'invoice_number': f'SALE-2025-{order_id:04d}',
+                'order_date': '2025-10-19',
+                'status': 'Completed',
+                'total_amount': self.money(100, 50000),
+                'created_at': self.timestamp(),
+                'updated_at': self.timestamp(),
+                'order_items': items,
+            })
+        return {'count': orders, 'next': None, 'previous': None, 'results': results}
+
+    def low_stock(self, rows):
+        """Dashboard payload with native date and float values, as built in dashboard_views."""
+        items = []
+        for index in range(rows):
+            items.append({
+                'id': index,
+                'product_name': f'Product {index}',
+                'company_name': f'Company {index % 25}',
+                'batch_number': f'LOT{index:05d}',
+                'expiry_date': date(2026, 1, 1) + timedelta(days=index % 900),
+                'quantity': random.randint(1, 10),
+                'purchase_price': float(self.money(1, 500)),
+                'sale_price': float(self.money(1, 600)),
+                'mrp': float(self.money(1, 700)),
+                'tax': 5.0,
+                'hsn_code': '30041000',
+            })
+        return {'low_stock_items': items, 'low_stock_count': len(items), 'threshold': 10}
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from .load_test import DEFAULT_PATHS, Command as LoadTest
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests per second of the development server and the gunicorn production profile '
+        '(gunicorn.conf.py) on the current database, e.g. after the insert_* seed commands'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='User the requests authenticate as')
+        parser.add_argument('--password', required=True, help='Password of --username')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Endpoint to request, repeatable (default: dashboard metrics, product list, stock search)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of concurrent keep-alive clients (default: 50)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Total number of requests per endpoint (default: 2000)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8150,
+            help='Local port the servers are started on, one after the other (default: 8150)',
+        )
+
+    def handle(self, *args, **options):
+        address = f"127.0.0.1:{options['port']}"
+        base = urlsplit(f'http://{address}')
+        paths = options['paths'] or DEFAULT_PATHS
+        servers = {
+            'runserver': [sys.executable, 'manage.py', 'runserver', '--noreload', address],
+            'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', address, 'core.wsgi'],
+        }
+        load_test = LoadTest()
+        results = {}
+
+        for name, command in servers.items():
+            env = dict(os.environ, GUNICORN_ACCESS_LOG='')
+            server = subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                self.wait_until_live(base, server)
+                token = load_test.obtain_token(base, options['username'], options['password'])
+                for path in paths:
+                    latencies, errors, elapsed = load_test.run(
+                        base, path, token, options['concurrency'], options['requests'],
+                    )
+                    latencies.sort()
+                    results[name, path] = (
+                        len(latencies) / elapsed,
+                        load_test.percentile(latencies, 50) if latencies else float('nan'),
+                        errors,
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        for path in paths:
+            self.stdout.write(self.style.MIGRATE_HEADING(path))
+            for name in servers:
+                rate, p50, errors = results[name, path]
+                self.stdout.write(f'  {name:<10} {rate:8.1f} req/s   p50 {p50:7.1f} ms   errors {errors}')
+            before, after = results['runserver', path][0], results['gunicorn', path][0]
+            if before:
+                self.stdout.write(self.style.SUCCESS(f'  x{after / before:.1f}'))
+
+    def wait_until_live(self, base, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with code {server.returncode}')
+            try:
+                connection = HTTPConnection(base.hostname, base.port, timeout=1)
+                connection.request('GET', '/health/live/')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f'Server did not come up within {timeout} seconds')
@@ -0,0 +1,145 @@
+import json
+import statistics
+import threading
+import time
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/api/dashboard/metrics/',
+    '/api/inventory/products/?page_size=50',
+    '/api/inventory/stock/?search=a&page_size=50',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure throughput and latency of read endpoints at high concurrency against a running server. '
+        'Run it once against the sync workers (gunicorn core.wsgi) and once against the ASGI application '
+        '(uvicorn core.asgi) with --async-paths to compare them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://localhost:8000',
+            help='Server to load (default: http://localhost:8000)',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Endpoint to request, repeatable (default: dashboard metrics, product list, stock search)',
+        )
+        parser.add_argument(
+            '--async-paths',
+            action='store_true',
+            help='Request the /api/async/ variants of the default endpoints',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Number of concurrent keep-alive clients (default: 200)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=5000,
+            help='Total number of requests per endpoint (default: 5000)',
+        )
+        parser.add_argument('--token', help='Access token (default: obtained with --username/--password)')
+        parser.add_argument('--username', help='User to obtain an access token for')
+        parser.add_argument('--password', help='Password of --username')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1')
+
+        base = urlsplit(options['base_url'])
+        token = options['token'] or self.obtain_token(base, options['username'], options['password'])
+        paths = options['paths'] or [
+            path.replace('/api/', '/api/async/', 1) if options['async_paths'] else path
+            for path in DEFAULT_PATHS
+        ]
+
+        for path in paths:
+            latencies, errors, elapsed = self.run(base, path, token, options['concurrency'], options['requests'])
+            self.stdout.write(self.style.MIGRATE_HEADING(path))
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f'  all {errors} requests failed'))
+                continue
+            latencies.sort()
+            self.stdout.write(
+                f'  {len(latencies) / elapsed:8.1f} req/s   '
+                f'p50 {self.percentile(latencies, 50):7.1f} ms   '
+                f'p95 {self.percentile(latencies, 95):7.1f} ms   '
+                f'p99 {self.percentile(latencies, 99):7.1f} ms   '
+                f'mean {statistics.fmean(latencies):7.1f} ms   errors {errors}'
+            )
+
+    def connect(self, base):
+        connection_class = HTTPSConnection if base.scheme == 'https' else HTTPConnection
+        return connection_class(base.hostname, base.port, timeout=60)
+
+    def obtain_token(self, base, username, password):
+        if not (username and password):
+            raise CommandError('Pass --token, or --username and --password to obtain one')
+        connection = self.connect(base)
+        connection.request(
+            'POST', '/api/token/', body=json.dumps({'username': username, 'password': password}),
+            headers={'Content-Type': 'application/json'},
+        )
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        if response.status != 200:
+            raise CommandError(f'Could not obtain a token: HTTP {response.status} {body[:200]!r}')
+        return json.loads(body)['access']
+
+    def run(self, base, path, token, concurrency, total):
+        """Send ``total`` GETs from ``concurrency`` keep-alive clients; return latencies in ms."""
+        headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+        remaining = iter(range(total))
+        lock = threading.Lock()
+        latencies = []
+        errors = [0]
+
+        def client():
+            connection = self.connect(base)
+            local, failed = [], 0
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                        continue
+                except (OSError, HTTPException):
+                    failed += 1
+                    connection.close()
+                    connection = self.connect(base)
+                    continue
+                local.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=client) for _ in range(min(concurrency, total))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.perf_counter() - start
+
+    def percentile(self, ordered, percent):
+        index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from purchase.models import DailyPurchaseRollup, PurchaseOrder
+from sale.models import DailySalesRollup, SaleOrder
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily sales and purchase rollups from order items, one date chunk per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First order date to rebuild (YYYY-MM-DD, default: earliest order)',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last order date to rebuild (YYYY-MM-DD, default: today)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days recomputed per transaction (default: 31)',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        end = options['end'] or date.today()
+        start = options['start']
+        if start is None:
+            earliest = [
+                value for value in (
+                    SaleOrder.objects.aggregate(first=Min('order_date'))['first'],
+                    PurchaseOrder.objects.aggregate(first=Min('order_date'))['first'],
+                )
+                if value is not None
+            ]
+            if not earliest:
+                self.stdout.write(self.style.WARNING('No orders found, nothing to rebuild.'))
+                return
+            start = min(earliest)
+
+        chunk = timedelta(days=options['chunk_days'])
+        sales_rows = purchase_rows = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + chunk - timedelta(days=1), end)
+            sales_rows += len(DailySalesRollup.rebuild(chunk_start, chunk_end))
+            purchase_rows += len(DailyPurchaseRollup.rebuild(chunk_start, chunk_end))
+            self.stdout.write(f'Rebuilt {chunk_start} to {chunk_end}')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully rebuilt {sales_rows} sales and {purchase_rows} purchase rollup rows '
+            f'from {start} to {end}.'
+        ))
@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = 'Publish pending order completion events from the outbox to Celery'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help=f'Events published per transaction (default: {settings.OUTBOX_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.OUTBOX_POLL_INTERVAL,
+            help=f'Seconds to wait when the outbox is empty or the broker fails (default: {settings.OUTBOX_POLL_INTERVAL})',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the pending events once and exit instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        total = 0
+        while True:
+            dispatched, failed = OutboxEvent.relay(options['batch_size'])
+            total += dispatched
+            if dispatched:
+                self.stdout.write(f'Relayed {dispatched} events')
+            if dispatched == options['batch_size'] and not failed:
+                continue
+
+            if options['once']:
+                break
+            if not dispatched:
+                OutboxEvent.purge(settings.OUTBOX_RETENTION_DAYS)
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully relayed {total} events.'))
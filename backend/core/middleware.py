@@ -0,0 +1,138 @@
+from functools import wraps
+from hashlib import blake2b
+from inspect import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses negotiated through ``Accept-Encoding``.
+
+    Only bodies of at least ``COMPRESSION_MIN_SIZE`` bytes are compressed.
+    Brotli is preferred when the ``brotli`` package is installed, gzip is
+    used otherwise. Responses of views decorated with ``reuse_compressed``
+    keep their compressed bodies in the cache keyed by a digest of the
+    uncompressed body, so a hot response (the same cached report served
+    again) is hashed instead of recompressed; all others are compressed
+    directly. Streaming responses are gzipped on the fly as by
+    ``GZipMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.cache_timeout = settings.COMPRESSION_CACHE_TIMEOUT
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def process_response(self, request, response):
+        # Event streams must reach the client event by event
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+
+        if response.streaming:
+            return super().process_response(request, response)
+
+        # It's not worth attempting to compress short responses.
+        if len(response.content) < self.min_size:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if getattr(response, 'reuse_compressed', False):
+            compressed_content = self.compress(response.content, encoding)
+        else:
+            compressed_content = self._compress(response.content, encoding)
+        # Return the compressed content only if it's actually shorter.
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(compressed_content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+    def negotiate(self, accept_encoding):
+        """
+        Pick the preferred supported encoding the client accepts, honouring
+        q-values (``gzip;q=0`` refuses gzip, ``*`` matches unlisted codings).
+        """
+        accepted = {}
+        for part in accept_encoding.split(','):
+            coding, _, params = part.partition(';')
+            coding = coding.strip().lower()
+            if not coding:
+                continue
+            quality = 1.0
+            for param in params.split(';'):
+                name, _, value = param.partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            accepted[coding] = quality
+
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+                return encoding
+        return None
+
+    def compress(self, content, encoding):
+        if not self.cache_timeout:
+            return self._compress(content, encoding)
+
+        cache = caches[settings.COMPRESSION_CACHE_ALIAS]
+        key = f'compressed:{encoding}:{len(content)}:{blake2b(content, digest_size=20).hexdigest()}'
+        compressed_content = cache.get(key)
+        if compressed_content is None:
+            compressed_content = self._compress(content, encoding)
+            cache.set(key, compressed_content, self.cache_timeout)
+        return compressed_content
+
+    def _compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=5)
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
+
+
+def reuse_compressed(view):
+    """
+    Let ``CompressionMiddleware`` reuse the compressed bodies of ``view``,
+    for views serving from ``report_cache`` or ``dashboard_cache`` whose
+    bodies repeat until the cache is invalidated.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            response.reuse_compressed = True
+            return response
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        response.reuse_compressed = True
+        return response
+    return wrapper
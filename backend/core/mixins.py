@@ -0,0 +1,103 @@
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from .db_router import SAFE_METHODS, read_from_replica
+
+
+class BatchFetchMixin:
+    """
+    Fetch a specific set of rows in one request.
+
+    - ``GET /<resource>/?ids=1,2,3`` on the list endpoint
+    - ``POST /<resource>/batch/`` with ``{"ids": [1, 2, 3]}`` for large sets
+
+    Both run a single ``pk IN (...)`` query on the viewset's queryset (so its
+    ``select_related`` applies), skip pagination and return the rows in the
+    requested order together with the ids that were not found. Meant to be
+    combined with ``FastListMixin``, which provides
+    ``serialize_queryset_by_pk``.
+    """
+    batch_max_ids = 1000
+
+    # Viewsets documenting their own list action repeat this parameter
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter(
+            'ids',
+            openapi.IN_QUERY,
+            description="Comma separated IDs to fetch in one request (disables pagination)",
+            type=openapi.TYPE_STRING
+        ),
+    ])
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.batch_response(request.query_params['ids'].split(','))
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve several records by id in one request. "
+                              "Equivalent to GET on the list endpoint with ?ids=1,2,3",
+        operation_summary="Batch Fetch by IDs",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['ids'],
+            properties={
+                'ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description="Record IDs (max 1000)"
+                )
+            }
+        ),
+        responses={
+            200: openapi.Response(description="Records retrieved successfully"),
+            400: openapi.Response(description="Invalid or too many ids"),
+            401: openapi.Response(description="Authentication required")
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        ids = request.data.get('ids') if hasattr(request.data, 'get') else None
+        if not isinstance(ids, list):
+            raise ValidationError({'ids': 'Expected a list of ids.'})
+        return self.batch_response(ids)
+
+    def get_batch_ids(self, raw_ids):
+        try:
+            ids = [int(value) for value in raw_ids if str(value).strip()]
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'Ids must be integers.'})
+        # Keep the first occurrence of each id, in request order
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise ValidationError({'ids': 'At least one id is required.'})
+        if len(ids) > self.batch_max_ids:
+            raise ValidationError({'ids': f'At most {self.batch_max_ids} ids can be fetched at once.'})
+        return ids
+
+    def batch_response(self, raw_ids):
+        ids = self.get_batch_ids(raw_ids)
+        queryset = self.get_queryset().filter(pk__in=ids).order_by()
+        by_id = self.serialize_queryset_by_pk(queryset)
+        return Response({
+            'count': len(by_id),
+            'results': [by_id[pk] for pk in ids if pk in by_id],
+            'missing': [pk for pk in ids if pk not in by_id],
+        })
+
+
+class ReplicaReadMixin:
+    """
+    Serve the safe requests of ``replica_actions`` from a read replica, see
+    ``core.db_router``. Actions that must see the latest writes stay on the
+    primary.
+    """
+    replica_actions = ('list',)
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if request.method in SAFE_METHODS and action in self.replica_actions:
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -1,4 +1,11 @@
-from django.db import models
+import time
+from copy import copy
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
 class CompanySettings(models.Model):
     """
@@ -18,39 +25,159 @@ class CompanySettings(models.Model):
     class Meta:
         verbose_name = "Company Settings"
         verbose_name_plural = "Company Settings"
+
+    CACHE_KEY = 'company_settings'
+    # (loaded at, instance), see get_company_settings
+    _local_copy = None
     
     def save(self, *args, **kwargs):
         # Ensure only one instance exists (singleton pattern)
-        if not self.pk and CompanySettings.objects.exists():
-            # If this is a new instance and one already exists, update the existing one
-            existing = CompanySettings.objects.first()
-            existing.company_name = self.company_name
-            existing.owner_name = self.owner_name
-            existing.email = self.email
-            existing.phone_number = self.phone_number
-            existing.address = self.address
-            existing.drug_license_number = self.drug_license_number
-            existing.gst_number = self.gst_number
-            existing.save()
-            return existing
+        if not self.pk:
+            existing = CompanySettings.objects.order_by('pk').first()
+            if existing is not None:
+                # If this is a new instance and one already exists, update the existing one
+                existing.company_name = self.company_name
+                existing.owner_name = self.owner_name
+                existing.email = self.email
+                existing.phone_number = self.phone_number
+                existing.address = self.address
+                existing.drug_license_number = self.drug_license_number
+                existing.gst_number = self.gst_number
+                existing.save()
+                return existing
         super().save(*args, **kwargs)
-    
+        self.invalidate_cache_on_commit()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.invalidate_cache_on_commit()
+        return result
+
     @classmethod
     def get_company_settings(cls):
-        """Get or create company settings instance"""
-        obj, created = cls.objects.get_or_create(
-            pk=1,
-            defaults={
-                'company_name': 'Your Company Name',
-                'owner_name': '',
-                'email': '',
-                'phone_number': '',
-                'address': '',
-                'drug_license_number': '',
-                'gst_number': ''
-            }
-        )
-        return obj
+        """
+        Get or create company settings instance.
+
+        Read from a copy kept in this process for
+        COMPANY_SETTINGS_LOCAL_TIMEOUT seconds, then from the shared cache,
+        so reads cost no query. Saving through the model invalidates both;
+        other processes see the change once their copy expires. Each call
+        returns a fresh copy that callers may modify.
+        """
+        cached = cls._local_copy
+        if cached is None or time.monotonic() - cached[0] >= settings.COMPANY_SETTINGS_LOCAL_TIMEOUT:
+            cache = caches[settings.CACHE_ALIAS]
+            obj = cache.get(cls.CACHE_KEY)
+            if obj is None:
+                obj, created = cls.objects.get_or_create(
+                    pk=1,
+                    defaults={
+                        'company_name': 'Your Company Name',
+                        'owner_name': '',
+                        'email': '',
+                        'phone_number': '',
+                        'address': '',
+                        'drug_license_number': '',
+                        'gst_number': ''
+                    }
+                )
+                cache.set(cls.CACHE_KEY, obj, None)
+            cached = cls._local_copy = (time.monotonic(), obj)
+        return copy(cached[1])
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls._local_copy = None
+        caches[settings.CACHE_ALIAS].delete(cls.CACHE_KEY)
+
+    @classmethod
+    def invalidate_cache_on_commit(cls):
+        # Now for this transaction, and after commit in case a concurrent
+        # read cached the old row in between
+        cls.invalidate_cache()
+        transaction.on_commit(cls.invalidate_cache)
     
     def __str__(self):
-        return f"Company Settings: {self.company_name}"
\ No newline at end of file
+        return f"Company Settings: {self.company_name}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Order completion waiting to be handed to Celery (transactional outbox).
+
+    Orders write the event in the same transaction as their status change,
+    so the request never talks to the broker and a completed order cannot
+    lose its stock update. The relay_outbox command drains pending events
+    in batches; the stock tasks are idempotent, so an event published twice
+    is harmless.
+    """
+    KIND_CHOICES = [
+        ('purchase', 'Purchase order completed'),
+        ('sale', 'Sale order completed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    order_id = models.PositiveBigIntegerField()
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The relay only ever scans pending events, oldest first
+            models.Index(fields=['id'], condition=Q(dispatched_at__isnull=True), name='outbox_pending_idx'),
+            models.Index(fields=['dispatched_at'], name='outbox_dispatched_at_idx'),
+        ]
+
+    @classmethod
+    def relay(cls, batch_size):
+        """
+        Publish up to ``batch_size`` pending events and return
+        ``(dispatched, failed)`` counts.
+
+        Rows are locked with SKIP LOCKED, so several relays can run side by
+        side. Publishing stops at the first broker error; the failed event
+        keeps its place and is retried on the next call.
+
+        Delivery is at least once: events are published while their rows are
+        locked and only marked dispatched when the transaction commits, so
+        if the commit fails after publishing they are published again by the
+        next call. The stock tasks record every applied line and skip it
+        when it comes again.
+        """
+        from inventory.tasks import dispatch_stock_update
+
+        with transaction.atomic():
+            events = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(dispatched_at__isnull=True)
+                .order_by('id')[:batch_size]
+            )
+            dispatched = []
+            failed = 0
+            for event in events:
+                try:
+                    dispatch_stock_update(event.kind, event.order_id)
+                except Exception as e:
+                    print(f" [!] Could not relay {event.kind} order {event.order_id}: {e}")
+                    cls.objects.filter(pk=event.pk).update(attempts=F('attempts') + 1, last_error=str(e))
+                    failed = 1
+                    break
+                dispatched.append(event.pk)
+            if dispatched:
+                cls.objects.filter(pk__in=dispatched).update(
+                    dispatched_at=timezone.now(), attempts=F('attempts') + 1, last_error='',
+                )
+        return len(dispatched), failed
+
+    @classmethod
+    def purge(cls, retention_days):
+        """Delete events dispatched more than ``retention_days`` ago."""
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        deleted, _ = cls.objects.filter(dispatched_at__lt=cutoff).delete()
+        return deleted
+
+    def __str__(self):
+        state = 'dispatched' if self.dispatched_at else 'pending'
+        return f"{self.kind} order {self.order_id} - {state}"
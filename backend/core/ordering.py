@@ -0,0 +1,44 @@
+"""
+Helpers for the ``valid_orderings`` whitelists declared on the viewsets.
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+
+def with_id_tiebreaker(ordering):
+    """
+    Append ``id`` in the same direction as ``ordering`` so pages are stable
+    and the database can walk an ``(<field>, id)`` index in either direction.
+    """
+    if ordering.lstrip('-') in ('id', 'pk'):
+        return (ordering,)
+    return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+def ordering_has_index(model, ordering):
+    """
+    Return True if ``ordering`` is backed by an index on ``model``: the
+    primary key, a unique or ``db_index`` column, or the leading column of
+    a ``Meta.indexes`` entry or unique constraint.
+
+    Orderings across a relation (``product__name``) are never counted as
+    indexed: an index on the related table cannot drive the sort of a join,
+    so they have to be accepted in ``unindexed_orderings``.
+    """
+    name = ordering.lstrip('-')
+    if '__' in name:
+        return False
+
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    if field.primary_key or field.unique or getattr(field, 'db_index', False):
+        return True
+
+    leading_fields = [index.fields[0].lstrip('-') for index in model._meta.indexes if index.fields]
+    leading_fields += [
+        constraint.fields[0]
+        for constraint in model._meta.constraints
+        if getattr(constraint, 'fields', None) and getattr(constraint, 'condition', None) is None
+    ]
+    return field.name in leading_fields
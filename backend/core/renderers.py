@@ -0,0 +1,42 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+from .json_backend import get_orjson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that encodes with orjson when available.
+
+    Output matches ``JSONRenderer``: compact separators, non-ASCII left
+    unescaped, U+2028/U+2029 escaped, and every type orjson does not
+    handle natively (Decimal, datetime, date, time, lazy strings...)
+    goes through DRF's ``JSONEncoder``. Indented output, non-default
+    ``UNICODE_JSON``/``COMPACT_JSON`` settings and anything orjson
+    refuses to encode are rendered by the stdlib path.
+
+    Note that orjson writes NaN and Infinity as ``null`` where the strict
+    stdlib encoder raises.
+    """
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        orjson = get_orjson()
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as the stdlib renderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
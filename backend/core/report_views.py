@@ -0,0 +1,428 @@
+import csv
+from datetime import date
+from decimal import Decimal
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.http import StreamingHttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from purchase.models import DailyPurchaseRollup, PurchaseOrderItem
+from sale.models import DailySalesRollup, SaleOrderItem
+from .cache import report_cache
+from .db_router import replica_reads
+from .middleware import reuse_compressed
+
+PERIODS = {
+    'day': None,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+
+
+def report_parameters(group_choices):
+    return [
+        openapi.Parameter(
+            'start_date',
+            openapi.IN_QUERY,
+            description="First day of the report (YYYY-MM-DD, default: 1 January of the current year)",
+            type=openapi.TYPE_STRING,
+            format='date'
+        ),
+        openapi.Parameter(
+            'end_date',
+            openapi.IN_QUERY,
+            description="Last day of the report (YYYY-MM-DD, default: today)",
+            type=openapi.TYPE_STRING,
+            format='date'
+        ),
+        openapi.Parameter(
+            'period',
+            openapi.IN_QUERY,
+            description="Bucket size of each row (default: month)",
+            type=openapi.TYPE_STRING,
+            enum=list(PERIODS)
+        ),
+        openapi.Parameter(
+            'group_by',
+            openapi.IN_QUERY,
+            description="Split each period by this dimension",
+            type=openapi.TYPE_STRING,
+            enum=list(group_choices)
+        ),
+    ]
+
+
+def parse_date_range(request):
+    """
+    Read ``start_date`` and ``end_date`` from the query string.
+    Raises ValueError with a message suitable for the API response.
+    """
+    today = date.today()
+    try:
+        start_date = date.fromisoformat(request.GET.get('start_date', today.replace(month=1, day=1).isoformat()))
+        end_date = date.fromisoformat(request.GET.get('end_date', today.isoformat()))
+    except ValueError:
+        raise ValueError('Invalid date. Use the YYYY-MM-DD format.')
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date.')
+    return start_date, end_date
+
+
+def cached_report(request, name, compute):
+    """Serve a report from ``report_cache``, keyed by its query parameters."""
+    return report_cache.get_or_compute((name, sorted(request.GET.lists())), compute)
+
+
+def rollup_report(request, queryset, group_choices, metrics):
+    """
+    Aggregate a rollup ``queryset`` into period buckets, optionally split
+    by one of ``group_choices`` (a mapping of name to ``values()`` fields).
+    """
+    start_date, end_date = parse_date_range(request)
+    period = request.GET.get('period', 'month')
+    if period not in PERIODS:
+        raise ValueError(f"Invalid period. Choose one of: {', '.join(PERIODS)}.")
+    group_by = request.GET.get('group_by')
+    if group_by is not None and group_by not in group_choices:
+        raise ValueError(f"Invalid group_by. Choose one of: {', '.join(group_choices)}.")
+
+    queryset = queryset.filter(date__range=(start_date, end_date))
+    truncate = PERIODS[period]
+    if truncate is not None:
+        queryset = queryset.annotate(bucket=truncate('date'))
+        bucket = 'bucket'
+    else:
+        bucket = 'date'
+
+    group_fields = list(group_choices[group_by]) if group_by else []
+    totals = {metric: Sum(metric) for metric in metrics}
+    rows = (
+        queryset.values(bucket, *group_fields)
+        .annotate(**{f'total_{metric}': aggregate for metric, aggregate in totals.items()})
+        # Name before id, so rows within a period read alphabetically
+        .order_by(bucket, *reversed(group_fields))
+    )
+
+    results = []
+    for row in rows:
+        result = {'period': row[bucket].isoformat()}
+        for field in group_fields:
+            result[field.replace('__', '_')] = row[field]
+        for metric in metrics:
+            result[metric] = row[f'total_{metric}']
+        results.append(result)
+
+    grand_total = queryset.aggregate(**totals)
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'period': period,
+        'group_by': group_by,
+        'results': results,
+        'totals': {metric: grand_total[metric] or 0 for metric in metrics},
+    }
+
+
+SALES_GROUPS = {
+    'product': ('product_id', 'product__name'),
+    'customer': ('customer_id', 'customer__name'),
+}
+SALES_METRICS = ['quantity', 'revenue', 'tax', 'margin', 'line_count']
+
+PURCHASE_GROUPS = {
+    'product': ('product_id', 'product__name'),
+    'supplier': ('supplier_id', 'supplier__name'),
+}
+PURCHASE_METRICS = ['quantity', 'amount', 'tax', 'line_count']
+
+
+@reuse_compressed
+@replica_reads
+@swagger_auto_schema(
+    method='get',
+    operation_description="Sales totals per day, month or year, read from the daily sales rollups",
+    operation_summary="Sales Report",
+    tags=['Reports'],
+    manual_parameters=report_parameters(SALES_GROUPS),
+    responses={
+        200: openapi.Response(
+            description="Sales report generated successfully",
+            examples={
+                "application/json": {
+                    "start_date": "2025-01-01",
+                    "end_date": "2025-12-31",
+                    "period": "month",
+                    "group_by": "product",
+                    "results": [
+                        {
+                            "period": "2025-10-01",
+                            "product_id": 1,
+                            "product_name": "Paracetamol 500mg",
+                            "quantity": 120,
+                            "revenue": "1800.00",
+                            "tax": "90.00",
+                            "margin": "540.00",
+                            "line_count": 14
+                        }
+                    ],
+                    "totals": {
+                        "quantity": 120,
+                        "revenue": "1800.00",
+                        "tax": "90.00",
+                        "margin": "540.00",
+                        "line_count": 14
+                    }
+                }
+            }
+        ),
+        400: openapi.Response(description="Invalid query parameters"),
+        401: openapi.Response(description="Authentication required")
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_report(request):
+    """
+    Get sales quantity, revenue, tax and margin for a date range
+    """
+    try:
+        report = cached_report(request, 'sales', lambda: rollup_report(
+            request, DailySalesRollup.objects.all(), SALES_GROUPS, SALES_METRICS,
+        ))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report, status=status.HTTP_200_OK)
+
+
+@reuse_compressed
+@replica_reads
+@swagger_auto_schema(
+    method='get',
+    operation_description="Purchase totals per day, month or year, read from the daily purchase rollups",
+    operation_summary="Purchase Report",
+    tags=['Reports'],
+    manual_parameters=report_parameters(PURCHASE_GROUPS),
+    responses={
+        200: openapi.Response(
+            description="Purchase report generated successfully",
+            examples={
+                "application/json": {
+                    "start_date": "2025-01-01",
+                    "end_date": "2025-12-31",
+                    "period": "year",
+                    "group_by": "supplier",
+                    "results": [
+                        {
+                            "period": "2025-01-01",
+                            "supplier_id": 3,
+                            "supplier_name": "MediSupply",
+                            "quantity": 4000,
+                            "amount": "52000.00",
+                            "tax": "2600.00",
+                            "line_count": 310
+                        }
+                    ],
+                    "totals": {
+                        "quantity": 4000,
+                        "amount": "52000.00",
+                        "tax": "2600.00",
+                        "line_count": 310
+                    }
+                }
+            }
+        ),
+        400: openapi.Response(description="Invalid query parameters"),
+        401: openapi.Response(description="Authentication required")
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def purchase_report(request):
+    """
+    Get purchase quantity, amount and tax for a date range
+    """
+    try:
+        report = cached_report(request, 'purchases', lambda: rollup_report(
+            request, DailyPurchaseRollup.objects.all(), PURCHASE_GROUPS, PURCHASE_METRICS,
+        ))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report, status=status.HTTP_200_OK)
+
+
+GST_COLUMNS = ['direction', 'hsn_code', 'tax_rate', 'line_count', 'quantity', 'taxable_value', 'tax_amount', 'invoice_value']
+
+
+def gst_summary(queryset, hsn_field, rate_field, price_field):
+    """
+    Group completed order lines by HSN code and tax rate in one query.
+
+    Taxable value is quantity times the unit price before tax; the tax
+    amount is the difference to the stored line total, so the summary
+    adds up to the invoice totals.
+    """
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return (
+        queryset
+        .values(hsn=F(hsn_field), rate=F(rate_field))
+        .annotate(
+            total_lines=Count('id'),
+            total_quantity=Sum('quantity'),
+            total_taxable=Sum(ExpressionWrapper(F('quantity') * F(price_field), output_field=money)),
+            total_invoice=Sum('total_price'),
+        )
+        .order_by(F('hsn').asc(nulls_first=True), 'rate')
+    )
+
+
+def iter_gst_rows(start_date, end_date, direction):
+    """Yield one summary dict per direction, HSN code and tax rate."""
+    cent = Decimal('0.01')
+    sources = {
+        'sales': lambda: gst_summary(
+            SaleOrderItem.objects.filter(
+                sale_order__status='Completed',
+                sale_order__order_date__range=(start_date, end_date),
+            ),
+            'stock__hsn_code', 'tax_rate', 'unit_price',
+        ),
+        'purchases': lambda: gst_summary(
+            PurchaseOrderItem.objects.filter(
+                purchase_order__status='Completed',
+                purchase_order__order_date__range=(start_date, end_date),
+            ),
+            'hsn_code', 'tax', 'purchase_price',
+        ),
+    }
+    for name, summary in sources.items():
+        if direction not in ('all', name):
+            continue
+        # iterator() streams the grouped rows instead of caching them
+        for row in summary().iterator(chunk_size=2000):
+            taxable_value = row['total_taxable'].quantize(cent)
+            invoice_value = row['total_invoice'].quantize(cent)
+            yield {
+                'direction': name,
+                'hsn_code': row['hsn'] or '',
+                'tax_rate': row['rate'].quantize(cent),
+                'line_count': row['total_lines'],
+                'quantity': row['total_quantity'],
+                'taxable_value': taxable_value,
+                'tax_amount': invoice_value - taxable_value,
+                'invoice_value': invoice_value,
+            }
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def stream_gst_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(GST_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] for column in GST_COLUMNS])
+
+
+@reuse_compressed
+@replica_reads
+@swagger_auto_schema(
+    method='get',
+    operation_description="HSN-wise GST summary of completed sales and purchases: taxable value and tax "
+                          "per HSN code and tax rate for a date range. Use export=csv to stream a CSV file.",
+    operation_summary="GST Summary by HSN",
+    tags=['Reports'],
+    manual_parameters=[
+        openapi.Parameter(
+            'start_date',
+            openapi.IN_QUERY,
+            description="First order date (YYYY-MM-DD, default: 1 January of the current year)",
+            type=openapi.TYPE_STRING,
+            format='date'
+        ),
+        openapi.Parameter(
+            'end_date',
+            openapi.IN_QUERY,
+            description="Last order date (YYYY-MM-DD, default: today)",
+            type=openapi.TYPE_STRING,
+            format='date'
+        ),
+        openapi.Parameter(
+            'direction',
+            openapi.IN_QUERY,
+            description="Outward supplies (sales), inward supplies (purchases) or both (default: all)",
+            type=openapi.TYPE_STRING,
+            enum=['all', 'sales', 'purchases']
+        ),
+        openapi.Parameter(
+            'export',
+            openapi.IN_QUERY,
+            description="Set to csv to download the summary as a streamed CSV file",
+            type=openapi.TYPE_STRING,
+            enum=['csv']
+        ),
+    ],
+    responses={
+        200: openapi.Response(
+            description="GST summary generated successfully",
+            examples={
+                "application/json": {
+                    "start_date": "2025-04-01",
+                    "end_date": "2026-03-31",
+                    "direction": "all",
+                    "results": [
+                        {
+                            "direction": "sales",
+                            "hsn_code": "30049099",
+                            "tax_rate": "12.00",
+                            "line_count": 420,
+                            "quantity": 3150,
+                            "taxable_value": "47250.00",
+                            "tax_amount": "5670.00",
+                            "invoice_value": "52920.00"
+                        }
+                    ]
+                }
+            }
+        ),
+        400: openapi.Response(description="Invalid query parameters"),
+        401: openapi.Response(description="Authentication required")
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def gst_report(request):
+    """
+    Get taxable value and tax per HSN code and rate for a date range
+    """
+    try:
+        start_date, end_date = parse_date_range(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    direction = request.GET.get('direction', 'all')
+    if direction not in ('all', 'sales', 'purchases'):
+        return Response(
+            {'error': 'Invalid direction. Choose one of: all, sales, purchases.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if request.GET.get('export') == 'csv':
+        rows = iter_gst_rows(start_date, end_date, direction)
+        response = StreamingHttpResponse(stream_gst_csv(rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="gst-summary-{start_date}-{end_date}.csv"'
+        return response
+
+    return Response(cached_report(request, 'gst', lambda: {
+        'start_date': start_date,
+        'end_date': end_date,
+        'direction': direction,
+        'results': list(iter_gst_rows(start_date, end_date, direction)),
+    }), status=status.HTTP_200_OK)
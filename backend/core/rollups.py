@@ -0,0 +1,43 @@
+"""
+Deferred refresh of the daily sales and purchase rollups.
+"""
+from django.db import transaction
+
+
+def refresh_on_commit(rollup, keys):
+    """
+    Refresh the ``keys`` of the ``rollup`` model once the current
+    transaction commits.
+
+    The keys touched in one transaction are collected and refreshed
+    together, so an order saved line by line is aggregated once.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    connection = transaction.get_connection()
+    pending_refreshes = getattr(connection, 'pending_rollup_refreshes', None)
+    if pending_refreshes is None:
+        pending_refreshes = connection.pending_rollup_refreshes = {}
+    pending = pending_refreshes.get(rollup)
+    # Reuse the callback of this transaction, unless it has run or its
+    # transaction or savepoint has ended since
+    if pending is not None and not pending.done and any(callback is pending for _, callback, _ in connection.run_on_commit):
+        pending.keys.update(keys)
+        return
+    pending = pending_refreshes[rollup] = PendingRollupRefresh(rollup, keys)
+    transaction.on_commit(pending)
+
+
+class PendingRollupRefresh:
+    """Rollup keys touched in the current transaction, refreshed on commit."""
+
+    def __init__(self, rollup, keys):
+        self.rollup = rollup
+        self.keys = set(keys)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        self.rollup.refresh(self.keys)
@@ -9,6 +9,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         # Add custom claims
         token['username'] = user.username
+        # Read by StatelessJWTAuthentication instead of loading the user
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
         # ...
 
         return token
@@ -12,7 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from environ import Env
 import os
+from copy import deepcopy
 from datetime import timedelta
+from celery.schedules import crontab
+from kombu import Exchange, Queue
 
 env = Env()
 env.read_env()
@@ -56,6 +59,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,12 +71,70 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+# Cache: Redis when CACHE_REDIS_URL is set, shared by every worker, or a
+# memory cache per process otherwise. Keys are prefixed with CACHE_KEY_PREFIX
+# so several deployments can share one Redis
+CACHE_REDIS_URL = env.str("CACHE_REDIS_URL", default="")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache" if CACHE_REDIS_URL
+        else "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": CACHE_REDIS_URL or "default",
+        "KEY_PREFIX": env.str("CACHE_KEY_PREFIX", default="ims"),
+        "TIMEOUT": env.int("CACHE_DEFAULT_TIMEOUT", default=300),
+    }
+}
+CACHE_ALIAS = "default"
+# Seconds dashboard metrics and reports are cached, 0 disables (see core/cache.py).
+# Reports are also invalidated whenever the sales and purchase rollups change
+DASHBOARD_CACHE_TIMEOUT = env.int("DASHBOARD_CACHE_TIMEOUT", default=30)
+REPORT_CACHE_TIMEOUT = env.int("REPORT_CACHE_TIMEOUT", default=300)
+# Expired values are served for this many more seconds while one worker
+# recomputes them; workers without any value wait up to CACHE_WAIT_TIMEOUT
+CACHE_STALE_TIMEOUT = env.int("CACHE_STALE_TIMEOUT", default=60)
+CACHE_WAIT_TIMEOUT = env.float("CACHE_WAIT_TIMEOUT", default=5.0)
+# Recomputation lock, released early once the value is stored
+CACHE_LOCK_TIMEOUT = env.int("CACHE_LOCK_TIMEOUT", default=30)
+# Seconds each process reuses its copy of CompanySettings before checking
+# the shared cache again, i.e. how long other workers may show old details
+COMPANY_SETTINGS_LOCAL_TIMEOUT = env.int("COMPANY_SETTINGS_LOCAL_TIMEOUT", default=5)
+
+# Response compression: minimum body size in bytes, and how long compressed
+# bodies of reuse_compressed views (cached reports and dashboard) are kept in
+# the cache so repeated responses are not recompressed
+COMPRESSION_MIN_SIZE = env.int("COMPRESSION_MIN_SIZE", default=1024)
+COMPRESSION_CACHE_ALIAS = env.str("COMPRESSION_CACHE_ALIAS", default="default")
+COMPRESSION_CACHE_TIMEOUT = env.int("COMPRESSION_CACHE_TIMEOUT", default=300)
+
+# Authenticate API requests from the signed claims of the access token
+# instead of loading the user on every request, see core/authentication.py.
+# Revocations are kept in the cache, so use a shared one (CACHE_REDIS_URL)
+JWT_STATELESS_AUTH = env.bool("JWT_STATELESS_AUTH", default=False)
+# Seconds the user is cached for permission checks in that mode
+JWT_USER_CACHE_TIMEOUT = env.int("JWT_USER_CACHE_TIMEOUT", default=60)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'core.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# JSON library for API responses and requests: auto, orjson or json
+JSON_BACKEND = env.str("JSON_BACKEND", default="auto")
+
+# Serve list endpoints from QuerySet.values() instead of model instances
+FAST_LIST_SERIALIZATION = env.bool("FAST_LIST_SERIALIZATION", default=True)
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=20),  # Access token valid for 20 minutes
@@ -97,7 +159,10 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': (
+        'core.authentication.CachedTokenUser' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.models.TokenUser'
+    ),
     
     'JTI_CLAIM': 'jti',
     
@@ -135,9 +200,49 @@ DATABASES = {
         "PASSWORD": env.str("SQL_PASSWORD", default="password"),
         "HOST": env.str("SQL_HOST", default="localhost"),
         "PORT": env.str("SQL_PORT", default="5432"),
+        # Reuse connections across requests and Celery tasks for this many
+        # seconds instead of connecting every time; checked before reuse
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=60),
+        "CONN_HEALTH_CHECKS": env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+        # Required behind PgBouncer in transaction pooling mode
+        "DISABLE_SERVER_SIDE_CURSORS": env.bool("DB_DISABLE_SERVER_SIDE_CURSORS", default=False),
     }
 }
 
+# Connection pool of psycopg 3 (PostgreSQL only), as an alternative to
+# persistent connections: each process keeps DB_POOL_MIN_SIZE to
+# DB_POOL_MAX_SIZE connections and waits up to DB_POOL_TIMEOUT seconds for one.
+# Every gunicorn worker and Celery process has its own pool, count them
+# against the connection budget in gunicorn.conf.py
+if env.bool("DB_POOL", default=False):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # pooled connections are returned, not kept
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", default=4),
+            "timeout": env.int("DB_POOL_TIMEOUT", default=10),
+        },
+    }
+
+# Read replicas: comma separated hosts (host or host:port) of PostgreSQL
+# replicas, or database files when using SQLite. Safe reads such as the
+# dashboard, reports and list endpoints are spread over them, see
+# core/db_router.py
+DATABASE_REPLICAS = []
+for number, replica in enumerate(env.list("SQL_REPLICAS", default=[]), start=1):
+    alias = f"replica_{number}"
+    DATABASES[alias] = deepcopy(DATABASES["default"])
+    if DATABASES[alias]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[alias]["NAME"] = replica
+    else:
+        host, _, port = replica.partition(":")
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES["default"]["PORT"])
+    # Tests read the replicas through the test database
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -190,6 +295,85 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Queues, each consumed by its own workers (see docker-compose.yml), so
+# reporting jobs never hold up latency sensitive stock updates
+CELERY_TASK_QUEUES = (
+    Queue('stock', Exchange('stock'), routing_key='stock'),
+    Queue('reports', Exchange('reports'), routing_key='reports'),
+    Queue('maintenance', Exchange('maintenance'), routing_key='maintenance'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_ROUTES = {
+    'inventory.tasks.reduce_stock_from_sale': {'queue': 'stock', 'priority': 0},
+    'inventory.tasks.update_stock_from_purchase': {'queue': 'stock', 'priority': 1},
+    'inventory.tasks.compute_reorder_points': {'queue': 'reports', 'priority': 6},
+    'inventory.tasks.classify_products': {'queue': 'reports', 'priority': 6},
+}
+CELERY_TASK_DEFAULT_PRIORITY = 3
+# Redis emulates priorities with one list per step; lower numbers are served first
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# Completed orders update stock in chunk tasks of at most this many lines
+STOCK_TASK_CHUNK_SIZE = env.int("STOCK_TASK_CHUNK_SIZE", default=500)
+# Transactional outbox relay (core.models.OutboxEvent, relay_outbox command):
+# events published per batch, seconds between polls when idle, and how long
+# dispatched events are kept
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=100)
+OUTBOX_POLL_INTERVAL = env.float("OUTBOX_POLL_INTERVAL", default=1.0)
+OUTBOX_RETENTION_DAYS = env.int("OUTBOX_RETENTION_DAYS", default=7)
+# Completed orders with at most this many lines update stock inline, in the
+# transaction completing them; larger ones go through Celery (0: always).
+# Both kinds are applied set-based in a fixed number of queries, so this
+# bounds the rows locked by the request rather than its query count
+STOCK_INLINE_MAX_LINES = env.int("STOCK_INLINE_MAX_LINES", default=25)
+# Stock tasks acknowledge late, so workers should not hoard unacknowledged
+# messages; workers of other queues override it on their command line
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int("CELERY_WORKER_PREFETCH_MULTIPLIER", default=1)
+CELERY_BEAT_SCHEDULE = {
+    'compute-reorder-points': {
+        'task': 'inventory.tasks.compute_reorder_points',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'classify-products': {
+        'task': 'inventory.tasks.classify_products',
+        'schedule': crontab(hour=2, minute=0, day_of_week='sunday'),
+    },
+}
+
+# Demand forecasting for per-product reorder points (inventory.forecasting)
+FORECAST_HISTORY_DAYS = env.int("FORECAST_HISTORY_DAYS", default=90)
+FORECAST_METHOD = env.str("FORECAST_METHOD", default="exponential_smoothing")  # or moving_average
+FORECAST_WINDOW_DAYS = env.int("FORECAST_WINDOW_DAYS", default=28)
+FORECAST_SMOOTHING_ALPHA = env.float("FORECAST_SMOOTHING_ALPHA", default=0.1)
+REORDER_LEAD_TIME_DAYS = env.int("REORDER_LEAD_TIME_DAYS", default=7)
+# Safety stock in standard deviations of lead time demand (1.65 ~ 95% service level)
+REORDER_SERVICE_FACTOR = env.float("REORDER_SERVICE_FACTOR", default=1.65)
+# Suggested purchase orders restock to the reorder point plus this many days of demand
+REORDER_COVER_DAYS = env.int("REORDER_COVER_DAYS", default=14)
+
+# ABC/XYZ classification (inventory.classification): cumulative sales value
+# shares closing classes A and B, and weekly demand variation limits of X and Y
+CLASSIFICATION_HISTORY_DAYS = env.int("CLASSIFICATION_HISTORY_DAYS", default=364)
+ABC_A_SHARE = env.float("ABC_A_SHARE", default=0.80)
+ABC_B_SHARE = env.float("ABC_B_SHARE", default=0.95)
+XYZ_X_CV = env.float("XYZ_X_CV", default=0.5)
+XYZ_Y_CV = env.float("XYZ_Y_CV", default=1.0)
+
+# Live stock changes (inventory.events), off by default: Redis pub/sub channel
+# fanned out to the /api/events/stock/ Server-Sent Events stream, seconds
+# between keepalive comments, and events a stream may fall behind before it
+# is dropped
+STOCK_EVENTS_ENABLED = env.bool("STOCK_EVENTS_ENABLED", default=False)
+STOCK_EVENTS_REDIS_URL = env.str("STOCK_EVENTS_REDIS_URL", default="redis://redis:6379/1")
+STOCK_EVENTS_CHANNEL = env.str("STOCK_EVENTS_CHANNEL", default="stock-events")
+STOCK_EVENTS_HEARTBEAT = env.int("STOCK_EVENTS_HEARTBEAT", default=15)
+STOCK_EVENTS_QUEUE_SIZE = env.int("STOCK_EVENTS_QUEUE_SIZE", default=256)
+
+# /health/ready/ also pings the Celery broker
+HEALTH_CHECK_BROKER = env.bool("HEALTH_CHECK_BROKER", default=True)
 
 # Swagger/OpenAPI Configuration
 SWAGGER_SETTINGS = {
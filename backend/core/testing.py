@@ -0,0 +1,28 @@
+"""
+Test helpers shared by the apps' test modules.
+"""
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+
+class FastListParityMixin:
+    """
+    For ``TestCase`` classes checking that the values()-based list path
+    (``FastListMixin``) renders byte-for-byte the same response as the
+    regular ModelSerializer path.
+
+    Call ``assertListParity`` for each of the app's list endpoints.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def assertListParity(self, url):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            actual = self.client.get(url)
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
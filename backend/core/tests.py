@@ -0,0 +1,790 @@
+import asyncio
+import gzip
+import io
+import threading
+import time as clock
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import transaction
+from django.urls import URLResolver, get_resolver
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from rest_framework import serializers, viewsets
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt.tokens import AccessToken
+from inventory.models import Company, Product, Stock, StockUpdateResult
+from purchase.models import DailyPurchaseRollup, PurchaseOrder, PurchaseOrderItem, Supplier
+from sale.models import Customer, DailySalesRollup, SaleOrder, SaleOrderItem
+from rest_framework.exceptions import AuthenticationFailed
+from .authentication import CachedTokenUser, StatelessJWTAuthentication, cached_user_access, revoke_token, user_cache_key
+from .cache import CacheNamespace
+from .celery import app
+from .checks import check_ordering_indexes
+from .db_router import ReplicaRouter, read_from_replica
+from .fast_serializers import FastListMixin, FastSerializer
+from .json_backend import orjson
+from .middleware import CompressionMiddleware, reuse_compressed
+from .mixins import BatchFetchMixin
+from .models import CompanySettings, OutboxEvent
+from .ordering import ordering_has_index, with_id_tiebreaker
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .serializers import MyTokenObtainPairSerializer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    payload = {
+        'price': Decimal('12.50'),
+        'expiry_date': date(2026, 3, 31),
+        'created_at': datetime(2025, 10, 19, 6, 30, 15, 123456, tzinfo=timezone.utc),
+        'local': datetime(2025, 10, 19, 12, 0, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        'naive': datetime(2025, 10, 19, 12, 0),
+        'opens_at': time(9, 30),
+        'duration': timedelta(minutes=90),
+        'name': 'Paracétamol\u2028line',
+        'items': ({'id': 1}, {'id': 2}),
+        'empty': None,
+        'flag': True,
+        1: 'int key',
+    }
+
+    def test_matches_stdlib_renderer(self):
+        expected = JSONRenderer().render(self.payload)
+        for backend in ('json', 'auto'):
+            with override_settings(JSON_BACKEND=backend):
+                self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+
+    def test_indent_uses_stdlib(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload, media_type),
+            JSONRenderer().render(self.payload, media_type),
+        )
+
+    def test_parser_matches_stdlib(self):
+        body = JSONRenderer().render({'quantity': 5, 'price': '1.10', 'rate': 1.5, 'name': 'Ésprit'})
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    @override_settings(JSON_BACKEND='orjson')
+    def test_explicit_orjson_backend(self):
+        if orjson is None:
+            self.skipTest('orjson is not installed')
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"results":[' + b','.join(b'{"id":%d,"batch_number":"B%05d"}' % (i, i) for i in range(200)) + b']}'
+
+    def get_response(self, content):
+        return lambda request: HttpResponse(content, content_type='application/json')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_small_responses_are_not_compressed(self):
+        middleware = CompressionMiddleware(self.get_response(b'{"id":1}'))
+        response = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"id":1}')
+
+    def test_gzip_negotiation(self):
+        middleware = CompressionMiddleware(self.get_response(self.body))
+        response = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+        refused = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity'))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertEqual(refused.content, self.body)
+
+    def test_compressed_body_is_reused_from_cache(self):
+        middleware = CompressionMiddleware(reuse_compressed(self.get_response(self.body)))
+        first = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        with mock.patch('core.middleware.compress_string') as compress:
+            second = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        compress.assert_not_called()
+        self.assertEqual(first.content, second.content)
+
+    def test_other_bodies_are_compressed_directly(self):
+        middleware = CompressionMiddleware(self.get_response(self.body))
+        with mock.patch('core.middleware.caches') as caches:
+            response = middleware(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        caches.__getitem__.assert_not_called()
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+
+class OrderingIndexCheckTests(SimpleTestCase):
+
+    def test_ordering_has_index(self):
+        self.assertTrue(ordering_has_index(Stock, '-expiry_date'))
+        # Sorting across a join cannot use the related table's index
+        self.assertFalse(ordering_has_index(Stock, 'product__company__name'))
+        self.assertFalse(ordering_has_index(Stock, 'product__name'))
+        self.assertFalse(ordering_has_index(Stock, 'product__id'))
+        self.assertTrue(ordering_has_index(Stock, 'id'))
+        self.assertFalse(ordering_has_index(Stock, 'mrp'))
+
+    def test_whitelisted_orderings_are_indexed_or_acknowledged(self):
+        self.assertEqual(check_ordering_indexes(None), [])
+
+    def test_tiebreaker_follows_direction(self):
+        self.assertEqual(with_id_tiebreaker('-quantity'), ('-quantity', '-id'))
+        self.assertEqual(with_id_tiebreaker('quantity'), ('quantity', 'id'))
+        self.assertEqual(with_id_tiebreaker('-id'), ('-id',))
+
+
+class ProductNameSerializer(serializers.ModelSerializer):
+    company_name = serializers.CharField(source='company.name', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['name', 'company_name']
+
+
+class ProductNameViewSet(BatchFetchMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Product.objects.select_related('company')
+    serializer_class = ProductNameSerializer
+    authentication_classes = ()
+    permission_classes = ()
+
+
+class FastSerializerCompileTests(SimpleTestCase):
+
+    def test_list_serializers_compile(self):
+        def views(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from views(pattern.url_patterns)
+                else:
+                    yield getattr(pattern.callback, 'cls', None)
+
+        viewsets = {view for view in views(get_resolver().url_patterns) if view and issubclass(view, FastListMixin)}
+        self.assertTrue(viewsets)
+        for viewset in viewsets:
+            self.assertIsNotNone(FastSerializer.for_class(viewset.serializer_class), viewset)
+
+
+class BatchFetchMixinTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme Pharma')
+        cls.products = [
+            Product.objects.create(name=name, company=company) for name in ('Aspirin', 'Ibuprofen', 'Zinc')
+        ]
+
+    def get(self, ids):
+        request = RequestFactory().get('/', {'ids': ids})
+        return ProductNameViewSet.as_view({'get': 'list'})(request)
+
+    def batch(self, ids):
+        request = RequestFactory().post('/', {'ids': ids}, content_type='application/json')
+        return ProductNameViewSet.as_view({'post': 'batch'})(request)
+
+    def test_get_ids_returns_rows_in_requested_order(self):
+        ids = [self.products[2].id, self.products[0].id, 999999]
+        with self.assertNumQueries(1):
+            response = self.get(','.join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['results'],
+            [{'name': 'Zinc', 'company_name': 'Acme Pharma'}, {'name': 'Aspirin', 'company_name': 'Acme Pharma'}],
+        )
+        self.assertEqual((response.data['count'], response.data['missing']), (2, [999999]))
+
+    def test_post_batch(self):
+        ids = [self.products[1].id, self.products[1].id, self.products[0].id]
+        for fast in (False, True):
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                response = self.batch(ids)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['name'] for row in response.data['results']], ['Ibuprofen', 'Aspirin'], fast)
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.get('1,abc').status_code, 400)
+        for ids in ([1, None], [], '1,2', list(range(1001))):
+            self.assertEqual(self.batch(ids).status_code, 400, ids)
+
+
+class RollupReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reports', password='secret')
+        cls.paracetamol = Product.objects.create(name='Paracetamol 500mg')
+        cls.cetirizine = Product.objects.create(name='Cetirizine 10mg')
+        customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+        for day, product, quantity in [
+            (date(2025, 9, 30), cls.paracetamol, 4),
+            (date(2025, 10, 1), cls.paracetamol, 6),
+            (date(2025, 10, 2), cls.cetirizine, 10),
+        ]:
+            DailySalesRollup.objects.create(
+                date=day, product=product, customer=customer, quantity=quantity,
+                revenue=Decimal('1.50') * quantity, tax=Decimal('0.10') * quantity,
+                margin=Decimal('0.50') * quantity, line_count=1,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_monthly_sales_by_product(self):
+        response = self.client.get('/api/reports/sales/', {
+            'start_date': '2025-09-01', 'end_date': '2025-10-31', 'period': 'month', 'group_by': 'product',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['period'], row['product_name'], row['quantity'], row['revenue']) for row in response.data['results']],
+            [
+                ('2025-09-01', 'Paracetamol 500mg', 4, Decimal('6.00')),
+                ('2025-10-01', 'Cetirizine 10mg', 10, Decimal('15.00')),
+                ('2025-10-01', 'Paracetamol 500mg', 6, Decimal('9.00')),
+            ],
+        )
+        self.assertEqual(response.data['totals']['margin'], Decimal('10.00'))
+
+    def test_invalid_parameters(self):
+        for params in ({'period': 'week'}, {'group_by': 'supplier'}, {'start_date': '2025-13-01'},
+                       {'start_date': '2025-10-02', 'end_date': '2025-10-01'}):
+            self.assertEqual(self.client.get('/api/reports/sales/', params).status_code, 400, params)
+
+    def test_rebuild_backfills_purchase_rollups(self):
+        supplier = Supplier.objects.create(name='MediSupply', email='orders@medisupply.test')
+        order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PO-1')
+        PurchaseOrderItem.objects.create(
+            purchase_order=order, product=self.paracetamol, batch_number='B1', expiry_date=date(2027, 1, 1),
+            quantity=10, purchase_price=Decimal('2.00'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'),
+            tax=Decimal('12.00'),
+        )
+        PurchaseOrder.objects.filter(pk=order.pk).update(status='Completed')
+
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        rollup = DailyPurchaseRollup.objects.get()
+        self.assertEqual((rollup.quantity, rollup.amount, rollup.tax), (10, Decimal('20.00'), Decimal('2.40')))
+        response = self.client.get('/api/reports/purchases/', {'period': 'year', 'group_by': 'supplier'})
+        self.assertEqual(response.data['results'][0]['supplier_name'], 'MediSupply')
+        self.assertEqual(response.data['totals']['amount'], Decimal('20.00'))
+
+    def test_purchase_rollup_follows_lines_of_completed_orders(self):
+        supplier = Supplier.objects.create(name='MediSupply', email='orders@medisupply.test')
+        line = {
+            'product': self.paracetamol, 'batch_number': 'B1', 'expiry_date': date(2027, 1, 1),
+            'purchase_price': Decimal('2.00'), 'sale_price': Decimal('3.00'), 'mrp': Decimal('4.00'),
+            'tax': Decimal('12.00'),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PO-1', status='Completed')
+            item = PurchaseOrderItem.objects.create(purchase_order=order, quantity=10, **line)
+            PurchaseOrderItem.objects.create(purchase_order=order, quantity=5, **line)
+        self.assertEqual(DailyPurchaseRollup.objects.get().quantity, 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        rollup = DailyPurchaseRollup.objects.get()
+        self.assertEqual((rollup.quantity, rollup.amount, rollup.line_count), (5, Decimal('10.00'), 1))
+
+    def test_reports_are_cached_until_rollups_change(self):
+        params = {'start_date': '2025-10-01', 'end_date': '2025-10-01', 'period': 'day'}
+        self.assertEqual(self.client.get('/api/reports/sales/', params).data['totals']['quantity'], 6)
+        DailySalesRollup.objects.filter(date=date(2025, 10, 1)).update(quantity=60)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/reports/sales/', params).data['totals']['quantity'], 6)
+
+        DailySalesRollup.rebuild(date(2025, 10, 1), date(2025, 10, 1))
+        self.assertEqual(self.client.get('/api/reports/sales/', params).data['totals']['quantity'], 0)
+
+
+class GSTReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('gst', password='secret')
+        product = Product.objects.create(name='Paracetamol 500mg')
+        stock = Stock.objects.create(
+            product=product, batch_number='B1', expiry_date=date(2027, 1, 1), quantity=100,
+            purchase_price=Decimal('2.00'), sale_price=Decimal('3.35'), mrp=Decimal('4.00'),
+            tax=Decimal('12.00'), hsn_code='30049099',
+        )
+        customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+        for status_value in ('Completed', 'Pending'):
+            order = SaleOrder.objects.create(customer=customer)
+            SaleOrderItem.objects.create(sale_order=order, stock=stock, quantity=3)
+            SaleOrderItem.objects.create(sale_order=order, stock=stock, quantity=7)
+            SaleOrder.objects.filter(pk=order.pk).update(status=status_value)
+
+        supplier = Supplier.objects.create(name='MediSupply', email='orders@medisupply.test')
+        order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PO-1')
+        for hsn_code, tax in (('30049099', Decimal('12.00')), (None, Decimal('5.00'))):
+            PurchaseOrderItem.objects.create(
+                purchase_order=order, product=product, batch_number=f'P{tax}', expiry_date=date(2027, 1, 1),
+                quantity=10, purchase_price=Decimal('2.00'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'),
+                tax=tax, hsn_code=hsn_code,
+            )
+        PurchaseOrder.objects.filter(pk=order.pk).update(status='Completed')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summary_by_hsn_and_rate(self):
+        response = self.client.get('/api/reports/gst/')
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            (row['direction'], row['hsn_code'], row['tax_rate'], row['line_count'],
+             row['taxable_value'], row['tax_amount'], row['invoice_value'])
+            for row in response.data['results']
+        ]
+        # Line totals 11.26 + 26.26 are rounded per line, so tax is taken from them
+        self.assertEqual(rows, [
+            ('sales', '30049099', Decimal('12.00'), 2, Decimal('33.50'), Decimal('4.02'), Decimal('37.52')),
+            ('purchases', '', Decimal('5.00'), 1, Decimal('20.00'), Decimal('1.00'), Decimal('21.00')),
+            ('purchases', '30049099', Decimal('12.00'), 1, Decimal('20.00'), Decimal('2.40'), Decimal('22.40')),
+        ])
+
+    def test_sales_keep_the_rate_and_price_charged(self):
+        Stock.objects.filter(batch_number='B1').update(sale_price=Decimal('9.99'), tax=Decimal('18.00'))
+        response = self.client.get('/api/reports/gst/', {'direction': 'sales'})
+        row = response.data['results'][0]
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(
+            (row['hsn_code'], row['tax_rate'], row['taxable_value'], row['tax_amount'], row['invoice_value']),
+            ('30049099', Decimal('12.00'), Decimal('33.50'), Decimal('4.02'), Decimal('37.52')),
+        )
+
+    def test_csv_export_streams(self):
+        response = self.client.get('/api/reports/gst/', {'direction': 'sales', 'export': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'direction,hsn_code,tax_rate,line_count,quantity,taxable_value,tax_amount,invoice_value',
+            'sales,30049099,12.00,2,10,33.50,4.02,37.52',
+        ])
+
+    def test_invalid_direction(self):
+        self.assertEqual(self.client.get('/api/reports/gst/', {'direction': 'exports'}).status_code, 400)
+
+
+@override_settings(STOCK_INLINE_MAX_LINES=0)
+class OutboxRelayTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Paracetamol 500mg')
+        supplier = Supplier.objects.create(name='MediSupply Co.', email='orders@medisupply.test')
+        cls.order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PINV-1')
+        PurchaseOrderItem.objects.create(
+            purchase_order=cls.order, product=cls.product, batch_number='B1', expiry_date=date(2027, 6, 30),
+            quantity=10, purchase_price=Decimal('2.00'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'),
+            tax=Decimal('12.00'),
+        )
+
+    def complete_order(self):
+        self.order.status = 'Completed'
+        self.order.save()
+        return OutboxEvent.objects.get(kind='purchase', order_id=self.order.id)
+
+    def test_completion_is_relayed_to_stock_tasks(self):
+        event = self.complete_order()
+        self.assertIsNone(event.dispatched_at)
+        self.assertFalse(Stock.objects.exists())
+
+        app.conf.task_always_eager = True
+        try:
+            call_command('relay_outbox', '--once', stdout=StringIO())
+        finally:
+            app.conf.task_always_eager = False
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.dispatched_at)
+        self.assertEqual(Stock.objects.get(product=self.product, batch_number='B1').quantity, 10)
+        self.assertEqual(StockUpdateResult.objects.filter(order_id=self.order.id, status='applied').count(), 1)
+
+    def test_duplicate_dispatch_applies_stock_once(self):
+        event = self.complete_order()
+        app.conf.task_always_eager = True
+        try:
+            self.assertEqual(OutboxEvent.relay(10), (1, 0))
+            # The relay's commit was lost after publishing: the event is still pending
+            OutboxEvent.objects.filter(pk=event.pk).update(dispatched_at=None)
+            self.assertEqual(OutboxEvent.relay(10), (1, 0))
+        finally:
+            app.conf.task_always_eager = False
+
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 2)
+        self.assertEqual(Stock.objects.get(product=self.product, batch_number='B1').quantity, 10)
+        self.assertEqual(StockUpdateResult.objects.filter(order_id=self.order.id, status='applied').count(), 1)
+
+    def test_broker_failure_keeps_event_pending(self):
+        event = self.complete_order()
+        with mock.patch('inventory.tasks.dispatch_stock_update', side_effect=ConnectionError('broker down')):
+            self.assertEqual(OutboxEvent.relay(10), (0, 1))
+
+        event.refresh_from_db()
+        self.assertIsNone(event.dispatched_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'broker down')
+
+    @override_settings(STOCK_INLINE_MAX_LINES=1)
+    def test_small_orders_update_stock_inline(self):
+        self.order.status = 'Completed'
+        self.order.save()
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(Stock.objects.get(product=self.product, batch_number='B1').quantity, 10)
+        result = StockUpdateResult.objects.get(order_id=self.order.id)
+        self.assertEqual((result.status, result.task_id), ('applied', ''))
+
+
+class TaskRoutingTests(SimpleTestCase):
+
+    def route(self, name):
+        route = app.amqp.router.route({}, name)
+        return route['queue'].name, route.get('priority')
+
+    def test_stock_tasks_have_their_own_queue(self):
+        self.assertEqual(self.route('inventory.tasks.reduce_stock_from_sale'), ('stock', 0))
+        self.assertEqual(self.route('inventory.tasks.update_stock_from_purchase'), ('stock', 1))
+        self.assertEqual(self.route('inventory.tasks.classify_products'), ('reports', 6))
+        self.assertEqual(self.route('core.celery.debug_task'), ('maintenance', None))
+
+
+class StockEventStreamTests(TestCase):
+
+    def test_requires_valid_token(self):
+        async def get(**extra):
+            return await AsyncClient().get('/api/events/stock/', **extra)
+
+        self.assertEqual(asyncio.run(get()).status_code, 401)
+        self.assertEqual(asyncio.run(get(data={'token': 'not-a-token'})).status_code, 401)
+
+    def test_only_served_by_asgi(self):
+        user = User.objects.create_user('stream', password='secret')
+        response = self.client.get('/api/events/stock/', {'token': str(AccessToken.for_user(user))})
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncReadViewTests(TestCase):
+    """The async read endpoints must answer exactly like their DRF counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+        acme = Company.objects.create(name='Acme Pharma')
+        for index, name in enumerate(['Paracetamol 500mg', 'Amoxicillin 250mg', 'Orphan Syrup']):
+            product = Product.objects.create(name=name, company=acme if index < 2 else None)
+            Stock.objects.create(
+                product=product, batch_number=f'B{index}', expiry_date=date(2026, 1 + index, 15),
+                quantity=index * 7, purchase_price=Decimal('10.50'), sale_price=Decimal('15.00'),
+                mrp=Decimal('19.99'), tax=Decimal('12.00'),
+            )
+
+    async def assertSameResponse(self, sync_url, async_url):
+        token = str(AccessToken.for_user(self.user))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        expected = await sync_to_async(client.get)(sync_url)
+        actual = await self.async_client.get(async_url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.json(), expected.json())
+
+    async def test_dashboard_metrics(self):
+        await self.assertSameResponse('/api/dashboard/metrics/', '/api/async/dashboard/metrics/')
+
+    async def test_lists_and_search(self):
+        await self.assertSameResponse('/api/inventory/products/', '/api/async/inventory/products/')
+        await self.assertSameResponse(
+            '/api/inventory/stock/?search=Pa&ordering=-expiry_date&page_size=1&page=2',
+            '/api/async/inventory/stock/?search=Pa&ordering=-expiry_date&page_size=1&page=2',
+        )
+        await self.assertSameResponse('/api/inventory/stock/?page=9', '/api/async/inventory/stock/?page=9')
+
+    async def test_requires_token(self):
+        response = await self.async_client.get('/api/async/inventory/products/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_token_of_inactive_user_is_rejected(self):
+        token = str(AccessToken.for_user(self.user))
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        response = await self.async_client.get('/api/async/inventory/products/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stateless_mode_checks_blacklist(self):
+        token = AccessToken.for_user(self.user)
+        await sync_to_async(cache.clear)()
+        await sync_to_async(revoke_token)(token)
+        stateless = {**settings.REST_FRAMEWORK, 'DEFAULT_AUTHENTICATION_CLASSES': (
+            'core.authentication.StatelessJWTAuthentication',
+        )}
+        with override_settings(REST_FRAMEWORK=stateless):
+            response = await self.async_client.get(
+                '/api/async/inventory/products/', headers={'Authorization': f'Bearer {token}'},
+            )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Token has been revoked'})
+
+
+class HealthCheckTests(TestCase):
+
+    def test_liveness(self):
+        response = self.client.get('/health/live/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    @override_settings(HEALTH_CHECK_BROKER=False)
+    def test_ready_when_database_answers(self):
+        response = self.client.get('/health/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['checks']['database']['status'], 'ok')
+
+    @override_settings(HEALTH_CHECK_BROKER=True, CELERY_BROKER_URL='redis://127.0.0.1:1/0')
+    def test_not_ready_without_broker(self):
+        response = self.client.get('/health/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['broker']['status'], 'error')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(TransactionTestCase):
+    # TestCase wraps every test in a transaction, which always reads from
+    # the primary
+
+    def setUp(self):
+        # Reports and the dashboard would otherwise be served from the cache
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = User.objects.create_user('replica', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_outside_replica_blocks_use_primary(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_reads_in_replica_block_use_replica(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Product), 'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with read_from_replica():
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_reads_after_write_stick_to_primary(self):
+        with read_from_replica():
+            self.router.db_for_write(Product)
+            self.assertIsNone(self.router.db_for_read(Product))
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Product), 'replica_1')
+
+    def test_reads_in_transaction_use_primary(self):
+        with read_from_replica(), transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def replica_reads_during(self, method, url, data=None):
+        # Route replica reads to the test database and count them
+        with mock.patch.object(ReplicaRouter, 'choose_replica', return_value='default') as choose:
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        return choose.call_count
+
+    def test_lists_reports_and_exports_read_from_replica(self):
+        Product.objects.create(name='Paracetamol 500mg')
+        self.assertGreater(self.replica_reads_during('get', '/api/inventory/products/'), 0)
+        self.assertGreater(self.replica_reads_during('get', '/api/dashboard/metrics/'), 0)
+        self.assertGreater(self.replica_reads_during('get', '/api/reports/gst/?export=csv'), 0)
+
+    def test_writes_and_details_use_primary(self):
+        product = Product.objects.create(name='Paracetamol 500mg')
+        self.assertEqual(self.replica_reads_during('get', f'/api/inventory/products/{product.pk}/'), 0)
+        self.assertEqual(self.replica_reads_during('post', '/api/inventory/products/', {'name': 'Amoxicillin'}), 0)
+
+
+@override_settings(REPORT_CACHE_TIMEOUT=60, CACHE_STALE_TIMEOUT=60, CACHE_WAIT_TIMEOUT=1)
+class CacheNamespaceTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.namespace = CacheNamespace('test', 'REPORT_CACHE_TIMEOUT')
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_values_are_cached_until_invalidated(self):
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 1)
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 1)
+        self.assertEqual(self.namespace.get_or_compute(('b',), self.compute), 2)
+
+        self.namespace.invalidate()
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 3)
+
+    def test_version_survives_eviction(self):
+        version = self.namespace.version()
+        cache.delete(self.namespace.version_key())
+        self.assertGreater(self.namespace.version(), version)
+
+    @override_settings(REPORT_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_caching(self):
+        self.namespace.get_or_compute(('a',), self.compute)
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 2)
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        key = self.namespace.key('a')
+        cache.set(key, (clock.time() - 1, 'stale'), 60)
+        self.assertTrue(self.namespace.lock(key))
+
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 'stale')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_recomputed_once(self):
+        key = self.namespace.key('a')
+        cache.set(key, (clock.time() - 1, 'stale'), 60)
+
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 1)
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 1)
+
+    def test_cold_key_waits_for_lock_holder(self):
+        key = self.namespace.key('a')
+        self.assertTrue(self.namespace.lock(key))
+        timer = threading.Timer(0.1, lambda: cache.set(key, (clock.time() + 60, 'computed'), 60))
+        timer.start()
+        try:
+            self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 'computed')
+        finally:
+            timer.join()
+        self.assertEqual(self.calls, 0)
+
+    @override_settings(CACHE_WAIT_TIMEOUT=0.1)
+    def test_cold_key_computed_when_lock_holder_is_too_slow(self):
+        self.assertTrue(self.namespace.lock(self.namespace.key('a')))
+        self.assertEqual(self.namespace.get_or_compute(('a',), self.compute), 1)
+
+
+class CompanySettingsCacheTests(TestCase):
+
+    def setUp(self):
+        CompanySettings.invalidate_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('owner', password='secret'))
+
+    def test_reads_cost_no_queries(self):
+        self.assertEqual(self.client.get('/api/settings/company/').data['company_name'], 'Your Company Name')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/settings/company/').status_code, 200)
+
+    @override_settings(COMPANY_SETTINGS_LOCAL_TIMEOUT=0)
+    def test_shared_cache_serves_other_processes(self):
+        CompanySettings.get_company_settings()
+        with self.assertNumQueries(0):
+            CompanySettings.get_company_settings()
+
+    def test_update_is_visible_immediately(self):
+        self.client.get('/api/settings/company/')
+        response = self.client.put('/api/settings/company/', {'company_name': 'City Pharmacy'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/settings/company/').data['company_name'], 'City Pharmacy')
+
+    def test_saving_a_new_instance_updates_the_singleton(self):
+        CompanySettings.get_company_settings()
+        CompanySettings(company_name='Second Pharmacy').save()
+        self.assertEqual(CompanySettings.objects.count(), 1)
+        self.assertEqual(CompanySettings.get_company_settings().company_name, 'Second Pharmacy')
+
+    def test_callers_get_independent_copies(self):
+        CompanySettings.get_company_settings().company_name = 'Changed'
+        self.assertEqual(CompanySettings.get_company_settings().company_name, 'Your Company Name')
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # TOKEN_USER_CLASS as set with JWT_STATELESS_AUTH on; simplejwt's
+        # modules keep the settings object they imported
+        patcher = mock.patch.object(jwt_authentication.api_settings, 'TOKEN_USER_CLASS', CachedTokenUser)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('clerk', password='secret', is_staff=True)
+        self.token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def authenticate(self):
+        user, _ = StatelessJWTAuthentication().authenticate(self.request)
+        return user
+
+    def test_authenticates_from_claims_without_queries(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(
+            (user.id, user.username, user.is_staff, user.is_superuser), (str(self.user.id), 'clerk', True, False),
+        )
+        self.assertTrue(user.is_authenticated)
+
+    def test_permission_checks_read_cached_access(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='add_product'))
+        user = self.authenticate()
+        self.assertTrue(user.has_perm('inventory.add_product'))
+        self.assertFalse(user.has_perm('inventory.delete_product'))
+        self.assertTrue(user.has_module_perms('inventory'))
+        with self.assertNumQueries(0):
+            access = cached_user_access(self.user.id)
+        # Only flags and permission names are cached, never the password hash
+        self.assertEqual(set(access), {'id', 'is_active', 'is_staff', 'is_superuser', 'permissions', 'group_permissions'})
+        self.assertEqual(access['permissions'], {'inventory.add_product'})
+
+    def test_revoked_token_is_rejected(self):
+        revoke_token(self.token)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivating_user_revokes_tokens(self):
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        response = self.client.get('/api/async/inventory/products/', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleting_user_revokes_tokens(self):
+        user_id = self.user.id
+        self.authenticate().access
+        self.user.delete()
+        self.assertIsNone(cache.get(user_cache_key(user_id)))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        refresh = MyTokenObtainPairSerializer.get_token(self.user)
+        access = refresh.access_token
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.post(
+            '/api/token/logout/', {'refresh': str(refresh)}, headers={'Authorization': f'Bearer {access}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        response = self.client.post('/api/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
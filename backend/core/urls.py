@@ -22,8 +22,12 @@ from rest_framework_simplejwt.views import (
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from .views import MyTokenObtainPairView, company_settings
-from .dashboard_views import dashboard_metrics, low_stock_items
+from .views import LogoutView, MyTokenObtainPairView, company_settings
+from .dashboard_views import dashboard_metrics, low_stock_items, reorder_items
+from .event_views import stock_events
+from .health_views import liveness, readiness
+from . import async_views
+from .report_views import gst_report, purchase_report, sales_report
 
 # Swagger/OpenAPI Schema
 schema_view = get_schema_view(
@@ -39,11 +43,13 @@ schema_view = get_schema_view(
       - **Purchase Management**: Suppliers and Purchase Orders
       - **Sales Management**: Customers and Sale Orders  
       - **Dashboard Analytics**: Real-time metrics and stock alerts
+      - **Reports**: Daily, monthly and yearly sales and purchase totals
       
       ## Authentication
       Use the `/api/token/` endpoint to obtain access tokens.
       Include the token in requests using the Authorization header:
       `Authorization: Bearer <your-token>`
+      Post the refresh token to `/api/token/logout/` to log out.
       
       ## Business Logic
       - Stock levels are automatically updated when orders are completed
@@ -68,14 +74,29 @@ urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     
+    # Health checks for load balancers and orchestrators
+    path('health/live/', liveness, name='health_live'),
+    path('health/ready/', readiness, name='health_ready'),
+    
     # Authentication APIs
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/logout/', LogoutView.as_view(), name='token_logout'),
     
     # Core APIs
     path('api/settings/company/', company_settings, name='company_settings'),
     path('api/dashboard/metrics/', dashboard_metrics, name='dashboard_metrics'),
     path('api/dashboard/low-stock/', low_stock_items, name='low_stock_items'),
+    path('api/dashboard/reorder/', reorder_items, name='reorder_items'),
+    path('api/reports/sales/', sales_report, name='sales_report'),
+    path('api/reports/purchases/', purchase_report, name='purchase_report'),
+    path('api/reports/gst/', gst_report, name='gst_report'),
+    path('api/events/stock/', stock_events, name='stock_events'),
+
+    # Async read endpoints, for the ASGI application
+    path('api/async/dashboard/metrics/', async_views.dashboard_metrics, name='async_dashboard_metrics'),
+    path('api/async/inventory/products/', async_views.product_list, name='async_product_list'),
+    path('api/async/inventory/stock/', async_views.stock_list, name='async_stock_list'),
     
     # Domain APIs
     path('api/inventory/', include('inventory.urls')),
@@ -1,14 +1,38 @@
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenBlacklistView, TokenObtainPairView
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .serializers import MyTokenObtainPairSerializer, CompanySettingsSerializer
 from .models import CompanySettings
+from .authentication import revoke_token
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
+class LogoutView(TokenBlacklistView):
+    """
+    Blacklist the refresh token in the body and revoke the access token of
+    the Authorization header, if any, which would otherwise stay valid
+    until it expires.
+    """
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token:
+            try:
+                revoke_token(AccessToken(raw_token))
+            except TokenError:
+                # Expired or invalid, so it is rejected already
+                pass
+        return response
+
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def company_settings(request):
@@ -0,0 +1,63 @@
+"""
+Gunicorn settings for production serving.
+
+    gunicorn -c gunicorn.conf.py core.wsgi                  # sync, threaded workers
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        gunicorn -c gunicorn.conf.py core.asgi:application   # ASGI, for stock events and /api/async/
+
+Every value can be overridden with the GUNICORN_* environment variables
+below; worker and thread counts default to values derived from the CPU
+count of the container, within a budget of database connections.
+"""
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Threads cover requests waiting on the database
+threads = env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+# Connection budget: every thread keeps its own database connection open
+# (DB_CONN_MAX_AGE, or up to DB_POOL_MAX_SIZE per worker with DB_POOL), so
+# one server holds up to workers x threads connections. The servers, the
+# Celery workers (one per concurrency slot) and the admin connections must
+# stay below PostgreSQL's max_connections (100 by default);
+# GUNICORN_DB_CONNECTIONS is this server's share.
+db_connections = env_int('GUNICORN_DB_CONNECTIONS', 32)
+# The usual (2 x cores) + 1, capped to the connection budget
+workers = env_int('GUNICORN_WORKERS', max(1, min(2 * cpu_count + 1, db_connections // threads)))
+# Import Django once in the master so workers fork with it already loaded
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Recycle workers after a number of requests (jittered so they do not all
+# restart together) to contain slow memory growth
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+# Time given to in-flight requests on restart or shutdown
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Empty disables the access log
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # With preload_app, a connection opened while importing the app would be
+    # shared by every forked worker; close it in the master so each worker
+    # opens its own.
+    from django.db import connections
+    connections.close_all()
@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import Company, Product, Stock
+from .models import Company, Product, ProductClassification, ProductStockSummary, Stock, StockUpdateResult
 
 admin.site.register(Company)
 admin.site.register(Product)
 admin.site.register(Stock)
+admin.site.register(ProductStockSummary)
+admin.site.register(ProductClassification)
+admin.site.register(StockUpdateResult)
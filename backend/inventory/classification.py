@@ -0,0 +1,85 @@
+"""
+ABC/XYZ classification of all products at once.
+
+- ABC ranks products by their share of sales value: the products making
+  up the first ``a_share`` of cumulative value are A, up to ``b_share`` B,
+  the rest C.
+- XYZ rates demand variability by the coefficient of variation of weekly
+  units sold: up to ``x_cv`` is X, up to ``y_cv`` Y, above (or no demand
+  at all) Z.
+
+Both work on NumPy arrays with one entry per product, as loaded by
+``sales_values`` and ``inventory.forecasting.demand_matrix``.
+"""
+from datetime import timedelta
+import numpy as np
+from django.db.models import Sum
+
+
+def sales_values(product_ids, start, days):
+    """
+    Return the sales revenue of each of the sorted ``product_ids`` over
+    ``days`` days from ``start``, read from the daily sales rollups.
+    """
+    from sale.models import DailySalesRollup
+
+    values = np.zeros(len(product_ids))
+    rows = list(
+        DailySalesRollup.objects.filter(date__gte=start, date__lt=start + timedelta(days=days))
+        .values('product_id')
+        .annotate(value=Sum('revenue'))
+        .order_by()
+        .values_list('product_id', 'value')
+    )
+    if not rows or not len(product_ids):
+        return values
+
+    row_products = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    row_values = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    positions = np.minimum(np.searchsorted(product_ids, row_products), len(product_ids) - 1)
+    known = product_ids[positions] == row_products
+    values[positions[known]] = row_values[known]
+    return values
+
+
+def abc_classes(sales_value, a_share, b_share):
+    """
+    Return ``(classes, cumulative_share)`` for an array of sales values.
+    A product is classed by the cumulative share reached *before* it, so
+    the top seller is always A.
+    """
+    classes = np.full(sales_value.shape, 'C', dtype='<U1')
+    cumulative_share = np.zeros(sales_value.shape)
+    total = sales_value.sum()
+    if total <= 0:
+        return classes, cumulative_share
+
+    order = np.argsort(-sales_value, kind='stable')
+    running = np.cumsum(sales_value[order]) / total
+    cumulative_share[order] = running
+    preceding = np.empty_like(running)
+    preceding[0] = 0
+    preceding[1:] = running[:-1]
+
+    ranked = np.where(preceding < a_share, 'A', np.where(preceding < b_share, 'B', 'C'))
+    ranked[sales_value[order] <= 0] = 'C'
+    classes[order] = ranked
+    return classes, cumulative_share
+
+
+def weekly_totals(matrix):
+    """Sum a ``products x days`` matrix into whole weeks, dropping the oldest partial week."""
+    weeks = matrix.shape[1] // 7
+    if weeks == 0:
+        return matrix.sum(axis=1, keepdims=True)
+    return matrix[:, -weeks * 7:].reshape(matrix.shape[0], weeks, 7).sum(axis=2)
+
+
+def xyz_classes(matrix, x_cv, y_cv):
+    """Return ``(classes, coefficient_of_variation)`` from daily demand."""
+    weekly = weekly_totals(matrix)
+    mean = weekly.mean(axis=1)
+    std = weekly.std(axis=1)
+    cv = np.divide(std, mean, out=np.full(mean.shape, np.inf), where=mean > 0)
+    classes = np.where(cv <= x_cv, 'X', np.where(cv <= y_cv, 'Y', 'Z'))
+    return classes, cv
@@ -0,0 +1,151 @@
+"""
+Stock change events over Redis pub/sub.
+
+Every committed change to a batch publishes one compact JSON event with
+the batch's new quantity on ``STOCK_EVENTS_CHANNEL``, once per transaction
+however often the batch changed in it::
+
+    {"stock": 12, "product": 3, "batch": "B1", "quantity": 40}
+
+Deleted batches are sent as ``{"stock": 12, "quantity": 0, "deleted": true}``.
+Events carry the current quantity rather than the change, so a client that
+missed one is corrected by the next.
+
+Each ASGI process holds a single subscription (``broker``) and fans the
+events out to all of its open Server-Sent Events streams.
+"""
+import asyncio
+import json
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.db import transaction
+
+_client = None
+
+
+def redis_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.STOCK_EVENTS_REDIS_URL, socket_connect_timeout=1, socket_timeout=1,
+        )
+    return _client
+
+
+def stock_change_events(stock_ids):
+    """Return the event of each of ``stock_ids``, read in one query."""
+    from .models import Stock
+
+    stock_ids = set(stock_ids)
+    rows = Stock.objects.filter(id__in=stock_ids).values_list('id', 'product_id', 'batch_number', 'quantity')
+    events = [
+        {'stock': stock_id, 'product': product_id, 'batch': batch_number, 'quantity': quantity}
+        for stock_id, product_id, batch_number, quantity in rows
+    ]
+    found = {event['stock'] for event in events}
+    events.extend({'stock': stock_id, 'quantity': 0, 'deleted': True} for stock_id in stock_ids - found)
+    return sorted(events, key=lambda event: event['stock'])
+
+
+def publish(stock_ids):
+    try:
+        events = stock_change_events(stock_ids)
+        pipeline = redis_client().pipeline(transaction=False)
+        for event in events:
+            pipeline.publish(settings.STOCK_EVENTS_CHANNEL, json.dumps(event, separators=(',', ':')))
+        pipeline.execute()
+    except Exception as e:
+        print(f" [!] Could not publish events of {len(stock_ids)} batches: {e}")
+
+
+def publish_stock_changes(stock_ids):
+    """
+    Publish the changed batches once the current transaction commits.
+
+    The batches changed in one transaction are collected and published
+    together, by a single callback and a single query. A Redis outage only
+    costs the live updates, never the stock write.
+    """
+    stock_ids = [stock_id for stock_id in stock_ids if stock_id is not None]
+    if not settings.STOCK_EVENTS_ENABLED or not stock_ids:
+        return
+
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_stock_events', None)
+    # Reuse the callback of this transaction, unless its transaction or
+    # savepoint has ended since
+    if pending is not None and any(callback is pending for _, callback, _ in connection.run_on_commit):
+        pending.stock_ids.update(stock_ids)
+        return
+    pending = PendingStockEvents(stock_ids)
+    connection.pending_stock_events = pending
+    transaction.on_commit(pending)
+
+
+class PendingStockEvents:
+    """Batches changed in the current transaction, published on commit."""
+
+    def __init__(self, stock_ids):
+        self.stock_ids = set(stock_ids)
+
+    def __call__(self):
+        publish(self.stock_ids)
+
+
+class StockEventBroker:
+    """
+    Fan one Redis subscription out to the streams of this process.
+
+    The subscription is opened with the first stream and closed with the
+    last. Each stream reads from its own bounded queue; a stream that falls
+    ``STOCK_EVENTS_QUEUE_SIZE`` events behind is ended (``None``), so the
+    client reconnects and reloads instead of slowing everyone down.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.listener = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.STOCK_EVENTS_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        loop = asyncio.get_running_loop()
+        if self.listener is None or self.listener.done() or self.listener.get_loop() is not loop:
+            self.listener = loop.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+
+    def fan_out(self, data):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def listen(self):
+        while True:
+            client = redis.asyncio.Redis.from_url(settings.STOCK_EVENTS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(settings.STOCK_EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.fan_out(message['data'].decode())
+            except redis.RedisError as e:
+                print(f" [!] Stock event subscription lost: {e}")
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(1)
+
+
+broker = StockEventBroker()
@@ -0,0 +1,84 @@
+"""
+Demand forecasting and reorder points for all products at once.
+
+Daily sales history is loaded from the sales rollups into one
+``products x days`` NumPy matrix, so every statistic below is a single
+vectorized operation over the whole catalogue instead of a loop per
+product.
+"""
+import math
+from datetime import timedelta
+import numpy as np
+from django.db.models import Sum
+
+MOVING_AVERAGE = 'moving_average'
+EXPONENTIAL_SMOOTHING = 'exponential_smoothing'
+
+
+def demand_matrix(product_ids, start, days):
+    """
+    Return a ``len(product_ids) x days`` float matrix of units sold per
+    product and day, starting at ``start``. ``product_ids`` must be sorted.
+    """
+    from sale.models import DailySalesRollup
+
+    matrix = np.zeros((len(product_ids), days))
+    rows = list(
+        DailySalesRollup.objects.filter(date__gte=start, date__lt=start + timedelta(days=days))
+        .values('product_id', 'date')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+        .values_list('product_id', 'date', 'units')
+    )
+    if not rows or not len(product_ids):
+        return matrix
+
+    row_products = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    row_days = np.fromiter(((row[1] - start).days for row in rows), dtype=np.int64, count=len(rows))
+    row_units = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    # Drop sales of products that are not part of this run
+    positions = np.searchsorted(product_ids, row_products)
+    positions = np.minimum(positions, len(product_ids) - 1)
+    known = product_ids[positions] == row_products
+    np.add.at(matrix, (positions[known], row_days[known]), row_units[known])
+    return matrix
+
+
+def moving_average(matrix, window):
+    """Mean daily demand over the last ``window`` days."""
+    window = max(1, min(window, matrix.shape[1]))
+    return matrix[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing(matrix, alpha):
+    """
+    Level of simple exponential smoothing after the last day, seeded with
+    the first day. Expanded into one weighted sum per product, so there is
+    no loop over days either.
+    """
+    days = matrix.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+    return matrix @ weights + (1 - alpha) ** days * matrix[:, 0]
+
+
+def reorder_points(matrix, method, window, alpha, lead_time_days, service_factor):
+    """
+    Return ``(daily_demand, demand_std, safety_stock, reorder_point)``
+    arrays, one entry per product row of ``matrix``.
+
+    The reorder point covers the expected demand over the lead time plus
+    safety stock of ``service_factor`` standard deviations of the lead time
+    demand.
+    """
+    if method == MOVING_AVERAGE:
+        daily_demand = moving_average(matrix, window)
+    elif method == EXPONENTIAL_SMOOTHING:
+        daily_demand = exponential_smoothing(matrix, alpha)
+    else:
+        raise ValueError(f'Unknown forecast method: {method}')
+
+    demand_std = matrix.std(axis=1, ddof=1) if matrix.shape[1] > 1 else np.zeros(matrix.shape[0])
+    safety_stock = np.ceil(service_factor * demand_std * math.sqrt(lead_time_days))
+    reorder_point = np.ceil(daily_demand * lead_time_days + safety_stock)
+    return daily_demand, demand_std, safety_stock.astype(np.int64), reorder_point.astype(np.int64)
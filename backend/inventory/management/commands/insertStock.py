@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from inventory.models import Product, Stock
+from inventory.models import Product, ProductStockSummary, Stock
 from django.db import IntegrityError
 import random
 from decimal import Decimal
@@ -179,6 +179,9 @@ class Command(BaseCommand):
                 )
                 skipped_count += len(stock_entries_to_create)
 
+        # bulk_create bypasses Stock.save, so refresh the per-product summaries here
+        ProductStockSummary.refresh(product.id for product in products)
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully created {created_count} stock entries. '
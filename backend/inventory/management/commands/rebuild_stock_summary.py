@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventory.models import Product, ProductStockSummary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-product stock summaries from Stock and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of products recomputed per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report products whose summary has drifted',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        drifted = 0
+
+        self.stdout.write(f'Checking stock summaries for {len(product_ids)} products...')
+
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+            with transaction.atomic():
+                current = {
+                    row['product_id']: row
+                    for row in ProductStockSummary.objects.filter(product_id__in=chunk)
+                    .values('product_id', *ProductStockSummary.SUMMARY_FIELDS)
+                }
+                expected = ProductStockSummary.compute(chunk)
+                stale = [
+                    summary for summary in expected
+                    if current.get(summary.product_id) != {
+                        'product_id': summary.product_id,
+                        **{field: getattr(summary, field) for field in ProductStockSummary.SUMMARY_FIELDS},
+                    }
+                ]
+                drifted += len(stale)
+                if stale and not dry_run:
+                    ProductStockSummary.objects.bulk_create(
+                        stale,
+                        update_conflicts=True,
+                        unique_fields=['product'],
+                        update_fields=ProductStockSummary.SUMMARY_FIELDS + ['updated_at'],
+                    )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'{drifted} product summaries have drifted (dry run, nothing written).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} product summaries.'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:59
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0007_alter_stock_batch_number'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='stock',
+            index=models.Index(fields=['expiry_date', 'id'], name='stock_expiry_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='stock',
+            index=models.Index(fields=['quantity', 'id'], name='stock_quantity_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='stock',
+            index=models.Index(fields=['batch_number', 'id'], name='stock_batch_number_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='stock',
+            index=models.Index(fields=['created_at', 'id'], name='stock_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Merge duplicate (product, batch_number) stock rows, then make the pair unique
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_batches(apps, schema_editor):
+    """
+    Fold every duplicate batch into its oldest row: quantities are summed,
+    the expiry date of the most recently updated row wins (the task used to
+    overwrite it on each purchase) and sale lines are repointed before the
+    extra rows are deleted.
+    """
+    Stock = apps.get_model('inventory', 'Stock')
+    SaleOrderItem = apps.get_model('sale', 'SaleOrderItem')
+
+    duplicates = (
+        Stock.objects.values('product_id', 'batch_number')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in list(duplicates):
+        batches = list(
+            Stock.objects.filter(
+                product_id=group['product_id'],
+                batch_number=group['batch_number'],
+            ).order_by('id')
+        )
+        keeper, extras = batches[0], batches[1:]
+        latest = max(batches, key=lambda stock: (stock.updated_at, stock.id))
+
+        keeper.quantity = sum(stock.quantity for stock in batches)
+        keeper.expiry_date = latest.expiry_date
+        keeper.total_price = (keeper.quantity * keeper.purchase_price) * (1 + keeper.tax / 100)
+        keeper.save(update_fields=['quantity', 'expiry_date', 'total_price'])
+
+        extra_ids = [stock.id for stock in extras]
+        SaleOrderItem.objects.filter(stock_id__in=extra_ids).update(stock_id=keeper.id)
+        Stock.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_indexes_for_list_orderings'),
+        ('sale', '0006_indexes_for_list_orderings'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_batches, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stock',
+            constraint=models.UniqueConstraint(fields=('product', 'batch_number'), name='stock_product_batch_uniq'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:02
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+
+
+def populate_summaries(apps, schema_editor):
+    Stock = apps.get_model('inventory', 'Stock')
+    ProductStockSummary = apps.get_model('inventory', 'ProductStockSummary')
+
+    rows = (
+        Stock.objects.values('product_id')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            total_value=Sum('total_price'),
+            nearest_expiry=Min('expiry_date', filter=Q(quantity__gt=0)),
+            batch_count=Count('id', filter=Q(quantity__gt=0)),
+        )
+        .order_by()
+    )
+    ProductStockSummary.objects.bulk_create(
+        [
+            ProductStockSummary(
+                product_id=row['product_id'],
+                total_quantity=row['total_quantity'] or 0,
+                total_value=row['total_value'] or Decimal('0.00'),
+                nearest_expiry=row['nearest_expiry'],
+                batch_count=row['batch_count'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_stock_product_batch_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_summary', serialize=False, to='inventory.product')),
+                ('total_quantity', models.PositiveIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nearest_expiry', models.DateField(blank=True, null=True)),
+                ('batch_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['total_quantity', 'product'], name='summary_quantity_idx'), models.Index(fields=['nearest_expiry', 'product'], name='summary_expiry_idx')],
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
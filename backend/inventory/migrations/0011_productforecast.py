@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_productstocksummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='inventory.product')),
+                ('method', models.CharField(choices=[('moving_average', 'Moving average'), ('exponential_smoothing', 'Exponential smoothing')], max_length=30)),
+                ('daily_demand', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('demand_std', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('safety_stock', models.PositiveIntegerField(default=0)),
+                ('reorder_point', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reorder_point', 'product'], name='forecast_reorder_point_idx')],
+            },
+        ),
+    ]
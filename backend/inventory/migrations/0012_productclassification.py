@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_productforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductClassification',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='classification', serialize=False, to='inventory.product')),
+                ('abc_class', models.CharField(choices=[('A', 'A - top sales value'), ('B', 'B - medium sales value'), ('C', 'C - low sales value')], max_length=1)),
+                ('xyz_class', models.CharField(choices=[('X', 'X - steady demand'), ('Y', 'Y - variable demand'), ('Z', 'Z - erratic or no demand')], max_length=1)),
+                ('sales_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('value_share', models.DecimalField(decimal_places=4, default=0, max_digits=7)),
+                ('demand_cv', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['abc_class', 'product'], name='classification_abc_idx'), models.Index(fields=['xyz_class', 'product'], name='classification_xyz_idx')],
+            },
+        ),
+    ]
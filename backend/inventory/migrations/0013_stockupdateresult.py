@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_productclassification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockUpdateResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('purchase', 'Purchase'), ('sale', 'Sale')], max_length=10)),
+                ('order_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('applied', 'Applied'), ('failed', 'Failed'), ('skipped', 'Skipped')], max_length=10)),
+                ('message', models.TextField(blank=True)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stock', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='update_results', to='inventory.stock')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'order_id', 'id'], name='stock_result_order_idx'), models.Index(fields=['status', 'id'], name='stock_result_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'item_id'), name='stock_result_item_uniq')],
+            },
+        ),
+    ]
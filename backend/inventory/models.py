@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .events import publish_stock_changes
 
 # Create your models here.
 class Company(models.Model):
@@ -32,9 +37,326 @@ class Stock(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     total_price = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'batch_number'], name='stock_product_batch_uniq'),
+        ]
+        # Each index ends with id, the tie-breaker the list endpoints sort by
+        indexes = [
+            models.Index(fields=['expiry_date', 'id'], name='stock_expiry_date_id_idx'),
+            models.Index(fields=['quantity', 'id'], name='stock_quantity_id_idx'),
+            models.Index(fields=['batch_number', 'id'], name='stock_batch_number_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='stock_created_at_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_price = (self.quantity * self.purchase_price) * (1 + self.tax / 100)
-        super().save(*args, **kwargs)
+
+        # A batch moved to another product changes both summaries
+        product_ids = {self.product_id}
+        if self.pk:
+            old_product_id = Stock.objects.filter(pk=self.pk).values_list('product_id', flat=True).first()
+            if old_product_id is not None:
+                product_ids.add(old_product_id)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            ProductStockSummary.refresh(product_ids)
+            publish_stock_changes([self.pk])
+
+    def delete(self, *args, **kwargs):
+        stock_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            ProductStockSummary.refresh([self.product_id])
+            publish_stock_changes([stock_id])
+        return result
 
     def __str__(self):
         return f"{self.product.name} - {self.quantity} - {self.purchase_price} - {self.total_price}"
+
+class ProductStockSummary(models.Model):
+    """
+    Denormalized stock totals per product, kept in step with Stock.
+
+    - total_quantity: units on hand across all batches
+    - total_value: sum of the batches' total_price
+    - nearest_expiry: earliest expiry among batches still in stock
+    - batch_count: number of batches still in stock
+
+    Refreshed in the same transaction as every Stock write; the
+    rebuild_stock_summary command repairs any drift.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='stock_summary')
+    total_quantity = models.PositiveIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    nearest_expiry = models.DateField(null=True, blank=True)
+    batch_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SUMMARY_FIELDS = ['total_quantity', 'total_value', 'nearest_expiry', 'batch_count']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['total_quantity', 'product'], name='summary_quantity_idx'),
+            models.Index(fields=['nearest_expiry', 'product'], name='summary_expiry_idx'),
+        ]
+
+    @classmethod
+    def compute(cls, product_ids):
+        """Aggregate Stock for ``product_ids`` into unsaved summary instances."""
+        totals = {
+            row['product_id']: row
+            for row in Stock.objects.filter(product_id__in=product_ids)
+            .values('product_id')
+            .annotate(
+                total_quantity=Coalesce(Sum('quantity'), 0),
+                total_value=Coalesce(Sum('total_price'), Decimal('0.00')),
+                nearest_expiry=Min('expiry_date', filter=Q(quantity__gt=0)),
+                batch_count=Count('id', filter=Q(quantity__gt=0)),
+            )
+            .order_by()
+        }
+        summaries = []
+        # Products deleted in the same transaction are skipped
+        for product_id in Product.objects.filter(id__in=product_ids).values_list('id', flat=True):
+            row = totals.get(product_id, {})
+            summaries.append(cls(
+                product_id=product_id,
+                total_quantity=row.get('total_quantity', 0),
+                total_value=row.get('total_value', Decimal('0.00')),
+                nearest_expiry=row.get('nearest_expiry'),
+                batch_count=row.get('batch_count', 0),
+            ))
+        return summaries
+
+    @classmethod
+    def refresh(cls, product_ids):
+        """Recompute the summaries of ``product_ids`` under a lock on their rows."""
+        product_ids = {product_id for product_id in product_ids if product_id is not None}
+        if not product_ids:
+            return []
+        with transaction.atomic():
+            # Products deleted in the same transaction are skipped
+            existing = Product.objects.filter(id__in=product_ids).values_list('id', flat=True)
+            cls.objects.bulk_create([cls(product_id=product_id) for product_id in existing], ignore_conflicts=True)
+            # Lock the summaries before aggregating, so a concurrent refresh of
+            # the same product waits and then aggregates this one's stock too,
+            # instead of overwriting it with a total computed before it
+            list(cls.objects.select_for_update().filter(product_id__in=product_ids).order_by('product_id').values_list('product_id', flat=True))
+            summaries = cls.compute(product_ids)
+            now = timezone.now()
+            for summary in summaries:
+                summary.updated_at = now
+            cls.objects.bulk_update(summaries, cls.SUMMARY_FIELDS + ['updated_at'])
+            return summaries
+
+    def __str__(self):
+        return f"{self.product_id} - {self.total_quantity} on hand"
+
+
+class ProductForecast(models.Model):
+    """
+    Forecast daily demand and reorder point per product.
+
+    Recomputed for all products by the compute_reorder_points task from the
+    daily sales rollups. A product needs reordering once its stock on hand
+    falls below reorder_point.
+    """
+    METHOD_CHOICES = [
+        ('moving_average', 'Moving average'),
+        ('exponential_smoothing', 'Exponential smoothing'),
+    ]
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    method = models.CharField(max_length=30, choices=METHOD_CHOICES)
+    daily_demand = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    demand_std = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    safety_stock = models.PositiveIntegerField(default=0)
+    reorder_point = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    FORECAST_FIELDS = ['method', 'daily_demand', 'demand_std', 'safety_stock', 'reorder_point']
+
+    @staticmethod
+    def products_below_reorder_point():
+        """
+        Products whose stock on hand is below their reorder point, annotated
+        with ``on_hand`` and ``shortfall``, largest shortfall first. On hand
+        comes from ProductStockSummary; products without stock count as 0.
+        """
+        return (
+            Product.objects
+            .annotate(on_hand=Coalesce(F('stock_summary__total_quantity'), 0))
+            .filter(forecast__reorder_point__gt=F('on_hand'))
+            .annotate(shortfall=F('forecast__reorder_point') - F('on_hand'))
+            .order_by('-shortfall', 'name')
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['reorder_point', 'product'], name='forecast_reorder_point_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - reorder at {self.reorder_point}"
+
+
+class ProductClassification(models.Model):
+    """
+    ABC class (share of sales value) and XYZ class (demand variability)
+    per product.
+
+    Recomputed for all products by the classify_products task from the
+    daily sales rollups.
+    """
+    ABC_CHOICES = [
+        ('A', 'A - top sales value'),
+        ('B', 'B - medium sales value'),
+        ('C', 'C - low sales value'),
+    ]
+    XYZ_CHOICES = [
+        ('X', 'X - steady demand'),
+        ('Y', 'Y - variable demand'),
+        ('Z', 'Z - erratic or no demand'),
+    ]
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='classification')
+    abc_class = models.CharField(max_length=1, choices=ABC_CHOICES)
+    xyz_class = models.CharField(max_length=1, choices=XYZ_CHOICES)
+    sales_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    value_share = models.DecimalField(max_digits=7, decimal_places=4, default=0)
+    demand_cv = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    CLASSIFICATION_FIELDS = ['abc_class', 'xyz_class', 'sales_value', 'value_share', 'demand_cv']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['abc_class', 'product'], name='classification_abc_idx'),
+            models.Index(fields=['xyz_class', 'product'], name='classification_xyz_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.abc_class}{self.xyz_class}"
+
+
+class StockAlreadyApplied(Exception):
+    """Another delivery of the order applied some of the lines first."""
+
+
+class StockUpdateResult(models.Model):
+    """
+    Outcome of applying one purchase or sale order line to stock.
+
+    The stock tasks insert the 'applied' row (``claim``) in the same
+    transaction as the stock change, before making it, so it doubles as a
+    marker: the unique (kind, item_id) constraint lets only one delivery of
+    a line through, and running a chunk again skips the lines that already
+    went through.
+    """
+    KIND_CHOICES = [
+        ('purchase', 'Purchase'),
+        ('sale', 'Sale'),
+    ]
+    STATUS_CHOICES = [
+        ('applied', 'Applied'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    order_id = models.PositiveBigIntegerField(null=True, blank=True)
+    item_id = models.PositiveBigIntegerField()
+    stock = models.ForeignKey(Stock, on_delete=models.SET_NULL, null=True, blank=True, related_name='update_results')
+    quantity = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    message = models.TextField(blank=True)
+    task_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'item_id'], name='stock_result_item_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'order_id', 'id'], name='stock_result_order_idx'),
+            models.Index(fields=['status', 'id'], name='stock_result_status_idx'),
+        ]
+
+    @classmethod
+    def applied_item_ids(cls, kind, item_ids):
+        """Return the subset of ``item_ids`` already applied to stock."""
+        item_ids = [item_id for item_id in item_ids if item_id is not None]
+        if not item_ids:
+            return set()
+        return set(
+            cls.objects.filter(kind=kind, item_id__in=item_ids, status='applied')
+            .values_list('item_id', flat=True)
+        )
+
+    @classmethod
+    def claim(cls, kind, order_id, task_id, lines):
+        """
+        Mark ``(item_id, stock_id, quantity)`` lines applied, before their
+        stock is changed in the same transaction.
+
+        The rows are plainly inserted, so if another delivery of the order
+        marked any of the lines first (even concurrently) the insert hits
+        the unique constraint and ``StockAlreadyApplied`` is raised; the
+        caller's transaction must then roll back and retry without them.
+        Earlier 'failed' or 'skipped' rows of the lines are replaced.
+        """
+        results = [
+            cls(
+                kind=kind, order_id=order_id, item_id=item_id, stock_id=stock_id,
+                quantity=quantity, status='applied', task_id=task_id or '',
+            )
+            for item_id, stock_id, quantity in lines
+        ]
+        if not results:
+            return results
+        try:
+            with transaction.atomic():
+                cls.objects.filter(kind=kind, item_id__in=[result.item_id for result in results]).exclude(
+                    status='applied'
+                ).delete()
+                cls.objects.bulk_create(results)
+        except IntegrityError:
+            raise StockAlreadyApplied(f'Some {kind} lines of order {order_id} were applied by another delivery')
+        return results
+
+    @classmethod
+    def record(cls, kind, order_id, task_id, outcomes):
+        """
+        Store one row per ``(item_id, stock_id, quantity, status, message)``
+        'failed' or 'skipped' outcome, replacing earlier outcomes of the
+        same lines but never an 'applied' row. Lines without an id cannot be
+        tracked and are left out.
+        """
+        results = [
+            cls(
+                kind=kind,
+                order_id=order_id,
+                item_id=item_id,
+                stock_id=stock_id,
+                quantity=quantity or 0,
+                status=status,
+                message=message,
+                task_id=task_id or '',
+            )
+            for item_id, stock_id, quantity, status, message in outcomes
+            if item_id is not None
+        ]
+        if results:
+            with transaction.atomic():
+                cls.objects.filter(kind=kind, item_id__in=[result.item_id for result in results]).exclude(
+                    status='applied'
+                ).delete()
+                # A line applied meanwhile keeps its 'applied' row
+                cls.objects.bulk_create(results, ignore_conflicts=True)
+        return results
+
+    def __str__(self):
+        return f"{self.kind} item {self.item_id} - {self.status}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Company, Product, Stock
+from .models import Company, Product, Stock, StockUpdateResult
 
 class CompanySerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +8,14 @@ class CompanySerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
+    # Availability from ProductStockSummary; null until the product has stock
+    total_quantity = serializers.IntegerField(source='stock_summary.total_quantity', read_only=True)
+    stock_value = serializers.DecimalField(source='stock_summary.total_value', max_digits=14, decimal_places=2, read_only=True)
+    nearest_expiry = serializers.DateField(source='stock_summary.nearest_expiry', read_only=True)
+    batch_count = serializers.IntegerField(source='stock_summary.batch_count', read_only=True)
+    # ABC/XYZ class from ProductClassification; null until first classified
+    abc_class = serializers.CharField(source='classification.abc_class', read_only=True)
+    xyz_class = serializers.CharField(source='classification.xyz_class', read_only=True)
     
     class Meta:
         model = Product
@@ -20,3 +28,9 @@ class StockSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stock
         fields = '__all__'
+
+
+class StockUpdateResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockUpdateResult
+        fields = '__all__'
@@ -1,18 +1,178 @@
 from __future__ import absolute_import, unicode_literals
-from celery import shared_task
-from django.db import models, transaction
-from django.core.exceptions import ValidationError
-from .models import Stock
+from datetime import date, timedelta
+from decimal import Decimal
+from celery import group, shared_task
+from django.db import OperationalError, models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.conf import settings
+from django.utils import timezone
+from .events import publish_stock_changes
+from .models import (
+    Product, ProductClassification, ProductForecast, ProductStockSummary, Stock, StockAlreadyApplied, StockUpdateResult,
+)
 
-@shared_task
-def update_stock_from_purchase(items_data):
+def merge_purchase_batches(batches):
     """
-    Celery task to update stock levels from a completed purchase order.
+    Add purchased batches to stock without a read-then-write race.
+
+    ``batches`` is a list of dicts keyed like the Stock fields (with
+    ``product_id``), at most one per (product, batch_number). Missing batches
+    are inserted with zero quantity, relying on the unique
+    (product, batch_number) constraint to ignore rows another worker created
+    first, then all batches are incremented in a single UPDATE.
+
+    Returns the Stock id of each (product_id, batch_number).
     """
-    print(" [x] Received 'update_stock_from_purchase' task")
-    print(f" [x] Processing {len(items_data)} items")
-    
+    if not batches:
+        return {}
+
+    Stock.objects.bulk_create(
+        [
+            Stock(
+                product_id=batch['product_id'],
+                batch_number=batch['batch_number'],
+                expiry_date=batch['expiry_date'],
+                quantity=0,
+                purchase_price=batch['purchase_price'],
+                sale_price=batch['sale_price'],
+                mrp=batch['mrp'],
+                tax=batch['tax'],
+                hsn_code=batch['hsn_code'],
+                total_price=Decimal('0.00'),
+            )
+            for batch in batches
+        ],
+        ignore_conflicts=True,
+    )
+
+    by_key = {(batch['product_id'], batch['batch_number']): batch for batch in batches}
+    stock_ids = {}
+    candidates = Stock.objects.filter(
+        product_id__in={batch['product_id'] for batch in batches},
+        batch_number__in={batch['batch_number'] for batch in batches},
+    ).values_list('id', 'product_id', 'batch_number')
+    for stock_id, product_id, batch_number in candidates:
+        if (product_id, batch_number) in by_key:
+            stock_ids[stock_id] = by_key[(product_id, batch_number)]
+
+    added = Case(
+        *[When(id=stock_id, then=Value(batch['quantity'])) for stock_id, batch in stock_ids.items()],
+        output_field=models.PositiveIntegerField(),
+    )
+    expiry_date = Case(
+        *[When(id=stock_id, then=Value(batch['expiry_date'])) for stock_id, batch in stock_ids.items()],
+        output_field=models.DateField(),
+    )
+    new_quantity = F('quantity') + added
+    # Multiply by 0.01 rather than divide by 100: SQLite would do integer division
+    total_price = ExpressionWrapper(
+        new_quantity * F('purchase_price') * (1 + F('tax') * Value(Decimal('0.01'))),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    Stock.objects.filter(id__in=stock_ids).update(
+        quantity=new_quantity,
+        expiry_date=expiry_date,
+        total_price=total_price,
+        updated_at=timezone.now(),
+    )
+    ProductStockSummary.refresh(product_id for product_id, _ in by_key)
+    publish_stock_changes(stock_ids)
+    return {
+        (batch['product_id'], batch['batch_number']): stock_id
+        for stock_id, batch in stock_ids.items()
+    }
+
+
+def order_items(kind):
+    """Return the order line queryset and its order foreign key for ``kind``."""
+    if kind == 'purchase':
+        from purchase.models import PurchaseOrderItem
+        return PurchaseOrderItem.objects, 'purchase_order_id'
+    from sale.models import SaleOrderItem
+    return SaleOrderItem.objects, 'sale_order_id'
+
+
+def dispatch_stock_update(kind, order_id):
+    """
+    Queue the stock changes of a completed order as a group of tasks of at
+    most STOCK_TASK_CHUNK_SIZE lines each, so large orders are spread over
+    all workers. Only the order id and line ids are sent; the tasks load the
+    lines themselves and are idempotent, see StockUpdateResult.
+    """
+    task = update_stock_from_purchase if kind == 'purchase' else reduce_stock_from_sale
+    items, order_field = order_items(kind)
+    item_ids = list(items.filter(**{order_field: order_id}).order_by('id').values_list('id', flat=True))
+    size = settings.STOCK_TASK_CHUNK_SIZE
+    chunks = [item_ids[start:start + size] for start in range(0, len(item_ids), size)]
+    result = group(task.s(order_id, chunk) for chunk in chunks).apply_async()
+    print(f" [x] Dispatched {len(chunks)} '{task.name}' chunks for {kind} order {order_id}")
+    return result
+
+
+def schedule_stock_update(kind, order_id):
+    """
+    Hand the stock changes of a just completed order on, inside the
+    transaction that completes it.
+
+    Orders of at most STOCK_INLINE_MAX_LINES lines are applied right here,
+    so their stock is up to date as soon as the order is; larger orders get
+    an outbox event and are applied by the chunked Celery tasks. Returns
+    True when the stock was applied inline.
+    """
+    from core.models import OutboxEvent
+
+    max_lines = settings.STOCK_INLINE_MAX_LINES
+    if max_lines > 0:
+        items, order_field = order_items(kind)
+        line_count = items.filter(**{order_field: order_id}).count()
+        if line_count <= max_lines:
+            print(f" [x] Applying {line_count} lines of {kind} order {order_id} inline")
+            apply = apply_purchase_order if kind == 'purchase' else apply_sale_order
+            apply(order_id)
+            return True
+
+    OutboxEvent.objects.create(kind=kind, order_id=order_id)
+    return False
+
+
+# Stock tasks are acknowledged only once done, so a lost worker leads to
+# redelivery, and retried on database hiccups. Both are safe because lines
+# already applied are skipped.
+STOCK_TASK_OPTIONS = {
+    'bind': True,
+    'acks_late': True,
+    'reject_on_worker_lost': True,
+    'autoretry_for': (OperationalError,),
+    'retry_backoff': True,
+    'max_retries': 5,
+}
+
+
+def apply_purchase_order(order_id, item_ids=None, task_id=''):
+    """
+    Update stock levels from a completed purchase order, or the
+    ``item_ids`` chunk of it.
+
+    Lines already applied are skipped. The outcome of every line is stored
+    in StockUpdateResult; lines of the same chunk are applied together, so
+    they succeed or fail as a whole.
+    """
+    items, _ = order_items('purchase')
+    items = items.filter(purchase_order_id=order_id)
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    items_data = list(items.order_by('id').values(
+        'id', 'product', 'batch_number', 'expiry_date', 'quantity',
+        'purchase_price', 'sale_price', 'mrp', 'tax', 'hsn_code',
+    ))
+    print(f" [x] Processing {len(items_data)} items of purchase order {order_id}")
+
+    applied = StockUpdateResult.applied_item_ids('purchase', [item['id'] for item in items_data])
+    outcomes = []
+    lines = []
+    batches = {}
     for item_data in items_data:
+        item_id = item_data.get('id')
         product_id = item_data.get('product')
         quantity = item_data.get('quantity')
         batch_number = item_data.get('batch_number')
@@ -25,126 +185,290 @@ def update_stock_from_purchase(items_data):
 
         print(f" [x] Processing item: Product {product_id}, Batch {batch_number}, Qty {quantity}")
 
+        if item_id in applied:
+            print(f" [=] Item {item_id} already applied, skipping")
+            continue
+
         if not all([product_id, quantity, batch_number, expiry_date, purchase_price, sale_price, mrp]):
             print(f" [!] Incomplete item data received: {item_data}")
+            outcomes.append((item_id, None, quantity, 'skipped', 'Incomplete item data'))
             continue
 
         try:
             # Convert string values to appropriate types
-            from decimal import Decimal
-            quantity = int(quantity)
-            purchase_price = Decimal(str(purchase_price))
-            sale_price = Decimal(str(sale_price))
-            mrp = Decimal(str(mrp))
-            tax = Decimal(str(tax)) if tax else Decimal('5.00')
-            hsn_code = str(hsn_code) if hsn_code else ''
-
-            with transaction.atomic():
-                # Check if stock with same product and batch already exists
-                existing_stock = Stock.objects.filter(
-                    product_id=product_id,
-                    batch_number=batch_number
-                ).first()
-                
-                if existing_stock:
-                    # If the stock exists, update its quantity
-                    existing_stock.quantity = models.F('quantity') + quantity
-                    existing_stock.expiry_date = expiry_date  # Update expiry date
-                    existing_stock.save()
-                    print(f" [+] Stock updated for product {product_id}, batch {batch_number}")
-                else:
-                    # If the stock does not exist, create a new one
-                    new_stock = Stock.objects.create(
-                        product_id=product_id,
-                        batch_number=batch_number,
-                        expiry_date=expiry_date,
-                        quantity=quantity,
-                        purchase_price=purchase_price,
-                        sale_price=sale_price,
-                        mrp=mrp,
-                        tax=tax,
-                        hsn_code=hsn_code,
-                        # total_price will be calculated automatically by the model
-                    )
-                    print(f" [+] New stock created for product {product_id}, batch {batch_number} (Stock ID: {new_stock.id})")
-
-        except Exception as e:
-            print(f" [!] An error occurred while updating stock for product {product_id}: {e}")
-            import traceback
-            traceback.print_exc()
-            # Optionally, add retry logic or log to a monitoring service
-    
+            batch = {
+                'product_id': int(product_id),
+                'batch_number': batch_number,
+                'expiry_date': date.fromisoformat(str(expiry_date)),
+                'quantity': int(quantity),
+                'purchase_price': Decimal(str(purchase_price)),
+                'sale_price': Decimal(str(sale_price)),
+                'mrp': Decimal(str(mrp)),
+                'tax': Decimal(str(tax)) if tax else Decimal('5.00'),
+                'hsn_code': str(hsn_code) if hsn_code else '',
+            }
+        except (TypeError, ValueError, ArithmeticError) as e:
+            print(f" [!] Invalid item data for product {product_id}: {e}")
+            outcomes.append((item_id, None, 0, 'failed', f'Invalid item data: {e}'))
+            continue
+
+        # Several lines of the same order may carry the same batch
+        key = (batch['product_id'], batch['batch_number'])
+        lines.append((item_id, key, batch['quantity']))
+        if key in batches:
+            batches[key]['quantity'] += batch['quantity']
+            batches[key]['expiry_date'] = batch['expiry_date']
+        else:
+            batches[key] = batch
+
+    try:
+        with transaction.atomic():
+            # Claim the lines first: a concurrent delivery of them fails here
+            StockUpdateResult.claim('purchase', order_id, task_id, [
+                (item_id, None, quantity) for item_id, _, quantity in lines
+            ])
+            stock_ids = merge_purchase_batches(list(batches.values()))
+            if lines:
+                StockUpdateResult.objects.filter(
+                    kind='purchase', item_id__in=[item_id for item_id, _, _ in lines]
+                ).update(stock_id=Case(
+                    *[When(item_id=item_id, then=Value(stock_ids.get(key))) for item_id, key, _ in lines],
+                    output_field=models.BigIntegerField(),
+                ))
+        StockUpdateResult.record('purchase', order_id, task_id, outcomes)
+        print(f" [+] Stock updated for {len(stock_ids)} batches")
+    except StockAlreadyApplied:
+        print(f" [=] Purchase order {order_id} was partly applied by another delivery, retrying the rest")
+        return apply_purchase_order(order_id, item_ids, task_id)
+    except Exception as e:
+        print(f" [!] An error occurred while updating stock: {e}")
+        import traceback
+        traceback.print_exc()
+        StockUpdateResult.record('purchase', order_id, task_id, outcomes + [
+            (item_id, None, quantity, 'failed', str(e))
+            for item_id, _, quantity in lines
+        ])
+        raise
+
     print(" [x] Stock update process completed.")
     return "Stock update process completed."
 
-@shared_task
-def reduce_stock_from_sale(items_data):
+def apply_sale_order(order_id, item_ids=None, task_id=''):
     """
-    Celery task to reduce stock levels from a completed sale order.
+    Reduce stock levels from a completed sale order, or the ``item_ids``
+    chunk of it.
+
+    The batches sold are locked in one query and reduced with a single
+    UPDATE, together with the StockUpdateResult rows of the lines, so lines
+    already applied are skipped when the chunk runs again. A line asking
+    for more than is left of its batch fails on its own.
     """
-    print(" [x] Received 'reduce_stock_from_sale' task")
-    print(f" [x] Processing {len(items_data)} items")
-    
+    items, _ = order_items('sale')
+    items = items.filter(sale_order_id=order_id)
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    items_data = list(items.order_by('id').values(
+        'id', 'stock', 'quantity',
+        product=F('stock__product__name'), batch_number=F('stock__batch_number'),
+    ))
+    print(f" [x] Processing {len(items_data)} items of sale order {order_id}")
+
+    applied = StockUpdateResult.applied_item_ids('sale', [item['id'] for item in items_data])
+    outcomes = []
+    pending = []
     for item_data in items_data:
-        stock_id = item_data.get('stock')
-        quantity = item_data.get('quantity')
-        product_name = item_data.get('product', 'Unknown Product')
-        batch_number = item_data.get('batch_number')
+        item_id = item_data.get('id')
+        if item_id in applied:
+            print(f" [=] Item {item_id} already applied, skipping")
+        elif not all([item_data.get('stock'), item_data.get('quantity')]):
+            print(f" [!] Incomplete item data received: {item_data}")
+            outcomes.append((item_id, None, item_data.get('quantity'), 'skipped', 'Incomplete item data'))
+        else:
+            pending.append(item_data)
 
-        print(f" [x] Processing sale item: Product {product_name}, Stock ID {stock_id}, Batch {batch_number}, Qty {quantity}")
+    lines = []
+    try:
+        with transaction.atomic():
+            stock_rows = {
+                stock_id: [product_id, quantity]
+                for stock_id, product_id, quantity in Stock.objects.select_for_update()
+                .filter(id__in={item['stock'] for item in pending})
+                .order_by('id')
+                .values_list('id', 'product_id', 'quantity')
+            }
+            sold = {}
+            for item_data in pending:
+                item_id, stock_id, quantity = item_data['id'], item_data['stock'], item_data['quantity']
+                row = stock_rows.get(stock_id)
+                if row is None:
+                    message = f"Stock not found with ID {stock_id}"
+                elif row[1] < quantity:
+                    message = (
+                        f"Insufficient stock for product {item_data['product']}, batch {item_data['batch_number']}. "
+                        f"Available: {row[1]}, Required: {quantity}"
+                    )
+                else:
+                    row[1] -= quantity
+                    sold[stock_id] = sold.get(stock_id, 0) + quantity
+                    lines.append((item_id, stock_id, quantity))
+                    continue
+                print(f" [!] Validation error: {message}")
+                outcomes.append((item_id, None, quantity, 'failed', message))
 
-        if not all([stock_id, quantity]):
-            print(f" [!] Incomplete item data received: {item_data}")
-            continue
+            # Claim the lines first: a concurrent delivery of them fails here
+            StockUpdateResult.claim('sale', order_id, task_id, lines)
+            if sold:
+                new_quantity = F('quantity') - Case(
+                    *[When(id=stock_id, then=Value(quantity)) for stock_id, quantity in sold.items()],
+                    output_field=models.PositiveIntegerField(),
+                )
+                # Multiply by 0.01 rather than divide by 100: SQLite would do integer division
+                total_price = ExpressionWrapper(
+                    new_quantity * F('purchase_price') * (1 + F('tax') * Value(Decimal('0.01'))),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                )
+                Stock.objects.filter(id__in=sold).update(
+                    quantity=new_quantity, total_price=total_price, updated_at=timezone.now(),
+                )
+                ProductStockSummary.refresh(stock_rows[stock_id][0] for stock_id in sold)
+                publish_stock_changes(sold)
+        StockUpdateResult.record('sale', order_id, task_id, outcomes)
+        print(f" [-] Stock reduced for {len(sold)} batches")
+        for stock_id in sold:
+            if stock_rows[stock_id][1] == 0:
+                # Depleted batches are kept for the audit trail
+                print(f" [!] Stock depleted for batch {stock_id}")
+    except StockAlreadyApplied:
+        print(f" [=] Sale order {order_id} was partly applied by another delivery, retrying the rest")
+        return apply_sale_order(order_id, item_ids, task_id)
+    except Exception as e:
+        print(f" [!] An error occurred while reducing stock: {e}")
+        import traceback
+        traceback.print_exc()
+        StockUpdateResult.record('sale', order_id, task_id, outcomes + [
+            (item_id, None, quantity, 'failed', str(e))
+            for item_id, _, quantity in lines
+        ])
+        raise
 
-        try:
-            quantity = int(quantity)
-            stock_id = int(stock_id)
-
-            with transaction.atomic():
-                # Find the exact stock entry by ID
-                try:
-                    stock_entry = Stock.objects.get(id=stock_id)
-                    
-                    # Check if sufficient quantity is available
-                    if stock_entry.quantity < quantity:
-                        raise ValidationError(
-                            f"Insufficient stock for product {stock_entry.product.name}, batch {stock_entry.batch_number}. "
-                            f"Available: {stock_entry.quantity}, Required: {quantity}"
-                        )
-                    
-                    # Reduce the stock quantity
-                    stock_entry.quantity = models.F('quantity') - quantity
-                    stock_entry.save()
-                    
-                    # Refresh to get the updated quantity
-                    stock_entry.refresh_from_db()
-                    
-                    print(f" [-] Stock reduced for product {stock_entry.product.name}, batch {stock_entry.batch_number}. "
-                          f"Remaining quantity: {stock_entry.quantity}")
-                    
-                    # If quantity becomes 0, optionally keep the record for audit trail
-                    # or delete it based on business requirements
-                    if stock_entry.quantity == 0:
-                        print(f" [!] Stock depleted for product {stock_entry.product.name}, batch {stock_entry.batch_number}")
-                        # Option 1: Keep for audit trail (recommended)
-                        # Option 2: Delete if preferred
-                        # stock_entry.delete()
-                        
-                except Stock.DoesNotExist:
-                    error_msg = f"Stock not found with ID {stock_id}"
-                    print(f" [!] {error_msg}")
-                    raise ValidationError(error_msg)
-
-        except ValidationError as ve:
-            print(f" [!] Validation error: {ve}")
-            # You might want to implement proper error handling here
-            # such as notifying admins or creating error logs
-            
-        except Exception as e:
-            print(f" [!] An error occurred while reducing stock for stock ID {stock_id}: {e}")
-            import traceback
-            traceback.print_exc()
-    
     print(" [x] Stock reduction process completed.")
     return "Stock reduction process completed."
+
+
+@shared_task(**STOCK_TASK_OPTIONS)
+def update_stock_from_purchase(self, order_id, item_ids=None):
+    """
+    Celery task to update stock levels from a completed purchase order, or
+    the ``item_ids`` chunk of it.
+    """
+    print(" [x] Received 'update_stock_from_purchase' task")
+    return apply_purchase_order(order_id, item_ids, self.request.id)
+
+
+@shared_task(**STOCK_TASK_OPTIONS)
+def reduce_stock_from_sale(self, order_id, item_ids=None):
+    """
+    Celery task to reduce stock levels from a completed sale order, or the
+    ``item_ids`` chunk of it.
+    """
+    print(" [x] Received 'reduce_stock_from_sale' task")
+    return apply_sale_order(order_id, item_ids, self.request.id)
+
+
+@shared_task
+def compute_reorder_points():
+    """
+    Celery beat task forecasting daily demand and reorder points for all
+    products from the last FORECAST_HISTORY_DAYS of sales.
+    """
+    import numpy as np
+    from .forecasting import demand_matrix, reorder_points
+
+    print(" [x] Received 'compute_reorder_points' task")
+    days = settings.FORECAST_HISTORY_DAYS
+    method = settings.FORECAST_METHOD
+    start = timezone.localdate() - timedelta(days=days)
+
+    product_ids = np.fromiter(Product.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    matrix = demand_matrix(product_ids, start, days)
+    daily_demand, demand_std, safety_stock, reorder_point = reorder_points(
+        matrix,
+        method,
+        window=settings.FORECAST_WINDOW_DAYS,
+        alpha=settings.FORECAST_SMOOTHING_ALPHA,
+        lead_time_days=settings.REORDER_LEAD_TIME_DAYS,
+        service_factor=settings.REORDER_SERVICE_FACTOR,
+    )
+
+    forecasts = [
+        ProductForecast(
+            product_id=product_id,
+            method=method,
+            daily_demand=Decimal(f'{demand:.3f}'),
+            demand_std=Decimal(f'{std:.3f}'),
+            safety_stock=safety,
+            reorder_point=point,
+        )
+        for product_id, demand, std, safety, point in zip(
+            product_ids.tolist(), daily_demand.tolist(), demand_std.tolist(),
+            safety_stock.tolist(), reorder_point.tolist(),
+        )
+    ]
+    with transaction.atomic():
+        ProductForecast.objects.bulk_create(
+            forecasts,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=ProductForecast.FORECAST_FIELDS + ['computed_at'],
+        )
+
+    print(f" [+] Reorder points computed for {len(forecasts)} products")
+    return f"Reorder points computed for {len(forecasts)} products."
+
+
+@shared_task
+def classify_products():
+    """
+    Celery beat task assigning every product its ABC class by share of
+    sales value and XYZ class by variability of weekly demand over the last
+    CLASSIFICATION_HISTORY_DAYS.
+    """
+    import numpy as np
+    from .classification import abc_classes, sales_values, xyz_classes
+    from .forecasting import demand_matrix
+
+    print(" [x] Received 'classify_products' task")
+    days = settings.CLASSIFICATION_HISTORY_DAYS
+    start = timezone.localdate() - timedelta(days=days)
+
+    product_ids = np.fromiter(Product.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    values = sales_values(product_ids, start, days)
+    abc, value_share = abc_classes(values, settings.ABC_A_SHARE, settings.ABC_B_SHARE)
+    xyz, cv = xyz_classes(demand_matrix(product_ids, start, days), settings.XYZ_X_CV, settings.XYZ_Y_CV)
+
+    classifications = [
+        ProductClassification(
+            product_id=product_id,
+            abc_class=abc_class,
+            xyz_class=xyz_class,
+            sales_value=Decimal(f'{value:.2f}'),
+            value_share=Decimal(f'{share:.4f}'),
+            demand_cv=Decimal(f'{variation:.3f}') if np.isfinite(variation) else None,
+        )
+        for product_id, abc_class, xyz_class, value, share, variation in zip(
+            product_ids.tolist(), abc.tolist(), xyz.tolist(), values.tolist(),
+            value_share.tolist(), cv.tolist(),
+        )
+    ]
+    with transaction.atomic():
+        ProductClassification.objects.bulk_create(
+            classifications,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=ProductClassification.CLASSIFICATION_FIELDS + ['computed_at'],
+        )
+
+    print(f" [+] Classified {len(classifications)} products")
+    return f"Classified {len(classifications)} products."
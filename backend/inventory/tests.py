@@ -1,3 +1,541 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+import asyncio
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.mixins import BatchFetchMixin
+from core.testing import FastListParityMixin
+from core.celery import app
+from purchase.models import PurchaseOrder, PurchaseOrderItem, Supplier
+from sale.models import Customer, DailySalesRollup, SaleOrder, SaleOrderItem
+from .classification import abc_classes, xyz_classes
+from .events import StockEventBroker, stock_change_events
+from .forecasting import exponential_smoothing, moving_average
+from .models import Company, Product, ProductClassification, ProductForecast, ProductStockSummary, Stock, StockUpdateResult
+from .tasks import (
+    apply_sale_order, classify_products, compute_reorder_points, dispatch_stock_update, reduce_stock_from_sale,
+    update_stock_from_purchase,
+)
+from .views import CompanyViewSet, ProductViewSet, StockUpdateResultViewSet, StockViewSet
 
-# Create your tests here.
+
+class FastListSerializationTests(FastListParityMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        acme = Company.objects.create(name='Acme Pharma')
+        zen = Company.objects.create(name='Zen Labs')
+        products = [
+            Product.objects.create(name='Paracetamol 500mg', company=acme),
+            Product.objects.create(name='Amoxicillin 250mg', company=zen),
+            Product.objects.create(name='Orphan Syrup', company=None),
+        ]
+        for index, product in enumerate(products):
+            Stock.objects.create(
+                product=product,
+                batch_number=f'B{index:03d}',
+                expiry_date=date(2026, 1 + index, 15),
+                quantity=index * 7,
+                purchase_price=Decimal('10.50') + index,
+                sale_price=Decimal('15.00'),
+                mrp=Decimal('19.99'),
+                tax=Decimal('12.00') if index else Decimal('0'),
+                hsn_code='30049099' if index != 1 else None,
+            )
+        # No stock, so no summary row either
+        Product.objects.create(name='Unstocked Cream', company=zen)
+
+    def test_company_list_parity(self):
+        self.assertListParity('/api/inventory/companies/')
+        self.assertListParity('/api/inventory/companies/?ordering=-name&search=a')
+
+    def test_product_list_parity(self):
+        self.assertListParity('/api/inventory/products/')
+        self.assertListParity('/api/inventory/products/?ordering=company__name')
+        self.assertListParity('/api/inventory/products/?ordering=-stock_summary__total_quantity')
+        self.assertListParity('/api/inventory/products/?in_stock=false&ordering=stock_summary__nearest_expiry')
+        self.assertListParity('/api/inventory/products/?ordering=-classification__abc_class')
+
+    def test_stock_list_parity(self):
+        self.assertListParity('/api/inventory/stock/')
+        self.assertListParity('/api/inventory/stock/?ordering=-expiry_date&page_size=2&page=2')
+        self.assertListParity('/api/inventory/stock/?search=Orphan')
+
+
+class BatchFetchTests(SimpleTestCase):
+
+    def test_viewsets_fetch_in_batches(self):
+        for viewset in (CompanyViewSet, ProductViewSet, StockViewSet, StockUpdateResultViewSet):
+            self.assertTrue(issubclass(viewset, BatchFetchMixin), viewset)
+
+
+class PurchaseStockMergeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Paracetamol 500mg')
+        cls.existing = Stock.objects.create(
+            product=cls.product,
+            batch_number='OLD1',
+            expiry_date=date(2026, 1, 1),
+            quantity=10,
+            purchase_price=Decimal('2.00'),
+            sale_price=Decimal('3.00'),
+            mrp=Decimal('4.00'),
+            tax=Decimal('12.00'),
+        )
+        supplier = Supplier.objects.create(name='MediSupply Co.', email='orders@medisupply.test')
+        cls.order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PINV-1')
+
+    def item(self, batch_number, quantity, expiry_date=date(2027, 5, 31)):
+        return PurchaseOrderItem.objects.create(
+            purchase_order=self.order,
+            product=self.product,
+            batch_number=batch_number,
+            expiry_date=expiry_date,
+            quantity=quantity,
+            purchase_price=Decimal('2.00'),
+            sale_price=Decimal('3.00'),
+            mrp=Decimal('4.00'),
+            tax=Decimal('12.00'),
+            hsn_code='30049099',
+        )
+
+    def test_purchase_increments_existing_and_creates_new_batches(self):
+        self.item('OLD1', 5)
+        self.item('NEW1', 3)
+        self.item('NEW1', 4, date(2027, 6, 30))
+        update_stock_from_purchase(self.order.id)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.quantity, 15)
+        self.assertEqual(self.existing.expiry_date, date(2027, 5, 31))
+        self.assertEqual(self.existing.total_price, Decimal('33.60'))
+
+        created = Stock.objects.get(product=self.product, batch_number='NEW1')
+        self.assertEqual(created.quantity, 7)
+        self.assertEqual(created.expiry_date, date(2027, 6, 30))
+        self.assertEqual(created.total_price, Decimal('15.68'))
+        self.assertEqual(Stock.objects.count(), 2)
+
+    def test_duplicate_batches_are_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Stock.objects.create(
+                product=self.product,
+                batch_number='OLD1',
+                expiry_date=date(2026, 1, 1),
+                purchase_price=Decimal('2.00'),
+                sale_price=Decimal('3.00'),
+                mrp=Decimal('4.00'),
+                tax=Decimal('12.00'),
+            )
+
+
+class StockUpdateChunkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tester', password='secret')
+        cls.product = Product.objects.create(name='Cetirizine 10mg')
+        cls.stock = Stock.objects.create(
+            product=cls.product,
+            batch_number='C1',
+            expiry_date=date(2027, 1, 1),
+            quantity=10,
+            purchase_price=Decimal('1.00'),
+            sale_price=Decimal('2.00'),
+            mrp=Decimal('2.50'),
+            tax=Decimal('5.00'),
+        )
+        supplier = Supplier.objects.create(name='MediSupply Co.', email='orders@medisupply.test')
+        cls.purchase = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PINV-1')
+        customer = Customer.objects.create(name='City Pharmacy', email='city@pharmacy.test')
+        cls.sale = SaleOrder.objects.create(customer=customer)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def line_prices(self, stock, quantity):
+        return {
+            'unit_price': stock.sale_price,
+            'unit_cost': stock.purchase_price,
+            'tax_rate': stock.tax,
+            'total_price': quantity * stock.sale_price * (1 + stock.tax / 100),
+        }
+
+    def purchase_item(self, quantity, batch_number='C1'):
+        return PurchaseOrderItem.objects.create(
+            purchase_order=self.purchase,
+            product=self.product,
+            batch_number=batch_number,
+            expiry_date=date(2027, 1, 1),
+            quantity=quantity,
+            purchase_price=Decimal('1.00'),
+            sale_price=Decimal('2.00'),
+            mrp=Decimal('2.50'),
+            tax=Decimal('5.00'),
+        )
+
+    def test_redelivered_tasks_are_applied_once(self):
+        first, second, draft = self.purchase_item(4), self.purchase_item(6), self.purchase_item(1, batch_number='')
+        update_stock_from_purchase(self.purchase.id)
+        update_stock_from_purchase(self.purchase.id, [first.id, second.id])
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 20)
+
+        # bulk_create skips SaleOrderItem.clean, so the oversold line reaches the task
+        sold, oversold = SaleOrderItem.objects.bulk_create([
+            SaleOrderItem(sale_order=self.sale, stock=self.stock, quantity=5, **self.line_prices(self.stock, 5)),
+            SaleOrderItem(sale_order=self.sale, stock=self.stock, quantity=50, **self.line_prices(self.stock, 50)),
+        ])
+        reduce_stock_from_sale(self.sale.id)
+        reduce_stock_from_sale(self.sale.id)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 15)
+
+        outcomes = dict(StockUpdateResult.objects.filter(kind='purchase').values_list('item_id', 'status'))
+        self.assertEqual(outcomes, {first.id: 'applied', second.id: 'applied', draft.id: 'skipped'})
+        failed = StockUpdateResult.objects.get(kind='sale', item_id=oversold.id)
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('Insufficient stock', failed.message)
+        self.assertEqual(StockUpdateResult.objects.get(kind='sale', item_id=sold.id).stock_id, self.stock.id)
+
+        response = self.client.get(f'/api/inventory/stock-update-results/?kind=sale&order_id={self.sale.id}&status=failed')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['item_id'] for row in response.data['results']], [oversold.id])
+
+    def stale_applied_item_ids(self):
+        """Patch the applied check to miss every line once, like a delivery racing another."""
+        real = StockUpdateResult.applied_item_ids
+        calls = []
+
+        def applied_item_ids(kind, item_ids):
+            calls.append(kind)
+            return set() if len(calls) == 1 else real(kind, item_ids)
+        return mock.patch.object(StockUpdateResult, 'applied_item_ids', side_effect=applied_item_ids)
+
+    def test_concurrent_delivery_is_applied_once(self):
+        line = self.purchase_item(4)
+        update_stock_from_purchase(self.purchase.id)
+        with self.stale_applied_item_ids():
+            update_stock_from_purchase(self.purchase.id)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 14)
+
+        SaleOrderItem.objects.bulk_create([
+            SaleOrderItem(sale_order=self.sale, stock=self.stock, quantity=3, **self.line_prices(self.stock, 3)),
+        ])
+        reduce_stock_from_sale(self.sale.id)
+        with self.stale_applied_item_ids():
+            reduce_stock_from_sale(self.sale.id)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 11)
+
+        # A late failure report never replaces the applied marker
+        StockUpdateResult.record('purchase', self.purchase.id, '', [(line.id, None, 4, 'failed', 'late')])
+        self.assertEqual(StockUpdateResult.objects.get(kind='purchase', item_id=line.id).status, 'applied')
+        self.assertEqual(StockUpdateResult.objects.get(kind='purchase', item_id=line.id).stock_id, self.stock.id)
+
+    def test_sale_queries_do_not_grow_with_lines(self):
+        batches = [self.stock] + [
+            Stock.objects.create(
+                product=Product.objects.create(name=f'Product {index}'), batch_number='C1',
+                expiry_date=date(2027, 1, 1), quantity=100, purchase_price=Decimal('1.00'),
+                sale_price=Decimal('2.00'), mrp=Decimal('2.50'), tax=Decimal('5.00'),
+            )
+            for index in range(4)
+        ]
+        query_counts = []
+        for line_count in (5, 25):
+            order = SaleOrder.objects.create(customer=self.sale.customer)
+            SaleOrderItem.objects.bulk_create([
+                SaleOrderItem(sale_order=order, stock=batches[index % 5], quantity=1, **self.line_prices(batches[index % 5], 1))
+                for index in range(line_count)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                apply_sale_order(order.id)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 10 - 1 - 5)
+        self.assertEqual(self.stock.total_price, Decimal('4.20'))
+        self.assertEqual(StockUpdateResult.objects.filter(kind='sale', status='applied').count(), 30)
+
+    @override_settings(STOCK_TASK_CHUNK_SIZE=2)
+    def test_dispatch_splits_order_into_chunks(self):
+        for _ in range(5):
+            self.purchase_item(1)
+        app.conf.task_always_eager = True
+        try:
+            result = dispatch_stock_update('purchase', self.purchase.id)
+        finally:
+            app.conf.task_always_eager = False
+
+        self.assertEqual(len(result.results), 3)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 15)
+        self.assertEqual(StockUpdateResult.objects.filter(order_id=self.purchase.id, status='applied').count(), 5)
+
+
+class ProductStockSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Paracetamol 500mg')
+        cls.other = Product.objects.create(name='Ibuprofen 400mg')
+
+    def create_stock(self, product, batch_number, quantity, expiry_date):
+        return Stock.objects.create(
+            product=product,
+            batch_number=batch_number,
+            expiry_date=expiry_date,
+            quantity=quantity,
+            purchase_price=Decimal('2.00'),
+            sale_price=Decimal('3.00'),
+            mrp=Decimal('4.00'),
+            tax=Decimal('0'),
+        )
+
+    def test_summary_follows_stock_writes(self):
+        first = self.create_stock(self.product, 'B1', 10, date(2026, 3, 1))
+        self.create_stock(self.product, 'B2', 5, date(2026, 1, 1))
+
+        summary = ProductStockSummary.objects.get(product=self.product)
+        self.assertEqual(summary.total_quantity, 15)
+        self.assertEqual(summary.total_value, Decimal('30.00'))
+        self.assertEqual(summary.nearest_expiry, date(2026, 1, 1))
+        self.assertEqual(summary.batch_count, 2)
+
+        # Moving a batch to another product updates both summaries
+        first.product = self.other
+        first.save()
+        self.assertEqual(ProductStockSummary.objects.get(product=self.product).total_quantity, 5)
+        self.assertEqual(ProductStockSummary.objects.get(product=self.other).total_quantity, 10)
+
+        first.delete()
+        summary = ProductStockSummary.objects.get(product=self.other)
+        self.assertEqual((summary.total_quantity, summary.batch_count, summary.nearest_expiry), (0, 0, None))
+
+    def test_summary_follows_purchase_merge(self):
+        self.create_stock(self.product, 'B1', 10, date(2026, 3, 1))
+        supplier = Supplier.objects.create(name='MediSupply Co.', email='orders@medisupply.test')
+        order = PurchaseOrder.objects.create(supplier=supplier, invoice_number='PINV-9')
+        PurchaseOrderItem.objects.create(
+            purchase_order=order,
+            product=self.product,
+            batch_number='B9',
+            expiry_date=date(2025, 12, 31),
+            quantity=4,
+            purchase_price=Decimal('2.00'),
+            sale_price=Decimal('3.00'),
+            mrp=Decimal('4.00'),
+            tax=Decimal('0'),
+        )
+        update_stock_from_purchase(order.id)
+
+        summary = ProductStockSummary.objects.get(product=self.product)
+        self.assertEqual(summary.total_quantity, 14)
+        self.assertEqual(summary.nearest_expiry, date(2025, 12, 31))
+        self.assertEqual(summary.batch_count, 2)
+
+    def test_refresh_recomputes_existing_summary(self):
+        self.create_stock(self.product, 'B1', 10, date(2026, 3, 1))
+        ProductStockSummary.objects.filter(product=self.product).update(total_quantity=99, batch_count=7)
+        ProductStockSummary.objects.filter(product=self.other).delete()
+
+        ProductStockSummary.refresh([self.product.id, self.other.id, 999999])
+
+        summary = ProductStockSummary.objects.get(product=self.product)
+        self.assertEqual((summary.total_quantity, summary.batch_count), (10, 1))
+        self.assertEqual(ProductStockSummary.objects.get(product=self.other).total_quantity, 0)
+        self.assertFalse(ProductStockSummary.objects.filter(product_id=999999).exists())
+
+    def test_rebuild_repairs_drift(self):
+        self.create_stock(self.product, 'B1', 10, date(2026, 3, 1))
+        ProductStockSummary.objects.filter(product=self.product).update(total_quantity=99)
+        ProductStockSummary.objects.filter(product=self.other).delete()
+
+        call_command('rebuild_stock_summary', stdout=StringIO())
+
+        self.assertEqual(ProductStockSummary.objects.get(product=self.product).total_quantity, 10)
+        self.assertEqual(ProductStockSummary.objects.get(product=self.other).total_quantity, 0)
+
+
+class ReorderPointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fast_mover = Product.objects.create(name='Paracetamol 500mg')
+        cls.slow_mover = Product.objects.create(name='Rare Ointment')
+        Stock.objects.create(
+            product=cls.fast_mover, batch_number='B1', expiry_date=date(2027, 1, 1), quantity=20,
+            purchase_price=Decimal('2.00'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'), tax=Decimal('0'),
+        )
+        customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+        today = timezone.localdate()
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(date=today - timedelta(days=day), product=cls.fast_mover, customer=customer, quantity=10)
+            for day in range(1, 29)
+        ])
+
+    def test_smoothing_matches_recursive_definition(self):
+        matrix = np.array([[3.0, 0.0, 5.0, 2.0, 8.0], [1.0, 1.0, 1.0, 1.0, 1.0]])
+        alpha = 0.3
+        for row, result in zip(matrix, exponential_smoothing(matrix, alpha)):
+            level = row[0]
+            for value in row:
+                level = alpha * value + (1 - alpha) * level
+            self.assertAlmostEqual(result, level)
+        np.testing.assert_allclose(moving_average(matrix, 2), [5.0, 1.0])
+
+    @override_settings(
+        FORECAST_METHOD='moving_average', FORECAST_HISTORY_DAYS=28, FORECAST_WINDOW_DAYS=28,
+        REORDER_LEAD_TIME_DAYS=7, REORDER_SERVICE_FACTOR=1.65,
+    )
+    def test_reorder_points_and_endpoint(self):
+        compute_reorder_points()
+
+        forecast = ProductForecast.objects.get(product=self.fast_mover)
+        self.assertEqual(forecast.daily_demand, Decimal('10.000'))
+        self.assertEqual((forecast.safety_stock, forecast.reorder_point), (0, 70))
+        self.assertEqual(ProductForecast.objects.get(product=self.slow_mover).reorder_point, 0)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('buyer', password='secret'))
+        response = client.get('/api/dashboard/reorder/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['product_name'], item['on_hand'], item['shortfall']) for item in response.data['reorder_items']],
+            [('Paracetamol 500mg', 20, 50)],
+        )
+
+
+class ClassificationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.steady = Product.objects.create(name='Paracetamol 500mg')
+        cls.erratic = Product.objects.create(name='Rare Ointment')
+        cls.unsold = Product.objects.create(name='Unsold Syrup')
+        for product in (cls.steady, cls.erratic):
+            Stock.objects.create(
+                product=product, batch_number='B1', expiry_date=date(2027, 1, 1), quantity=5,
+                purchase_price=Decimal('2.00'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'), tax=Decimal('0'),
+            )
+        customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+        today = timezone.localdate()
+        rollups = [
+            DailySalesRollup(date=today - timedelta(days=day), product=cls.steady, customer=customer,
+                             quantity=10, revenue=Decimal('30.00'))
+            for day in range(1, 57)
+        ]
+        rollups.append(DailySalesRollup(date=today - timedelta(days=3), product=cls.erratic, customer=customer,
+                                        quantity=40, revenue=Decimal('120.00')))
+        DailySalesRollup.objects.bulk_create(rollups)
+
+    def test_abc_by_cumulative_value_share(self):
+        classes, share = abc_classes(np.array([5.0, 50.0, 0.0, 30.0, 15.0]), 0.8, 0.95)
+        self.assertEqual(classes.tolist(), ['C', 'A', 'C', 'A', 'B'])
+        np.testing.assert_allclose(share, [1.0, 0.5, 1.0, 0.8, 0.95])
+
+    def test_xyz_by_weekly_variation(self):
+        steady = [2.0] * 21
+        erratic = [0.0] * 20 + [30.0]
+        classes, _ = xyz_classes(np.array([steady, erratic, [0.0] * 21]), 0.5, 1.0)
+        self.assertEqual(classes.tolist(), ['X', 'Z', 'Z'])
+
+    @override_settings(CLASSIFICATION_HISTORY_DAYS=56)
+    def test_classify_and_filter_endpoints(self):
+        classify_products()
+
+        classes = dict(ProductClassification.objects.values_list('product_id', 'abc_class'))
+        self.assertEqual(classes, {self.steady.id: 'A', self.erratic.id: 'B', self.unsold.id: 'C'})
+        self.assertEqual(ProductClassification.objects.get(product=self.steady).xyz_class, 'X')
+        self.assertIsNone(ProductClassification.objects.get(product=self.unsold).demand_cv)
+
+        client = APIClient()
+        response = client.get('/api/inventory/products/', {'abc_class': 'a,c', 'ordering': '-classification__abc_class'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Unsold Syrup', 'Paracetamol 500mg'])
+        self.assertEqual(response.data['results'][1]['xyz_class'], 'X')
+
+        response = client.get('/api/inventory/stock/', {'xyz_class': 'Z'})
+        self.assertEqual([row['product_name'] for row in response.data['results']], ['Rare Ointment'])
+
+
+class StockEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Paracetamol 500mg')
+        cls.stock = Stock.objects.create(
+            product=cls.product,
+            batch_number='B1',
+            expiry_date=date(2027, 1, 1),
+            quantity=40,
+            purchase_price=Decimal('1.00'),
+            sale_price=Decimal('2.00'),
+            mrp=Decimal('2.50'),
+            tax=Decimal('5.00'),
+        )
+
+    def test_events_carry_current_quantity(self):
+        self.assertEqual(stock_change_events([self.stock.id, 999]), [
+            {'stock': self.stock.id, 'product': self.product.id, 'batch': 'B1', 'quantity': 40},
+            {'stock': 999, 'quantity': 0, 'deleted': True},
+        ])
+
+    @override_settings(STOCK_EVENTS_ENABLED=True)
+    def test_changes_are_published_once_per_transaction(self):
+        with mock.patch('inventory.events.redis_client') as redis_client:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for quantity in (30, 20, 10):
+                    self.stock.quantity = quantity
+                    self.stock.save()
+                other = Stock.objects.create(
+                    product=self.product, batch_number='B2', expiry_date=date(2027, 1, 1), quantity=5,
+                    purchase_price=Decimal('1.00'), sale_price=Decimal('2.00'), mrp=Decimal('2.50'), tax=Decimal('5.00'),
+                )
+
+        self.assertEqual(len(callbacks), 1)
+        pipeline = redis_client.return_value.pipeline.return_value
+        self.assertEqual(pipeline.publish.call_count, 2)
+        self.assertIn('"quantity":10', pipeline.publish.call_args_list[0].args[1])
+        self.assertIn(f'"stock":{other.id}', pipeline.publish.call_args_list[1].args[1])
+        pipeline.execute.assert_called_once()
+
+    @override_settings(STOCK_EVENTS_ENABLED=True)
+    def test_publish_errors_do_not_fail_the_write(self):
+        with mock.patch('inventory.events.redis_client', side_effect=ConnectionError('down')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.stock.quantity = 30
+                self.stock.save()
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 30)
+
+    @override_settings(STOCK_EVENTS_QUEUE_SIZE=2)
+    def test_broker_fans_out_and_drops_slow_streams(self):
+        async def scenario():
+            broker = StockEventBroker()
+            broker.listen = asyncio.Event().wait  # no Redis here, events are fed directly
+            fast, slow = broker.subscribe(), broker.subscribe()
+            broker.fan_out('a')
+            self.assertEqual(fast.get_nowait(), 'a')
+            broker.fan_out('b')
+            broker.fan_out('c')
+            self.assertEqual([fast.get_nowait(), fast.get_nowait()], ['b', 'c'])
+            self.assertEqual(slow.get_nowait(), None)
+            self.assertEqual(broker.subscribers, {fast})
+            broker.unsubscribe(fast)
+            self.assertIsNone(broker.listener)
+
+        asyncio.run(scenario())
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CompanyViewSet, ProductViewSet, StockViewSet
+from .views import CompanyViewSet, ProductViewSet, StockUpdateResultViewSet, StockViewSet
 
 router = DefaultRouter()
 router.register(r'companies', CompanyViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'stock', StockViewSet)
+router.register(r'stock-update-results', StockUpdateResultViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -5,8 +5,11 @@ from rest_framework.response import Response
 from django.db.models import Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Company, Product, Stock
-from .serializers import CompanySerializer, ProductSerializer, StockSerializer
+from .models import Company, Product, Stock, StockUpdateResult
+from .serializers import CompanySerializer, ProductSerializer, StockSerializer, StockUpdateResultSerializer
+from core.fast_serializers import FastListMixin
+from core.mixins import BatchFetchMixin, ReplicaReadMixin
+from core.ordering import with_id_tiebreaker
 
 # Create your views here.
 
@@ -15,7 +18,31 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000  # Increased limit for search operations
 
-class CompanyViewSet(viewsets.ModelViewSet):
+CLASSIFICATION_PARAMETERS = [
+    openapi.Parameter(
+        'abc_class',
+        openapi.IN_QUERY,
+        description="Filter by ABC class of the product, comma separated (e.g. A,B)",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'xyz_class',
+        openapi.IN_QUERY,
+        description="Filter by XYZ class of the product, comma separated (e.g. X)",
+        type=openapi.TYPE_STRING
+    ),
+]
+
+def filter_by_classification(queryset, params, path):
+    """Apply the abc_class / xyz_class query parameters through ``path``."""
+    for param in ('abc_class', 'xyz_class'):
+        value = params.get(param, None)
+        if value:
+            classes = [item.strip().upper() for item in value.split(',') if item.strip()]
+            queryset = queryset.filter(**{f'{path}__{param}__in': classes})
+    return queryset
+
+class CompanyViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows companies to be viewed or edited.
     
@@ -25,6 +52,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
     queryset = Company.objects.all().order_by('id')
     serializer_class = CompanySerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = ['id', '-id', 'name', '-name', 'created_at', '-created_at', 'updated_at', '-updated_at']
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = ['created_at', 'updated_at']
     
     @swagger_auto_schema(
         operation_description="Retrieve a list of companies with optional search and ordering",
@@ -44,6 +74,12 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_STRING,
                 enum=['id', '-id', 'name', '-name', 'created_at', '-created_at', 'updated_at', '-updated_at']
             ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
+            ),
             openapi.Parameter(
                 'page',
                 openapi.IN_QUERY,
@@ -186,15 +222,14 @@ class CompanyViewSet(viewsets.ModelViewSet):
             )
         
         # Handle ordering
-        valid_orderings = ['id', '-id', 'name', '-name', 'created_at', '-created_at', 'updated_at', '-updated_at']
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows products to be viewed or edited.
     
@@ -204,9 +239,23 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by('id')
     serializer_class = ProductSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'name', '-name', 'company__name', '-company__name',
+        'created_at', '-created_at', 'updated_at', '-updated_at',
+        'stock_summary__total_quantity', '-stock_summary__total_quantity',
+        'stock_summary__nearest_expiry', '-stock_summary__nearest_expiry',
+        'classification__abc_class', '-classification__abc_class',
+        'classification__xyz_class', '-classification__xyz_class'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = [
+        'created_at', 'updated_at', 'company__name',
+        'stock_summary__total_quantity', 'stock_summary__nearest_expiry',
+        'classification__abc_class', 'classification__xyz_class'
+    ]
     
     @swagger_auto_schema(
-        operation_description="Retrieve a list of products with optional search and ordering",
+        operation_description="Retrieve a list of products with optional search, availability filter and ordering",
         operation_summary="List Products",
         tags=['Inventory - Products'],
         manual_parameters=[
@@ -221,7 +270,22 @@ class ProductViewSet(viewsets.ModelViewSet):
                 openapi.IN_QUERY,
                 description="Order results by field. Use '-' prefix for descending order",
                 type=openapi.TYPE_STRING,
-                enum=['id', '-id', 'name', '-name', 'company__name', '-company__name', 'created_at', '-created_at', 'updated_at', '-updated_at']
+                enum=['id', '-id', 'name', '-name', 'company__name', '-company__name', 'created_at', '-created_at', 'updated_at', '-updated_at',
+                      'stock_summary__total_quantity', '-stock_summary__total_quantity', 'stock_summary__nearest_expiry', '-stock_summary__nearest_expiry',
+                      'classification__abc_class', '-classification__abc_class', 'classification__xyz_class', '-classification__xyz_class']
+            ),
+            *CLASSIFICATION_PARAMETERS,
+            openapi.Parameter(
+                'in_stock',
+                openapi.IN_QUERY,
+                description="true: only products with units on hand, false: only products without",
+                type=openapi.TYPE_BOOLEAN
+            ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
             ),
             openapi.Parameter(
                 'page',
@@ -254,6 +318,12 @@ class ProductViewSet(viewsets.ModelViewSet):
                                     'name': openapi.Schema(type=openapi.TYPE_STRING),
                                     'company': openapi.Schema(type=openapi.TYPE_INTEGER, description="Company ID"),
                                     'company_name': openapi.Schema(type=openapi.TYPE_STRING, description="Company name"),
+                                    'total_quantity': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True, description="Units on hand across all batches"),
+                                    'stock_value': openapi.Schema(type=openapi.TYPE_STRING, format='decimal', nullable=True, description="Total value of stock on hand"),
+                                    'nearest_expiry': openapi.Schema(type=openapi.TYPE_STRING, format='date', nullable=True, description="Earliest expiry among batches in stock"),
+                                    'batch_count': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True, description="Number of batches in stock"),
+                                    'abc_class': openapi.Schema(type=openapi.TYPE_STRING, nullable=True, description="ABC class by sales value (A, B, C)"),
+                                    'xyz_class': openapi.Schema(type=openapi.TYPE_STRING, nullable=True, description="XYZ class by demand variability (X, Y, Z)"),
                                     'created_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
                                     'updated_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time')
                                 }
@@ -360,8 +430,9 @@ class ProductViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
     
     def get_queryset(self):
-        queryset = Product.objects.select_related('company').all()
+        queryset = Product.objects.select_related('company', 'stock_summary', 'classification').all()
         search = self.request.query_params.get('search', None)
+        in_stock = self.request.query_params.get('in_stock', None)
         ordering = self.request.query_params.get('ordering', 'id')
         
         if search is not None:
@@ -370,19 +441,24 @@ class ProductViewSet(viewsets.ModelViewSet):
                 Q(company__name__icontains=search)
             )
         
+        # Availability is read from ProductStockSummary, not aggregated from Stock
+        if in_stock is not None:
+            if in_stock.lower() in ('true', '1'):
+                queryset = queryset.filter(stock_summary__total_quantity__gt=0)
+            elif in_stock.lower() in ('false', '0'):
+                queryset = queryset.exclude(stock_summary__total_quantity__gt=0)
+        
+        queryset = filter_by_classification(queryset, self.request.query_params, 'classification')
+        
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'name', '-name', 'company__name', '-company__name',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows stock to be viewed or edited.
     
@@ -393,6 +469,23 @@ class StockViewSet(viewsets.ModelViewSet):
     queryset = Stock.objects.all().order_by('id')
     serializer_class = StockSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'product__name', '-product__name', 
+        'product__company__name', '-product__company__name',
+        'batch_number', '-batch_number', 'expiry_date', '-expiry_date',
+        'quantity', '-quantity', 'purchase_price', '-purchase_price',
+        'sale_price', '-sale_price', 'mrp', '-mrp', 'tax', '-tax',
+        'hsn_code', '-hsn_code', 'total_price', '-total_price',
+        'created_at', '-created_at', 'updated_at', '-updated_at',
+        'product__classification__abc_class', '-product__classification__abc_class',
+        'product__classification__xyz_class', '-product__classification__xyz_class'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = [
+        'purchase_price', 'sale_price', 'mrp', 'tax', 'hsn_code', 'total_price', 'updated_at',
+        'product__name', 'product__company__name',
+        'product__classification__abc_class', 'product__classification__xyz_class'
+    ]
     
     @swagger_auto_schema(
         operation_description="Retrieve a list of stock items with optional search and ordering",
@@ -417,9 +510,18 @@ class StockViewSet(viewsets.ModelViewSet):
                     'quantity', '-quantity', 'purchase_price', '-purchase_price',
                     'sale_price', '-sale_price', 'mrp', '-mrp', 'tax', '-tax',
                     'hsn_code', '-hsn_code', 'total_price', '-total_price',
-                    'created_at', '-created_at', 'updated_at', '-updated_at'
+                    'created_at', '-created_at', 'updated_at', '-updated_at',
+                    'product__classification__abc_class', '-product__classification__abc_class',
+                    'product__classification__xyz_class', '-product__classification__xyz_class'
                 ]
             ),
+            *CLASSIFICATION_PARAMETERS,
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
+            ),
             openapi.Parameter(
                 'page',
                 openapi.IN_QUERY,
@@ -599,19 +701,123 @@ class StockViewSet(viewsets.ModelViewSet):
                 Q(hsn_code__icontains=search)
             )
         
+        queryset = filter_by_classification(queryset, self.request.query_params, 'product__classification')
+        
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'product__name', '-product__name', 
-            'product__company__name', '-product__company__name',
-            'batch_number', '-batch_number', 'expiry_date', '-expiry_date',
-            'quantity', '-quantity', 'purchase_price', '-purchase_price',
-            'sale_price', '-sale_price', 'mrp', '-mrp', 'tax', '-tax',
-            'hsn_code', '-hsn_code', 'total_price', '-total_price',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
+
+
+class StockUpdateResultViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint listing the outcome of every order line applied to stock.
+
+    Completed orders update stock in chunk tasks; each line records whether
+    it was applied, skipped or failed here.
+    """
+    queryset = StockUpdateResult.objects.all().order_by('id')
+    serializer_class = StockUpdateResultSerializer
+    pagination_class = StandardResultsSetPagination
+    valid_orderings = ['id', '-id']
+
+    @swagger_auto_schema(
+        operation_description="Retrieve stock update outcomes of order lines, filtered by order, kind or status",
+        operation_summary="List Stock Update Results",
+        tags=['Inventory - Stock Update Results'],
+        manual_parameters=[
+            openapi.Parameter(
+                'kind',
+                openapi.IN_QUERY,
+                description="Order kind",
+                type=openapi.TYPE_STRING,
+                enum=['purchase', 'sale']
+            ),
+            openapi.Parameter(
+                'order_id',
+                openapi.IN_QUERY,
+                description="Filter by purchase or sale order ID",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'status',
+                openapi.IN_QUERY,
+                description="Filter by outcome",
+                type=openapi.TYPE_STRING,
+                enum=['applied', 'failed', 'skipped']
+            ),
+            openapi.Parameter(
+                'ordering',
+                openapi.IN_QUERY,
+                description="Order results by id. Use '-' prefix for descending order",
+                type=openapi.TYPE_STRING,
+                enum=['id', '-id']
+            ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'page',
+                openapi.IN_QUERY,
+                description="Page number for pagination",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Number of results per page (max 1000)",
+                type=openapi.TYPE_INTEGER
+            )
+        ],
+        responses={
+            200: openapi.Response(description="Stock update results retrieved successfully"),
+            400: openapi.Response(description="Invalid query parameters"),
+            401: openapi.Response(description="Authentication required")
+        }
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve the stock update outcome of one order line",
+        operation_summary="Get Stock Update Result",
+        tags=['Inventory - Stock Update Results'],
+        responses={
+            200: openapi.Response(description="Stock update result retrieved successfully"),
+            404: openapi.Response(description="Stock update result not found"),
+            401: openapi.Response(description="Authentication required")
+        }
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = StockUpdateResult.objects.all()
+        kind = self.request.query_params.get('kind', None)
+        order_id = self.request.query_params.get('order_id', None)
+        status = self.request.query_params.get('status', None)
+        ordering = self.request.query_params.get('ordering', 'id')
+
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        if order_id:
+            try:
+                queryset = queryset.filter(order_id=int(order_id))
+            except ValueError:
+                queryset = queryset.none()
+        if status:
+            queryset = queryset.filter(status=status)
+
+        # Handle ordering
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
+        else:
+            queryset = queryset.order_by('id')
+
+        return queryset
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Supplier, PurchaseOrder, PurchaseOrderItem
+from .models import DailyPurchaseRollup, Supplier, PurchaseOrder, PurchaseOrderItem
 
 admin.site.register(Supplier)
 admin.site.register(PurchaseOrder)
 admin.site.register(PurchaseOrderItem)
+admin.site.register(DailyPurchaseRollup)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:59
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('purchase', '0013_revert_to_original_structure'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='purchaseorder',
+            index=models.Index(fields=['order_date', 'id'], name='po_order_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'id'], name='po_status_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='purchaseorder',
+            index=models.Index(fields=['total_amount', 'id'], name='po_total_amount_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='purchaseorder',
+            index=models.Index(fields=['created_at', 'id'], name='po_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_productstocksummary'),
+        ('purchase', '0014_indexes_for_list_orderings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPurchaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_purchases', to='inventory.product')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_purchases', to='purchase.supplier')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'date'], name='purchase_rollup_product_idx'), models.Index(fields=['supplier', 'date'], name='purchase_rollup_supplier_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'product', 'supplier'), name='purchase_rollup_uniq')],
+            },
+        ),
+    ]
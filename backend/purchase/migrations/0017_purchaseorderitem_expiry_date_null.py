@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchase', '0016_status_order_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchaseorderitem',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
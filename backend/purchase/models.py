@@ -1,5 +1,10 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from core.cache import report_cache
+from core.rollups import refresh_on_commit
 
 # Create your models here.
 class Supplier(models.Model):
@@ -31,15 +36,33 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Each index ends with id, the tie-breaker the list endpoints sort by
+        indexes = [
+            models.Index(fields=['order_date', 'id'], name='po_order_date_id_idx'),
+            models.Index(fields=['status', 'id'], name='po_status_id_idx'),
+            models.Index(fields=['total_amount', 'id'], name='po_total_amount_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='po_created_at_id_idx'),
+            # Completed orders in a date range, for the tax and rollup reports
+            models.Index(fields=['status', 'order_date'], name='po_status_order_date_idx'),
+        ]
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Check if this is an update and if status is changing to 'Completed'
         old_status = None
+        old_instance = None
         if self.pk:  # This is an update, not a new instance
             try:
-                old_instance = PurchaseOrder.objects.get(pk=self.pk)
+                # Lock the order, so of two concurrent completions only the
+                # first sees the old status and applies the stock
+                old_instance = PurchaseOrder.objects.select_for_update().get(pk=self.pk)
                 old_status = old_instance.status
             except PurchaseOrder.DoesNotExist:
                 old_status = None
+
+        if old_status and old_status != 'Completed' and self.status == 'Completed':
+            self.check_items_complete()
         
         # Save first to ensure we have a primary key
         super().save(*args, **kwargs)
@@ -52,28 +75,43 @@ class PurchaseOrder(models.Model):
             # Use update to avoid triggering save() again
             PurchaseOrder.objects.filter(pk=self.pk).update(total_amount=self.total_amount)
 
-        # Trigger Celery task if status changed to 'Completed'
+        # Keep the daily rollups in step with completed orders
+        if 'Completed' in (old_status, self.status):
+            rollup_keys = {(self.order_date, self.supplier_id)}
+            if old_status == 'Completed':
+                rollup_keys.add((old_instance.order_date, old_instance.supplier_id))
+            DailyPurchaseRollup.refresh(rollup_keys)
+
+        # Apply or queue the stock update if status changed to 'Completed'
         if old_status and old_status != 'Completed' and self.status == 'Completed':
             print(f" [x] Status changed from '{old_status}' to '{self.status}' for Purchase Order {self.id}")
             
-            # Use transaction.on_commit to ensure the task runs after the transaction commits
-            def trigger_celery_task():
-                from inventory.tasks import update_stock_from_purchase
-                from .serializers import PurchaseOrderItemSerializer
-                
-                print(f" [x] Triggering Celery task for Purchase Order {self.id}")
-                
-                # Get the order items
-                items = self.order_items.all()
-                items_data = PurchaseOrderItemSerializer(items, many=True).data
-                
-                print(f" [x] Dispatching task with {len(items_data)} items")
-                
-                # Dispatch the Celery task asynchronously
-                task_result = update_stock_from_purchase.delay(items_data)
-                print(f" [x] Celery task dispatched with ID: {task_result.id}")
-            
-            transaction.on_commit(trigger_celery_task)
+            # Small orders are applied inline, larger ones go through the
+            # outbox, written in this transaction, to the Celery stock tasks
+            from inventory.tasks import schedule_stock_update
+            schedule_stock_update('purchase', self.id)
+
+    def incomplete_items(self):
+        """Lines still missing the batch number or expiry date, e.g. of draft orders."""
+        return self.order_items.filter(Q(batch_number='') | Q(expiry_date__isnull=True))
+
+    def check_items_complete(self):
+        """Refuse to complete the order while a line cannot become a stock batch."""
+        incomplete = list(self.incomplete_items().values_list('id', flat=True))
+        if incomplete:
+            raise ValidationError(
+                f"Purchase order {self.pk} cannot be completed: items {incomplete} have no batch number or expiry date"
+            )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.refresh_rollup_on_commit()
+        return result
+
+    def refresh_rollup_on_commit(self):
+        """Refresh this order's daily rollup after its lines changed, if it is completed."""
+        if self.status == 'Completed':
+            refresh_on_commit(DailyPurchaseRollup, {(self.order_date, self.supplier_id)})
 
     def __str__(self):
         return f"{self.id} | {self.supplier.name}"
@@ -82,7 +120,8 @@ class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='order_items')
     product = models.ForeignKey('inventory.Product', on_delete=models.CASCADE)
     batch_number = models.CharField(max_length=100)
-    expiry_date = models.DateField()
+    # Empty on draft orders until the supplier invoice arrives
+    expiry_date = models.DateField(null=True, blank=True)
     quantity = models.PositiveIntegerField(default=0)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -94,8 +133,116 @@ class PurchaseOrderItem(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
+        old_order_id = None
+        if self.pk:
+            old_order_id = PurchaseOrderItem.objects.filter(pk=self.pk).values_list('purchase_order_id', flat=True).first()
         self.total_price = (self.quantity * self.purchase_price) * (1 + self.tax / 100)
         super().save(*args, **kwargs)
 
+        # Lines added to or changed on a completed order count in its rollup
+        self.purchase_order.refresh_rollup_on_commit()
+        if old_order_id not in (None, self.purchase_order_id):
+            PurchaseOrder.objects.get(pk=old_order_id).refresh_rollup_on_commit()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.purchase_order.refresh_rollup_on_commit()
+        return result
+
     def __str__(self):
         return f"{self.quantity} of {self.product.name}"
+
+
+class DailyPurchaseRollup(models.Model):
+    """
+    Completed purchase totals per day, product and supplier.
+
+    - amount: purchase value before tax
+    - tax: tax paid on top of amount
+
+    Rows for a (day, supplier) pair are recomputed whenever one of its
+    orders enters or leaves the Completed status, and when the lines of a
+    completed order change or the order is deleted; rebuild_rollups
+    backfills whole date ranges. Reports read from this table only.
+    """
+    date = models.DateField()
+    product = models.ForeignKey('inventory.Product', on_delete=models.CASCADE, related_name='daily_purchases')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='daily_purchases')
+    quantity = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product', 'supplier'], name='purchase_rollup_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='purchase_rollup_product_idx'),
+            models.Index(fields=['supplier', 'date'], name='purchase_rollup_supplier_idx'),
+        ]
+
+    @classmethod
+    def aggregate(cls, items_filter):
+        """Build unsaved rollups from the completed order items matching ``items_filter``."""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        rows = (
+            PurchaseOrderItem.objects.filter(items_filter, purchase_order__status='Completed')
+            .values('purchase_order__order_date', 'product_id', 'purchase_order__supplier_id')
+            .annotate(
+                total_quantity=Sum('quantity'),
+                total_amount=Sum(ExpressionWrapper(F('quantity') * F('purchase_price'), output_field=money)),
+                total_tax=Sum(ExpressionWrapper(F('quantity') * F('purchase_price') * F('tax') * Value(Decimal('0.01')), output_field=money)),
+                total_lines=Count('id'),
+            )
+            .order_by()
+        )
+        cent = Decimal('0.01')
+        rollups = []
+        for row in rows:
+            amount = row['total_amount'].quantize(cent)
+            rollups.append(cls(
+                date=row['purchase_order__order_date'],
+                product_id=row['product_id'],
+                supplier_id=row['purchase_order__supplier_id'],
+                quantity=row['total_quantity'],
+                amount=amount,
+                tax=row['total_tax'].quantize(cent),
+                line_count=row['total_lines'],
+            ))
+        return rollups
+
+    @classmethod
+    def refresh(cls, keys):
+        """Recompute the rollups of the given ``(date, supplier_id)`` pairs."""
+        keys = set(keys)
+        if not keys:
+            return []
+        rollup_filter = Q()
+        items_filter = Q()
+        for day, supplier_id in keys:
+            rollup_filter |= Q(date=day, supplier_id=supplier_id)
+            items_filter |= Q(purchase_order__order_date=day, purchase_order__supplier_id=supplier_id)
+        with transaction.atomic():
+            # Lock the suppliers, so concurrent refreshes of the same day and
+            # supplier run one after the other, each aggregating the orders
+            # the other committed instead of inserting over its rows
+            supplier_ids = sorted({supplier_id for _, supplier_id in keys})
+            list(Supplier.objects.select_for_update().filter(id__in=supplier_ids).order_by('id').values_list('id', flat=True))
+            report_cache.invalidate_on_commit()
+            cls.objects.filter(rollup_filter).delete()
+            return cls.objects.bulk_create(cls.aggregate(items_filter))
+
+    @classmethod
+    def rebuild(cls, start, end):
+        """Recompute every rollup dated from ``start`` to ``end`` inclusive."""
+        with transaction.atomic():
+            report_cache.invalidate_on_commit()
+            cls.objects.filter(date__range=(start, end)).delete()
+            return cls.objects.bulk_create(
+                cls.aggregate(Q(purchase_order__order_date__range=(start, end))),
+                batch_size=1000,
+            )
+
+    def __str__(self):
+        return f"{self.date} | {self.product_id} | {self.supplier_id} | {self.amount}"
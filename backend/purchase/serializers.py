@@ -12,6 +12,7 @@ class PurchaseOrderItemSerializer(serializers.ModelSerializer):
         model = PurchaseOrderItem
         fields = ['id', 'product', 'batch_number', 'expiry_date', 'quantity', 'purchase_price', 'sale_price', 'mrp', 'tax', 'hsn_code', 'total_price']
         extra_kwargs = {
+            'expiry_date': {'required': True, 'allow_null': False},
             'total_price': {'read_only': True}
         }
 
@@ -25,6 +26,15 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
         model = PurchaseOrder
         fields = ['id', 'supplier', 'supplier_name', 'invoice_number', 'order_date', 'status', 'total_amount', 'created_at', 'updated_at', 'order_items', 'items']
 
+    def validate(self, data):
+        # Draft orders are completed only once every line has its batch
+        if self.instance is not None and data.get('status') == 'Completed' and self.instance.status != 'Completed':
+            if self.instance.incomplete_items().exists():
+                raise serializers.ValidationError({
+                    'status': "Fill in the batch number and expiry date of every item before completing the order."
+                })
+        return data
+
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         purchase_order = PurchaseOrder.objects.create(**validated_data)
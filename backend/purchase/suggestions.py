@@ -0,0 +1,139 @@
+"""
+Suggested purchase orders for products below their reorder point.
+
+Each product is ordered back up to its reorder point plus
+REORDER_COVER_DAYS of forecast demand, from the supplier and at the
+prices of its most recent completed purchase.
+"""
+import math
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from inventory.models import ProductForecast
+from .models import PurchaseOrder, PurchaseOrderItem
+
+LAST_PURCHASE_FIELDS = [
+    'product_id', 'purchase_order__supplier_id', 'purchase_order__supplier__name',
+    'purchase_price', 'sale_price', 'mrp', 'tax', 'hsn_code',
+]
+
+
+def last_purchases(product_ids):
+    """
+    Return the most recent completed purchase line of each product, keyed by
+    product id, in a single query ranking the lines per product with a
+    ROW_NUMBER() window.
+    """
+    lines = (
+        PurchaseOrderItem.objects
+        .filter(product_id__in=product_ids, purchase_order__status='Completed')
+        .annotate(recency=Window(
+            RowNumber(),
+            partition_by=F('product_id'),
+            order_by=[F('purchase_order__order_date').desc(), F('id').desc()],
+        ))
+        .filter(recency=1)
+        .values(*LAST_PURCHASE_FIELDS)
+    )
+    return {line['product_id']: line for line in lines}
+
+
+def suggest_purchase_orders():
+    """
+    Return ``(orders, unassigned)``. ``orders`` holds one suggested order
+    per supplier with its lines; ``unassigned`` lists products below their
+    reorder point that were never purchased, so have no supplier.
+    """
+    products = list(ProductForecast.products_below_reorder_point().values(
+        'id', 'name', 'on_hand', 'forecast__reorder_point', 'forecast__daily_demand',
+    ))
+    history = last_purchases([product['id'] for product in products])
+    cover_days = settings.REORDER_COVER_DAYS
+    cent = Decimal('0.01')
+
+    orders = {}
+    unassigned = []
+    for product in products:
+        suggested_quantity = (
+            product['forecast__reorder_point'] - product['on_hand']
+            + math.ceil(product['forecast__daily_demand'] * cover_days)
+        )
+        last = history.get(product['id'])
+        if last is None:
+            unassigned.append({
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'on_hand': product['on_hand'],
+                'reorder_point': product['forecast__reorder_point'],
+                'quantity': suggested_quantity,
+            })
+            continue
+
+        total_price = (suggested_quantity * last['purchase_price'] * (1 + last['tax'] / 100)).quantize(cent)
+        order = orders.setdefault(last['purchase_order__supplier_id'], {
+            'supplier': last['purchase_order__supplier_id'],
+            'supplier_name': last['purchase_order__supplier__name'],
+            'total_amount': Decimal('0.00'),
+            'items': [],
+        })
+        order['items'].append({
+            'product': product['id'],
+            'product_name': product['name'],
+            'on_hand': product['on_hand'],
+            'reorder_point': product['forecast__reorder_point'],
+            'quantity': suggested_quantity,
+            'purchase_price': last['purchase_price'],
+            'sale_price': last['sale_price'],
+            'mrp': last['mrp'],
+            'tax': last['tax'],
+            'hsn_code': last['hsn_code'],
+            'total_price': total_price,
+        })
+        order['total_amount'] += total_price
+
+    return sorted(orders.values(), key=lambda order: order['supplier_name']), unassigned
+
+
+def create_draft_orders(suggested_orders):
+    """
+    Insert the suggested orders as Pending purchase orders with two bulk
+    inserts and return them.
+
+    Lines carry no batch number and no expiry date, which the buyer fills
+    in from the supplier invoice; the orders cannot be completed before.
+    """
+    stamp = timezone.localtime().strftime('%Y%m%d')
+    orders = [
+        PurchaseOrder(
+            supplier_id=suggestion['supplier'],
+            invoice_number=f"DRAFT-{stamp}-{suggestion['supplier']}-{uuid.uuid4().hex[:6].upper()}",
+            status='Pending',
+            total_amount=suggestion['total_amount'],
+        )
+        for suggestion in suggested_orders
+    ]
+    with transaction.atomic():
+        # bulk_create skips PurchaseOrder.save, so no stock task is queued
+        PurchaseOrder.objects.bulk_create(orders)
+        PurchaseOrderItem.objects.bulk_create([
+            PurchaseOrderItem(
+                purchase_order=order,
+                product_id=line['product'],
+                batch_number='',
+                expiry_date=None,
+                quantity=line['quantity'],
+                purchase_price=line['purchase_price'],
+                sale_price=line['sale_price'],
+                mrp=line['mrp'],
+                tax=line['tax'],
+                hsn_code=line['hsn_code'],
+                total_price=line['total_price'],
+            )
+            for order, suggestion in zip(orders, suggested_orders)
+            for line in suggestion['items']
+        ], batch_size=1000)
+    return orders
@@ -1,3 +1,139 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from core.mixins import BatchFetchMixin
+from core.testing import FastListParityMixin
+from inventory.models import Company, Product, ProductForecast, Stock
+from .models import Supplier, PurchaseOrder, PurchaseOrderItem
+from .suggestions import suggest_purchase_orders
+from .views import PurchaseOrderItemViewSet, PurchaseOrderViewSet, SupplierViewSet
 
-# Create your tests here.
+
+class FastListSerializationTests(FastListParityMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme Pharma')
+        product = Product.objects.create(name='Paracetamol 500mg', company=company)
+        supplier = Supplier.objects.create(name='MediSupply Co.', email='orders@medisupply.test')
+        Supplier.objects.create(name='Quiet Traders', email='hello@quiet.test', address=None)
+        for number in range(3):
+            order = PurchaseOrder.objects.create(supplier=supplier, invoice_number=f'PINV-{number}')
+            for line in range(number):
+                PurchaseOrderItem.objects.create(
+                    purchase_order=order,
+                    product=product,
+                    batch_number=f'P{number}{line}',
+                    expiry_date=date(2027, 6, 30),
+                    quantity=10 + line,
+                    purchase_price=Decimal('8.25'),
+                    sale_price=Decimal('11.00'),
+                    mrp=Decimal('14.50'),
+                    tax=Decimal('5.00'),
+                )
+            order.save()
+
+    def test_supplier_list_parity(self):
+        self.assertListParity('/api/purchase/suppliers/')
+
+    def test_purchase_order_list_parity(self):
+        self.assertListParity('/api/purchase/purchase-orders/')
+        self.assertListParity('/api/purchase/purchase-orders/?ordering=-total_amount')
+
+    def test_purchase_order_item_list_parity(self):
+        self.assertListParity('/api/purchase/purchase-order-items/')
+
+
+class BatchFetchTests(SimpleTestCase):
+
+    def test_viewsets_fetch_in_batches(self):
+        for viewset in (SupplierViewSet, PurchaseOrderViewSet, PurchaseOrderItemViewSet):
+            self.assertTrue(issubclass(viewset, BatchFetchMixin), viewset)
+
+
+class SuggestedPurchaseOrderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', password='secret')
+        cls.old_supplier = Supplier.objects.create(name='Alpha Distributors', email='alpha@dist.test')
+        cls.new_supplier = Supplier.objects.create(name='Beta Pharma Supply', email='beta@supply.test')
+        cls.switched = Product.objects.create(name='Paracetamol 500mg')
+        cls.loyal = Product.objects.create(name='Cetirizine 10mg')
+        cls.never_bought = Product.objects.create(name='New Launch Gel')
+
+        for supplier, product, price in [
+            (cls.old_supplier, cls.switched, Decimal('2.00')),
+            (cls.old_supplier, cls.loyal, Decimal('1.50')),
+            (cls.new_supplier, cls.switched, Decimal('1.80')),
+        ]:
+            order = PurchaseOrder.objects.create(supplier=supplier, invoice_number=f'INV-{supplier.id}-{product.id}')
+            PurchaseOrderItem.objects.create(
+                purchase_order=order, product=product, batch_number='B1', expiry_date=date(2027, 6, 30),
+                quantity=10, purchase_price=price, sale_price=Decimal('3.00'), mrp=Decimal('4.00'),
+                tax=Decimal('12.00'), hsn_code='30049099',
+            )
+            PurchaseOrder.objects.filter(pk=order.pk).update(status='Completed')
+
+        Stock.objects.create(
+            product=cls.switched, batch_number='S1', expiry_date=date(2027, 1, 1), quantity=10,
+            purchase_price=Decimal('1.80'), sale_price=Decimal('3.00'), mrp=Decimal('4.00'), tax=Decimal('12.00'),
+        )
+        for product, reorder_point, demand in [
+            (cls.switched, 50, Decimal('2.000')),
+            (cls.loyal, 10, Decimal('0.500')),
+            (cls.never_bought, 5, Decimal('0.100')),
+        ]:
+            ProductForecast.objects.create(
+                product=product, method='moving_average', daily_demand=demand, reorder_point=reorder_point,
+            )
+
+    def test_suggestions_use_last_supplier(self):
+        with self.assertNumQueries(2):
+            orders, unassigned = suggest_purchase_orders()
+
+        self.assertEqual(
+            [(order['supplier_name'], [(line['product_name'], line['quantity'], line['purchase_price'])
+                                       for line in order['items']]) for order in orders],
+            [
+                ('Alpha Distributors', [('Cetirizine 10mg', 17, Decimal('1.50'))]),
+                ('Beta Pharma Supply', [('Paracetamol 500mg', 68, Decimal('1.80'))]),
+            ],
+        )
+        self.assertEqual([(item['product_name'], item['quantity']) for item in unassigned], [('New Launch Gel', 7)])
+
+    def test_create_draft_orders(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/purchase/purchase-orders/suggested/', {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['orders']), 2)
+
+        drafts = PurchaseOrder.objects.filter(invoice_number__startswith='DRAFT-').order_by('supplier__name')
+        self.assertEqual([order.status for order in drafts], ['Pending', 'Pending'])
+        beta = drafts[1]
+        line = beta.order_items.get()
+        self.assertEqual((line.product_id, line.quantity, line.batch_number, line.expiry_date), (self.switched.id, 68, '', None))
+        # 68 x 1.80 plus 12% tax
+        self.assertEqual(line.total_price, Decimal('137.09'))
+        self.assertEqual(beta.total_amount, Decimal('137.09'))
+
+        # Drafts cannot be completed before their batches are filled in
+        response = client.patch(f'/api/purchase/purchase-orders/{beta.id}/', {'status': 'Completed'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        beta.status = 'Completed'
+        with self.assertRaises(ValidationError):
+            beta.save()
+        beta.refresh_from_db()
+        self.assertEqual(beta.status, 'Pending')
+
+        line.batch_number = 'B77'
+        line.expiry_date = date(2028, 1, 31)
+        line.save()
+        response = client.patch(f'/api/purchase/purchase-orders/{beta.id}/', {'status': 'Completed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        beta.refresh_from_db()
+        self.assertEqual(beta.status, 'Completed')
@@ -1,4 +1,5 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
@@ -8,6 +9,10 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Supplier, PurchaseOrder, PurchaseOrderItem
 from .serializers import SupplierSerializer, PurchaseOrderSerializer, PurchaseOrderItemSerializer
+from core.fast_serializers import FastListMixin
+from core.mixins import BatchFetchMixin, ReplicaReadMixin
+from core.ordering import with_id_tiebreaker
+from .suggestions import create_draft_orders, suggest_purchase_orders
 
 # Create your views here.
 
@@ -16,7 +21,7 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000  # Increased limit for search operations
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows suppliers to be viewed or edited.
     
@@ -26,6 +31,17 @@ class SupplierViewSet(viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'name', '-name', 'contact_person', '-contact_person',
+        'phone_number', '-phone_number', 'email', '-email', 'address', '-address',
+        'drug_license_number', '-drug_license_number', 'gst_number', '-gst_number',
+        'created_at', '-created_at', 'updated_at', '-updated_at'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = [
+        'contact_person', 'phone_number', 'address', 'drug_license_number', 'gst_number',
+        'created_at', 'updated_at'
+    ]
     
     @swagger_auto_schema(
         operation_description="Retrieve a list of suppliers with optional search and ordering",
@@ -50,6 +66,12 @@ class SupplierViewSet(viewsets.ModelViewSet):
                     'created_at', '-created_at', 'updated_at', '-updated_at'
                 ]
             ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
+            ),
             openapi.Parameter(
                 'page',
                 openapi.IN_QUERY,
@@ -217,20 +239,14 @@ class SupplierViewSet(viewsets.ModelViewSet):
             )
         
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'name', '-name', 'contact_person', '-contact_person',
-            'phone_number', '-phone_number', 'email', '-email', 'address', '-address',
-            'drug_license_number', '-drug_license_number', 'gst_number', '-gst_number',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class PurchaseOrderViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows purchase orders to be viewed or edited.
     
@@ -240,6 +256,15 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
     queryset = PurchaseOrder.objects.select_related('supplier').all()
     serializer_class = PurchaseOrderSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'supplier__name', '-supplier__name', 'invoice_number', '-invoice_number',
+        'order_date', '-order_date', 'status', '-status', 'total_amount', '-total_amount',
+        'created_at', '-created_at', 'updated_at', '-updated_at'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = ['updated_at', 'supplier__name']
+    # Suggestions are computed from sales history, see core.db_router
+    replica_actions = ('list', 'suggested')
     
     @swagger_auto_schema(
         operation_description="Retrieve a list of purchase orders with optional search and ordering",
@@ -263,6 +288,12 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                     'created_at', '-created_at', 'updated_at', '-updated_at'
                 ]
             ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="Comma separated IDs to fetch in one request (disables pagination)",
+                type=openapi.TYPE_STRING
+            ),
             openapi.Parameter(
                 'page',
                 openapi.IN_QUERY,
@@ -517,6 +548,43 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             traceback.print_exc()
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    @swagger_auto_schema(
+        methods=['get'],
+        operation_description="Preview suggested purchase orders for all products below their reorder point, "
+                              "grouped by the supplier of each product's last completed purchase",
+        operation_summary="Preview Suggested Purchase Orders",
+        tags=['Purchase - Orders'],
+        responses={
+            200: openapi.Response(description="Suggested orders computed successfully"),
+            401: openapi.Response(description="Authentication required")
+        }
+    )
+    @swagger_auto_schema(
+        methods=['post'],
+        operation_description="Create the suggested purchase orders as Pending drafts. Draft lines have no batch "
+                              "number and no expiry date; both must be filled in from the supplier invoice before "
+                              "the order can be completed.",
+        operation_summary="Create Suggested Purchase Orders",
+        tags=['Purchase - Orders'],
+        request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={}),
+        responses={
+            201: openapi.Response(description="Draft purchase orders created successfully"),
+            401: openapi.Response(description="Authentication required")
+        }
+    )
+    @action(detail=False, methods=['get', 'post'])
+    def suggested(self, request):
+        orders, unassigned = suggest_purchase_orders()
+        if request.method == 'GET':
+            return Response({'orders': orders, 'unassigned': unassigned})
+
+        drafts = create_draft_orders(orders)
+        created = PurchaseOrder.objects.filter(pk__in=[order.pk for order in drafts]).select_related('supplier')
+        return Response({
+            'orders': self.get_serializer(created.order_by('id'), many=True).data,
+            'unassigned': unassigned,
+        }, status=status.HTTP_201_CREATED)
+    
     def get_queryset(self):
         queryset = PurchaseOrder.objects.select_related('supplier').all()
         search = self.request.query_params.get('search', None)
@@ -531,19 +599,14 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             )
         
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'supplier__name', '-supplier__name', 'invoice_number', '-invoice_number',
-            'order_date', '-order_date', 'status', '-status', 'total_amount', '-total_amount',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class PurchaseOrderItemViewSet(viewsets.ModelViewSet):
+class PurchaseOrderItemViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows purchase order items to be viewed or edited.
     """
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer, SaleOrder, SaleOrderItem
+from .models import Customer, DailySalesRollup, SaleOrder, SaleOrderItem
 
 # Register your models here.
 
@@ -32,3 +32,10 @@ class SaleOrderItemAdmin(admin.ModelAdmin):
     search_fields = ['stock__product__name', 'stock__batch_number', 'sale_order__invoice_number']
     ordering = ['-created_at']
     readonly_fields = ['total_price', 'product', 'batch_number', 'expiry_date', 'purchase_price', 'sale_price', 'mrp', 'tax', 'hsn_code']
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'product', 'customer', 'quantity', 'revenue', 'tax', 'margin', 'line_count']
+    list_filter = ['date']
+    search_fields = ['product__name', 'customer__name']
+    ordering = ['-date']
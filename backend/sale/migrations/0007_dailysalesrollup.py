@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_productstocksummary'),
+        ('sale', '0006_indexes_for_list_orderings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('margin', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='sale.customer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'date'], name='sales_rollup_product_idx'), models.Index(fields=['customer', 'date'], name='sales_rollup_customer_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'product', 'customer'), name='sales_rollup_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:20
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sale', '0007_dailysalesrollup'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='saleorder',
+            index=models.Index(fields=['status', 'order_date'], name='so_status_order_date_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Store the batch prices on each sale line, so rollups no longer follow repricing
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Line field: Stock field
+PRICE_FIELDS = {'unit_price': 'sale_price', 'unit_cost': 'purchase_price', 'tax_rate': 'tax'}
+
+
+def copy_stock_prices(apps, schema_editor):
+    SaleOrderItem = apps.get_model('sale', 'SaleOrderItem')
+    Stock = apps.get_model('inventory', 'Stock')
+    stock = Stock.objects.filter(pk=OuterRef('stock_id'))
+    SaleOrderItem.objects.update(**{
+        field: Subquery(stock.values(stock_field)[:1]) for field, stock_field in PRICE_FIELDS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_alter_stock_total_price'),
+        ('sale', '0008_status_order_date_index'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name='saleorderitem',
+                name=field,
+                field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True),
+            )
+            for field in PRICE_FIELDS
+        ],
+        migrations.RunPython(copy_stock_prices, migrations.RunPython.noop),
+        *[
+            migrations.AlterField(
+                model_name='saleorderitem',
+                name=field,
+                field=models.DecimalField(decimal_places=2, editable=False, max_digits=10),
+            )
+            for field in PRICE_FIELDS
+        ],
+    ]
@@ -1,6 +1,10 @@
+from decimal import Decimal
 from django.db import models
 from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
 from django.core.exceptions import ValidationError
+from core.cache import report_cache
+from core.rollups import refresh_on_commit
 
 # Create your models here.
 class Customer(models.Model):
@@ -32,6 +36,17 @@ class SaleOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Each index ends with id, the tie-breaker the list endpoints sort by
+        indexes = [
+            models.Index(fields=['order_date', 'id'], name='so_order_date_id_idx'),
+            models.Index(fields=['status', 'id'], name='so_status_id_idx'),
+            models.Index(fields=['total_amount', 'id'], name='so_total_amount_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='so_created_at_id_idx'),
+            # Completed orders in a date range, for the tax and rollup reports
+            models.Index(fields=['status', 'order_date'], name='so_status_order_date_idx'),
+        ]
+
     def generate_invoice_number(self):
         """Generate auto-incremental invoice number in format: SALE-YYYY-NNNN"""
         from datetime import datetime
@@ -57,6 +72,7 @@ class SaleOrder(models.Model):
         # Format with leading zeros (4 digits)
         return f"{prefix}{next_number:04d}"
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
         # Always generate invoice number for new records
         if not self.pk and not self.invoice_number:
@@ -64,9 +80,12 @@ class SaleOrder(models.Model):
         
         # Check if this is an update and if status is changing to 'Completed'
         old_status = None
+        old_instance = None
         if self.pk:  # This is an update, not a new instance
             try:
-                old_instance = SaleOrder.objects.get(pk=self.pk)
+                # Lock the order, so of two concurrent completions only the
+                # first sees the old status and applies the stock
+                old_instance = SaleOrder.objects.select_for_update().get(pk=self.pk)
                 old_status = old_instance.status
             except SaleOrder.DoesNotExist:
                 old_status = None
@@ -82,28 +101,31 @@ class SaleOrder(models.Model):
             # Use update to avoid triggering save() again
             SaleOrder.objects.filter(pk=self.pk).update(total_amount=self.total_amount)
 
-        # Trigger Celery task if status changed to 'Completed'
+        # Keep the daily rollups in step with completed orders
+        if 'Completed' in (old_status, self.status):
+            rollup_keys = {(self.order_date, self.customer_id)}
+            if old_status == 'Completed':
+                rollup_keys.add((old_instance.order_date, old_instance.customer_id))
+            DailySalesRollup.refresh(rollup_keys)
+
+        # Apply or queue the stock update if status changed to 'Completed'
         if old_status and old_status != 'Completed' and self.status == 'Completed':
             print(f" [x] Status changed from '{old_status}' to '{self.status}' for Sale Order {self.id}")
             
-            # Use transaction.on_commit to ensure the task runs after the transaction commits
-            def trigger_celery_task():
-                from inventory.tasks import reduce_stock_from_sale
-                from .serializers import SaleOrderItemSerializer
-                
-                print(f" [x] Triggering Celery task for Sale Order {self.id}")
-                
-                # Get the order items
-                items = self.order_items.all()
-                items_data = SaleOrderItemSerializer(items, many=True).data
-                
-                print(f" [x] Dispatching task with {len(items_data)} items")
-                
-                # Dispatch the Celery task asynchronously
-                task_result = reduce_stock_from_sale.delay(items_data)
-                print(f" [x] Celery task dispatched with ID: {task_result.id}")
-            
-            transaction.on_commit(trigger_celery_task)
+            # Small orders are applied inline, larger ones go through the
+            # outbox, written in this transaction, to the Celery stock tasks
+            from inventory.tasks import schedule_stock_update
+            schedule_stock_update('sale', self.id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.refresh_rollup_on_commit()
+        return result
+
+    def refresh_rollup_on_commit(self):
+        """Refresh this order's daily rollup after its lines changed, if it is completed."""
+        if self.status == 'Completed':
+            refresh_on_commit(DailySalesRollup, {(self.order_date, self.customer_id)})
 
     def __str__(self):
         return f"{self.id} | {self.customer.name}"
@@ -112,6 +134,11 @@ class SaleOrderItem(models.Model):
     sale_order = models.ForeignKey(SaleOrder, on_delete=models.CASCADE, related_name='order_items')
     stock = models.ForeignKey('inventory.Stock', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
+    # Prices of the batch when the line was created, so reports keep
+    # showing what was charged after the batch is repriced
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    tax_rate = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     total_price = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -130,10 +157,28 @@ class SaleOrderItem(models.Model):
         # Run validation before saving
         self.clean()
         
-        # Calculate total price based on stock's sale price
-        self.total_price = (self.quantity * self.stock.sale_price) * (1 + self.stock.tax / 100)
+        # Take the prices from the batch when the line is created or moved
+        # to another batch, and calculate the total from them
+        old_stock_id = old_order_id = None
+        if self.pk:
+            old_stock_id, old_order_id = SaleOrderItem.objects.filter(pk=self.pk).values_list('stock_id', 'sale_order_id').first() or (None, None)
+        if self.unit_price is None or old_stock_id not in (None, self.stock_id):
+            self.unit_price = self.stock.sale_price
+            self.unit_cost = self.stock.purchase_price
+            self.tax_rate = self.stock.tax
+        self.total_price = (self.quantity * self.unit_price) * (1 + self.tax_rate / 100)
         super().save(*args, **kwargs)
 
+        # Lines added to or changed on a completed order count in its rollup
+        self.sale_order.refresh_rollup_on_commit()
+        if old_order_id not in (None, self.sale_order_id):
+            SaleOrder.objects.get(pk=old_order_id).refresh_rollup_on_commit()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.sale_order.refresh_rollup_on_commit()
+        return result
+
     def __str__(self):
         return f"{self.quantity} of {self.stock.product.name} (Sale)"
     
@@ -169,3 +214,103 @@ class SaleOrderItem(models.Model):
     @property
     def hsn_code(self):
         return self.stock.hsn_code
+
+
+class DailySalesRollup(models.Model):
+    """
+    Completed sales totals per day, product and customer.
+
+    - revenue: sale value before tax
+    - tax: tax charged on top of revenue
+    - margin: revenue minus the purchase cost of the units sold
+
+    All three come from the prices stored on the order lines. Rows for a
+    (day, customer) pair are recomputed whenever one of its orders enters
+    or leaves the Completed status, and when the lines of a completed order
+    change or the order is deleted; rebuild_rollups backfills whole date
+    ranges. Reports read from this table only.
+    """
+    date = models.DateField()
+    product = models.ForeignKey('inventory.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    margin = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product', 'customer'], name='sales_rollup_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='sales_rollup_product_idx'),
+            models.Index(fields=['customer', 'date'], name='sales_rollup_customer_idx'),
+        ]
+
+    @classmethod
+    def aggregate(cls, items_filter):
+        """Build unsaved rollups from the completed order items matching ``items_filter``."""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        rows = (
+            SaleOrderItem.objects.filter(items_filter, sale_order__status='Completed')
+            .values('sale_order__order_date', 'stock__product_id', 'sale_order__customer_id')
+            .annotate(
+                total_quantity=Sum('quantity'),
+                total_revenue=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=money)),
+                total_cost=Sum(ExpressionWrapper(F('quantity') * F('unit_cost'), output_field=money)),
+                total_tax=Sum(ExpressionWrapper(F('quantity') * F('unit_price') * F('tax_rate') * Value(Decimal('0.01')), output_field=money)),
+                total_lines=Count('id'),
+            )
+            .order_by()
+        )
+        cent = Decimal('0.01')
+        rollups = []
+        for row in rows:
+            revenue = row['total_revenue'].quantize(cent)
+            rollups.append(cls(
+                date=row['sale_order__order_date'],
+                product_id=row['stock__product_id'],
+                customer_id=row['sale_order__customer_id'],
+                quantity=row['total_quantity'],
+                revenue=revenue,
+                tax=row['total_tax'].quantize(cent),
+                margin=(revenue - row['total_cost']).quantize(cent),
+                line_count=row['total_lines'],
+            ))
+        return rollups
+
+    @classmethod
+    def refresh(cls, keys):
+        """Recompute the rollups of the given ``(date, customer_id)`` pairs."""
+        keys = set(keys)
+        if not keys:
+            return []
+        rollup_filter = Q()
+        items_filter = Q()
+        for day, customer_id in keys:
+            rollup_filter |= Q(date=day, customer_id=customer_id)
+            items_filter |= Q(sale_order__order_date=day, sale_order__customer_id=customer_id)
+        with transaction.atomic():
+            # Lock the customers, so concurrent refreshes of the same day and
+            # customer run one after the other, each aggregating the orders
+            # the other committed instead of inserting over its rows
+            customer_ids = sorted({customer_id for _, customer_id in keys})
+            list(Customer.objects.select_for_update().filter(id__in=customer_ids).order_by('id').values_list('id', flat=True))
+            report_cache.invalidate_on_commit()
+            cls.objects.filter(rollup_filter).delete()
+            return cls.objects.bulk_create(cls.aggregate(items_filter))
+
+    @classmethod
+    def rebuild(cls, start, end):
+        """Recompute every rollup dated from ``start`` to ``end`` inclusive."""
+        with transaction.atomic():
+            report_cache.invalidate_on_commit()
+            cls.objects.filter(date__range=(start, end)).delete()
+            return cls.objects.bulk_create(
+                cls.aggregate(Q(sale_order__order_date__range=(start, end))),
+                batch_size=1000,
+            )
+
+    def __str__(self):
+        return f"{self.date} | {self.product_id} | {self.customer_id} | {self.revenue}"
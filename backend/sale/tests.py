@@ -1,3 +1,159 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from django.test import SimpleTestCase, TestCase
+from core.mixins import BatchFetchMixin
+from core.testing import FastListParityMixin
+from inventory.models import Company, Product, Stock
+from .models import Customer, DailySalesRollup, SaleOrder, SaleOrderItem
+from .views import CustomerViewSet, SaleOrderItemViewSet, SaleOrderViewSet
 
-# Create your tests here.
+
+class FastListSerializationTests(FastListParityMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme Pharma')
+        stocks = [
+            Stock.objects.create(
+                product=Product.objects.create(name=name, company=owner),
+                batch_number=f'S{index}',
+                expiry_date=date(2026, 3, 1),
+                quantity=100,
+                purchase_price=Decimal('4.10'),
+                sale_price=Decimal('6.35'),
+                mrp=Decimal('7.00'),
+                tax=Decimal('18.00'),
+                hsn_code=None if index else '30041000',
+            )
+            for index, (name, owner) in enumerate([('Cetirizine 10mg', company), ('Unbranded Balm', None)])
+        ]
+        customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+        Customer.objects.create(name='Corner Pharmacy', email='corner@pharmacy.test')
+        for count in range(3):
+            order = SaleOrder.objects.create(customer=customer)
+            for stock in stocks[:count]:
+                SaleOrderItem.objects.create(sale_order=order, stock=stock, quantity=3)
+            order.save()
+
+    def test_customer_list_parity(self):
+        self.assertListParity('/api/sale/customers/')
+
+    def test_sale_order_list_parity(self):
+        self.assertListParity('/api/sale/orders/')
+        self.assertListParity('/api/sale/orders/?ordering=-invoice_number&page_size=1')
+
+    def test_sale_order_item_list_parity(self):
+        self.assertListParity('/api/sale/order-items/')
+
+
+class BatchFetchTests(SimpleTestCase):
+
+    def test_viewsets_fetch_in_batches(self):
+        for viewset in (CustomerViewSet, SaleOrderViewSet, SaleOrderItemViewSet):
+            self.assertTrue(issubclass(viewset, BatchFetchMixin), viewset)
+
+
+class DailySalesRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Cetirizine 10mg')
+        cls.stock = Stock.objects.create(
+            product=cls.product,
+            batch_number='S1',
+            expiry_date=date(2026, 3, 1),
+            quantity=100,
+            purchase_price=Decimal('4.10'),
+            sale_price=Decimal('6.35'),
+            mrp=Decimal('7.00'),
+            tax=Decimal('18.00'),
+        )
+        cls.customer = Customer.objects.create(name='City Chemists', email='buy@citychem.test')
+
+    def test_rollup_follows_order_status(self):
+        order = SaleOrder.objects.create(customer=self.customer)
+        SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=3)
+        SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=2)
+        order.save()
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+        order.status = 'Completed'
+        order.save()
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.date, rollup.product_id, rollup.customer_id), (order.order_date, self.product.id, self.customer.id))
+        self.assertEqual(rollup.quantity, 5)
+        self.assertEqual(rollup.revenue, Decimal('31.75'))
+        self.assertEqual(rollup.tax, Decimal('5.72'))
+        self.assertEqual(rollup.margin, Decimal('11.25'))
+        self.assertEqual(rollup.line_count, 2)
+
+        order.status = 'Cancelled'
+        order.save()
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_rebuild_keeps_the_prices_charged(self):
+        order = SaleOrder.objects.create(customer=self.customer)
+        SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=5)
+        order.status = 'Completed'
+        order.save()
+
+        Stock.objects.filter(pk=self.stock.pk).update(sale_price=Decimal('9.99'), purchase_price=Decimal('1.00'), tax=Decimal('0'))
+        DailySalesRollup.rebuild(order.order_date, order.order_date)
+
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.revenue, rollup.tax, rollup.margin), (Decimal('31.75'), Decimal('5.72'), Decimal('11.25')))
+
+    def test_moving_a_line_to_another_batch_takes_its_prices(self):
+        order = SaleOrder.objects.create(customer=self.customer)
+        item = SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=2)
+        other = Stock.objects.create(
+            product=self.product,
+            batch_number='S2',
+            expiry_date=date(2026, 9, 1),
+            quantity=100,
+            purchase_price=Decimal('4.50'),
+            sale_price=Decimal('7.00'),
+            mrp=Decimal('8.00'),
+            tax=Decimal('12.00'),
+        )
+        Stock.objects.filter(pk=self.stock.pk).update(sale_price=Decimal('9.99'))
+
+        item.quantity = 3
+        item.save()
+        item.refresh_from_db()
+        self.assertEqual(item.unit_price, Decimal('6.35'))
+
+        item.stock = other
+        item.save()
+        item.refresh_from_db()
+        self.assertEqual((item.unit_price, item.unit_cost, item.tax_rate), (Decimal('7.00'), Decimal('4.50'), Decimal('12.00')))
+        self.assertEqual(item.total_price, Decimal('23.52'))
+
+    def test_rollup_follows_lines_of_completed_orders(self):
+        # Created as Completed, its lines are only saved after the order
+        with self.captureOnCommitCallbacks(execute=True):
+            order = SaleOrder.objects.create(customer=self.customer, status='Completed')
+            item = SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=3)
+            SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=2)
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.quantity, rollup.revenue, rollup.line_count), (5, Decimal('31.75'), 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.quantity = 4
+            item.save()
+        self.assertEqual(DailySalesRollup.objects.get().quantity, 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.quantity, rollup.line_count), (2, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_lines_of_pending_orders_leave_rollups_alone(self):
+        order = SaleOrder.objects.create(customer=self.customer)
+        with self.captureOnCommitCallbacks() as callbacks:
+            SaleOrderItem.objects.create(sale_order=order, stock=self.stock, quantity=3)
+        self.assertEqual(callbacks, [])
@@ -6,6 +6,9 @@ from django.db import transaction
 from django.db.models import Q
 from .models import Customer, SaleOrder, SaleOrderItem
 from .serializers import CustomerSerializer, SaleOrderSerializer, SaleOrderItemSerializer
+from core.fast_serializers import FastListMixin
+from core.mixins import BatchFetchMixin, ReplicaReadMixin
+from core.ordering import with_id_tiebreaker
 
 # Create your views here.
 
@@ -14,13 +17,24 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000  # Increased limit for search operations
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows customers to be viewed or edited.
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'name', '-name', 'contact_person', '-contact_person',
+        'phone_number', '-phone_number', 'email', '-email', 'address', '-address',
+        'drug_license_number', '-drug_license_number', 'gst_number', '-gst_number',
+        'created_at', '-created_at', 'updated_at', '-updated_at'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = [
+        'contact_person', 'phone_number', 'address', 'drug_license_number', 'gst_number',
+        'created_at', 'updated_at'
+    ]
     
     def get_queryset(self):
         queryset = Customer.objects.all()
@@ -39,26 +53,27 @@ class CustomerViewSet(viewsets.ModelViewSet):
             )
         
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'name', '-name', 'contact_person', '-contact_person',
-            'phone_number', '-phone_number', 'email', '-email', 'address', '-address',
-            'drug_license_number', '-drug_license_number', 'gst_number', '-gst_number',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class SaleOrderViewSet(viewsets.ModelViewSet):
+class SaleOrderViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows sale orders to be viewed or edited.
     """
     queryset = SaleOrder.objects.select_related('customer').all()
     serializer_class = SaleOrderSerializer
     pagination_class = StandardResultsSetPagination
+    valid_orderings = [
+        'id', '-id', 'customer__name', '-customer__name', 'invoice_number', '-invoice_number',
+        'order_date', '-order_date', 'status', '-status', 'total_amount', '-total_amount',
+        'created_at', '-created_at', 'updated_at', '-updated_at'
+    ]
+    # Sorts acceptable without an index, see core.checks.check_ordering_indexes
+    unindexed_orderings = ['updated_at', 'customer__name']
     
     def create(self, request, *args, **kwargs):
         """
@@ -102,21 +117,16 @@ class SaleOrderViewSet(viewsets.ModelViewSet):
             )
         
         # Handle ordering
-        valid_orderings = [
-            'id', '-id', 'customer__name', '-customer__name', 'invoice_number', '-invoice_number',
-            'order_date', '-order_date', 'status', '-status', 'total_amount', '-total_amount',
-            'created_at', '-created_at', 'updated_at', '-updated_at'
-        ]
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        if ordering in self.valid_orderings:
+            queryset = queryset.order_by(*with_id_tiebreaker(ordering))
         else:
             queryset = queryset.order_by('id')
             
         return queryset
 
-class SaleOrderItemViewSet(viewsets.ModelViewSet):
+class SaleOrderItemViewSet(BatchFetchMixin, FastListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows sale order items to be viewed or edited.
     """
-    queryset = SaleOrderItem.objects.all()
+    queryset = SaleOrderItem.objects.select_related('stock__product__company').all()
     serializer_class = SaleOrderItemSerializer